@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Ancestry queries backed by git's commit-graph.
+
+Git answers reachability questions (`merge-base --is-ancestor`,
+`for-each-ref --merged`) using the generation numbers stored in the
+commit-graph file, which lets it stop walking as soon as a commit is
+"older" than the one it is looking for. Doing the same walk in Python
+through `iter_commits` always visits the whole history.
+"""
+import logging
+import os
+from typing import Any
+from typing import List
+from typing import Optional
+
+import git
+
+from auto_tag import constants
+
+
+def commit_graph_paths(repo: git.Repo) -> List[str]:
+    """Return the locations where git can store a commit-graph.
+
+    :param repo: Repository to inspect
+    :type repo: git.Repo
+
+    :returns: The single file and the split chain locations
+    :rtype: list
+    """
+    info_dir = os.path.join(repo.common_dir, 'objects', 'info')
+    return [
+        os.path.join(info_dir, 'commit-graph'),
+        os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain'),
+    ]
+
+
+def has_commit_graph(repo: git.Repo) -> bool:
+    """Check if the repository already has a commit-graph."""
+    return any(os.path.isfile(path) for path in commit_graph_paths(repo))
+
+
+def write_commit_graph(repo: git.Repo, split: bool = False) -> None:
+    """Write (or incrementally refresh) the commit-graph of a repository.
+
+    :param repo: Repository to write the commit-graph for
+    :param split: Append a new layer instead of rewriting the whole file
+    """
+    args = ['write', '--reachable']
+    if split:
+        args.append('--split')
+    repo.git.commit_graph(*args)
+
+
+def ensure_commit_graph(
+        repo: git.Repo,
+        mode: str = constants.COMMIT_GRAPH_USE,
+        logger: Optional[Any] = None) -> bool:
+    """Make sure a commit-graph is available according to `mode`.
+
+    :param repo: Repository to prepare
+    :param mode: One of `constants.COMMIT_GRAPH_MODES`
+    :param logger: If specified what logger to use
+
+    :returns: True if the repository has a commit-graph after the call
+    :rtype: bool
+    """
+    logger = logger or logging.getLogger(__name__)
+    present = has_commit_graph(repo)
+
+    if mode == constants.COMMIT_GRAPH_REFRESH or (
+            mode == constants.COMMIT_GRAPH_WRITE_IF_MISSING and not present):
+        logger.info('Writing commit-graph for %s', repo.common_dir)
+        write_commit_graph(repo, split=present)
+        present = True
+
+    if not present:
+        logger.debug('No commit-graph found, ancestry queries will do '
+                     'full walks')
+    return present
+
+
+def is_ancestor(repo: git.Repo, ancestor: str, descendant: str) -> bool:
+    """Check if `ancestor` is reachable from `descendant`.
+
+    :param repo: Repository to query
+    :param ancestor: Any revision that resolves to a commit
+    :param descendant: Any revision that resolves to a commit
+
+    :returns: True if `ancestor` is an ancestor of (or equal to) `descendant`
+    :rtype: bool
+    """
+    try:
+        repo.git.merge_base('--is-ancestor', ancestor, descendant)
+    except git.GitCommandError as exc:
+        if exc.status == 1:
+            return False
+        raise
+    return True
+
+
+def tags_reachable_from(
+        repo: git.Repo, rev: str) -> List[git.refs.tag.TagReference]:
+    """Return all the tags that point to commits reachable from `rev`.
+
+    :param repo: Repository to query for tags
+    :type repo: git.Repo
+
+    :param rev: Revision (usually a branch name) to start from
+    :type rev: str
+
+    :returns: List of tags reachable from `rev`
+    :rtype: list
+    """
+    output = repo.git.for_each_ref(
+        '--merged={}'.format(rev), '--format=%(refname)', 'refs/tags')
+    return [
+        git.refs.tag.TagReference(repo, ref_name)
+        for ref_name in output.splitlines() if ref_name
+    ]
+
+
+def tags_on_first_parent(
+        repo: git.Repo, rev: str) -> List[git.refs.tag.TagReference]:
+    """Return all the tags that point to the first-parent chain of `rev`.
+
+    Tags on commits only reachable through the second parent of a merge,
+    for example on a merged pull request branch, are ignored.
+
+    :param repo: Repository to query for tags
+    :type repo: git.Repo
+
+    :param rev: Revision (usually a branch name) to start from
+    :type rev: str
+
+    :returns: List of tags on the first-parent chain, newest first
+    :rtype: list
+    """
+    # NOTE: one line per commit, only the tags decorating it
+    output = repo.git.log(
+        '--first-parent', '--decorate-refs=refs/tags/', '--decorate=full',
+        '--format=%D', rev)
+    tags = []
+    for line in output.splitlines():
+        for decoration in line.split(', '):
+            if decoration.startswith('tag: '):
+                tags.append(git.refs.tag.TagReference(
+                    repo, decoration[len('tag: '):]))
+    return tags
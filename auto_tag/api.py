@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+In-process API.
+
+Lets other Python programs (ex. a release orchestrator) tag repositories
+without spawning the CLI. Open repositories and built detectors can be
+reused between calls:
+
+    repo = git.Repo('/path/to/repo')
+    detectors = DetectorsConfig.from_file('detectors.yaml').detectors
+    result = tag_repository(repo, 'master', detectors=detectors)
+    print(result.next_tag, result.created, result.pushed)
+"""
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Union
+
+import git
+
+from auto_tag import constants
+from auto_tag import core
+from auto_tag import detectors as auto_tag_detectors
+from auto_tag import detectors_config
+from auto_tag import tag_search_strategy
+
+
+def tag_repository(
+        repo: Union[str, git.Repo], branch: str = 'master',
+        detectors: Optional[Iterable[auto_tag_detectors.BaseDetector]] = None,
+        upstream_remotes: Optional[List[str]] = None,
+        search_strategy: Union[str, Callable] = constants.DEFAULT_SEARCH_STRATEGY,  # type: ignore
+        **kwargs: Any) -> core.AutoTagResult:
+    """Tag `branch` of `repo` and return what was done.
+
+    :param repo: Path to the repository or an already open git.Repo
+    :param branch: Branch to work on
+    :param detectors: Detectors to use, the default ones if not specified
+    :param upstream_remotes: Remotes to push the new tag to
+    :param search_strategy: Name of a search strategy or the strategy itself
+    :param **kwargs: Any other argument accepted by `core.AutoTag`
+
+    :returns: The result of the run
+    :rtype: core.AutoTagResult
+    """
+    if isinstance(search_strategy, str):
+        search_strategy = tag_search_strategy.SEARCH_METHODS_MAPPING[
+            search_strategy]
+    if detectors is None:
+        detectors = detectors_config.DEFAULT_DETECTORS
+
+    autotag = core.AutoTag(
+        repo=repo, branch=branch, upstream_remotes=upstream_remotes,
+        detectors=detectors, search_strategy=search_strategy, **kwargs)
+    return autotag.work()
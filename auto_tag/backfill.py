@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Compute the versions of a whole untagged history.
+
+Running auto-tag once per release point rescans the history from the
+last tag every time. A backfill instead walks the branch once:
+
+* the release points are the merge commits on the first-parent chain of
+  the branch (or every first-parent commit), oldest first
+* a single `git log --topo-order` pass assigns every commit to the first
+  release point containing it, children are listed before their parents
+  so the point of a commit is the earliest point among itself and its
+  children
+* the commits of every point are classified, in chronological order, and
+  the version is bumped accordingly
+
+The progress is written to a checkpoint file while the points are
+classified, an interrupted backfill resumes after the last point of the
+checkpoint. The planned tags are created in bulk by `create_tags`.
+"""
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import git
+import semantic_version
+
+from auto_tag import ancestry
+from auto_tag import changed_files
+from auto_tag import constants
+from auto_tag import core
+from auto_tag import detectors as auto_tag_detectors
+from auto_tag import tag_search_strategy
+from auto_tag import tag_writer
+
+
+class PlannedTag():  # pylint: disable=too-few-public-methods
+    """A tag the backfill would create."""
+
+    def __init__(self, tag: str, sha: str, previous: Optional[str],
+                 change_type: str, commits: int) -> None:
+        """Initialize the planned tag.
+
+        :param tag: Name of the tag
+        :param sha: Release point to tag
+        :param previous: Tag of the previous release point
+        :param change_type: Change type of the commits of the point
+        :param commits: Number of commits the point releases
+        """
+        self.tag = tag
+        self.sha = sha
+        self.previous = previous
+        self.change_type = change_type
+        self.commits = commits
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the planned tag as JSON serializable data."""
+        return {
+            'tag': self.tag,
+            'sha': self.sha,
+            'previous': self.previous,
+            'change_type': self.change_type,
+            'commits': self.commits,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PlannedTag':
+        """Return the planned tag stored by `to_dict`."""
+        return cls(data['tag'], data['sha'], data['previous'],
+                   data['change_type'], data['commits'])
+
+
+def release_points(repo: git.Repo, rev: str, exclude: Optional[str] = None,
+                   every_commit: bool = False) -> List[str]:
+    """Return the release points of a branch, oldest first.
+
+    :param repo: Repository to query
+    :param rev: Revision to walk from, usually a branch
+    :param exclude: Don't return the commits reachable from this revision
+    :param every_commit: Every first-parent commit is a release point,
+                         not only the merge commits
+    """
+    args = ['--first-parent', '--reverse']
+    if not every_commit:
+        args.append('--merges')
+    args.append(rev)
+    if exclude is not None:
+        args.append('^{}'.format(exclude))
+    return repo.git.rev_list(*args, '--').split()
+
+
+def segment(repo: git.Repo, rev: str, points: List[str],
+            exclude: Optional[str] = None) -> Dict[str, List[str]]:
+    """Assign every commit to the first release point containing it.
+
+    :param repo: Repository to query
+    :param rev: Revision to walk from, usually a branch
+    :param points: Release points, oldest first
+    :param exclude: Don't walk the commits reachable from this revision
+
+    :returns: Every release point mapped to its commits, newest first.
+              Commits after the last point are left out.
+    :rtype: dict
+    """
+    positions = {sha: position for position, sha in enumerate(points)}
+    args = ['--topo-order', '--format=%H %P', rev]
+    if exclude is not None:
+        args.append('^{}'.format(exclude))
+
+    commits: Dict[str, List[str]] = {sha: [] for sha in points}
+    # NOTE: the earliest point of the children already read, per parent
+    pending: Dict[str, int] = {}
+    for line in repo.git.log(*args, '--').splitlines():
+        sha, *parents = line.split()
+        candidates = [position for position in (
+            positions.get(sha), pending.pop(sha, None)) if position is not None]
+        if not candidates:
+            continue
+        first = min(candidates)
+        commits[points[first]].append(sha)
+        for parent in parents:
+            if parent not in pending or first < pending[parent]:
+                pending[parent] = first
+    return commits
+
+
+def create_tags(repo: git.Repo, plan: List[PlannedTag],
+                pack_refs: bool = False) -> None:
+    """Create all the planned tags, or none if one of them exists.
+
+    :param repo: Repository to create the tags in
+    :param plan: Planned tags
+    :param pack_refs: Pack the refs once the tags are created
+    """
+    writer = tag_writer.BulkTagWriter(repo, pack_refs=pack_refs)
+    for planned in plan:
+        writer.add(planned.tag, planned.sha, 'Release {}'.format(planned.tag))
+    writer.commit()
+
+
+class Backfill():  # pylint: disable=too-few-public-methods
+    """Plan the tags of every release point of a branch."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, repo: git.Repo, branch: str,
+            detectors: Iterable[auto_tag_detectors.BaseDetector],
+            every_commit: bool = False, append_v: bool = False,
+            checkpoint: Optional[str] = None,
+            checkpoint_every: int = constants.DEFAULT_CHECKPOINT_EVERY,
+            logger: Optional[Any] = None, **kwargs: Any) -> None:
+        """Initialize the backfill.
+
+        :param repo: Repository to backfill
+        :param branch: Branch to backfill
+        :param detectors: Detectors used to classify every release point
+        :param every_commit: Every first-parent commit is a release point,
+                             not only the merge commits
+        :param append_v: Append a v to the tags (ex v1.0.5)
+        :param checkpoint: File to store the progress in, the backfill
+                           resumes from it if it exists
+        :param checkpoint_every: Number of release points classified
+                                 between two checkpoints
+        :param logger: If specified what logger to use
+        :param kwargs: Passed to `core.AutoTag`, ex. `search_strategy`
+        """
+        self._repo = repo
+        self._branch = branch
+        self._every_commit = every_commit
+        self._append_v = append_v
+        self._checkpoint = checkpoint
+        self._checkpoint_every = checkpoint_every
+        self._logger = logger or logging.getLogger(__name__)
+        self._detectors = list(detectors)
+        self._autotag = core.AutoTag(
+            repo=repo, branch=branch, upstream_remotes=None,
+            detectors=self._detectors, logger=self._logger, **kwargs)
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Return the saved progress, None if there is nothing to resume."""
+        if not self._checkpoint or not os.path.isfile(self._checkpoint):
+            return None
+        with open(self._checkpoint, encoding='utf-8') as stream:
+            state = json.load(stream)
+        if state['branch'] != self._branch or not ancestry.is_ancestor(
+                self._repo, state['point'], self._branch):
+            self._logger.warning(
+                'Checkpoint %s doesn\'t match %s, starting over',
+                self._checkpoint, self._branch)
+            return None
+        self._logger.info('Resuming after %d planned tags',
+                          len(state['plan']))
+        return state
+
+    def _save_checkpoint(self, plan: List[PlannedTag]) -> None:
+        """Atomically store the progress."""
+        if not self._checkpoint or not plan:
+            return
+        state = {
+            'branch': self._branch,
+            'point': plan[-1].sha,
+            'tag': plan[-1].tag,
+            'plan': [planned.to_dict() for planned in plan],
+        }
+        tmp_path = '{}.{}.{}.tmp'.format(
+            self._checkpoint, os.getpid(), time.time_ns())
+        with open(tmp_path, 'w', encoding='utf-8') as stream:
+            json.dump(state, stream)
+        os.replace(tmp_path, self._checkpoint)
+
+    def _start(self) -> Tuple[
+            List[PlannedTag], Optional[str], Optional[str],
+            Optional[semantic_version.Version]]:
+        """Return where to continue from.
+
+        :returns: The plan so far, the commit and the tag to continue from
+                  and the version of that tag
+        :rtype: (list, str, str, semantic_version.Version)
+        """
+        state = self._load_checkpoint()
+        if state is not None:
+            plan = [PlannedTag.from_dict(data) for data in state['plan']]
+            return (plan, state['point'], state['tag'],
+                    semantic_version.Version(
+                        tag_search_strategy.clean_tag_name(state['tag'])))
+
+        last_tag, version = self._autotag.get_latest_tag(self._repo)
+        if last_tag is None:
+            return [], None, None, None
+        return [], last_tag.commit.hexsha, last_tag.name, version
+
+    def run(self) -> List[PlannedTag]:
+        """Plan a tag for every release point after the last tag.
+
+        :returns: The planned tags, oldest first, including the ones
+                  resumed from the checkpoint
+        :rtype: list
+        """
+        plan, exclude, previous, version = self._start()
+        points = release_points(
+            self._repo, self._branch, exclude, self._every_commit)
+        commits = segment(self._repo, self._branch, points, exclude)
+        self._logger.info('Planning %d release points', len(points))
+
+        changed = None
+        if any(detector.needs_changed_files for detector in self._detectors):
+            rev = self._branch if exclude is None else '{}..{}'.format(
+                exclude, self._branch)
+            changed = changed_files.read_changed_files(
+                self._repo, rev)
+
+        for index, point in enumerate(points, 1):
+            change_type, _ = self._autotag.classify(
+                [self._repo.commit(sha) for sha in commits[point]],
+                changed_files=changed)
+            version = self._autotag.bump_tag(version, change_type)
+            tag = 'v{}'.format(version) if self._append_v else str(version)
+            plan.append(PlannedTag(
+                tag, point, previous, constants.CHANGE_TYPES[change_type],
+                len(commits[point])))
+            previous = tag
+            if index % self._checkpoint_every == 0:
+                self._save_checkpoint(plan)
+        self._save_checkpoint(plan)
+        return plan
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Bound the commit scan of a run.
+
+When the last tag can't be found, or is hundreds of thousands of commits
+behind the branch, reading and classifying every new commit takes
+minutes. A `ScanBudget` limits the number of commits and the time spent
+scanning them. What happens once it is exhausted is decided by the run's
+budget policy (see `constants.BUDGET_POLICIES`): fail, assume a change
+type for the commits that were not scanned, or stop and leave the full
+run to a background process.
+"""
+import time
+from typing import Callable, Optional
+
+
+class ScanBudget():
+    """Limits on the number of commits scanned and the time it takes."""
+
+    def __init__(self, max_commits: Optional[int] = None,
+                 max_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the budget, the time starts running right away.
+
+        :param max_commits: Maximum number of commits to scan
+        :param max_seconds: Maximum number of seconds to scan for
+        :param clock: Monotonic clock the time is measured with
+        """
+        self._max_commits = max_commits
+        self._max_seconds = max_seconds
+        self._clock = clock
+        self._start = clock()
+        #: Number of commits scanned so far
+        self.commits = 0
+        #: True once there were more commits than the budget allows
+        self.exhausted = False
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if there is any limit."""
+        return self._max_commits is not None or self._max_seconds is not None
+
+    @property
+    def elapsed(self) -> float:
+        """Return the seconds since the budget was created."""
+        return self._clock() - self._start
+
+    def take(self, count: int) -> int:
+        """Spend the budget on `count` more commits.
+
+        :returns: How many of them fit in the budget, less than `count`
+                  once the budget is exhausted
+        :rtype: int
+        """
+        if self.exhausted:
+            return 0
+        allowed = count
+        if self._max_commits is not None:
+            allowed = min(allowed, self._max_commits - self.commits)
+        if self._max_seconds is not None and self.elapsed > self._max_seconds:
+            allowed = 0
+        self.commits += allowed
+        self.exhausted = allowed < count
+        return allowed
+
+    def describe(self) -> str:
+        """Return a human readable summary of what was spent."""
+        return '{} commits in {:.1f}s'.format(self.commits, self.elapsed)
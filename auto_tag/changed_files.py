@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Files changed by commits.
+
+The paths for a whole range are read from a single `git log --name-only`
+stream instead of computing a diff for every commit. Merge commits are
+compared with their first parent, so a merge reports everything it
+brought in. Renames are not detected, a renamed file is reported with its
+old and its new path.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # NOTE: only needed for annotations, see `auto_tag.detectors`
+    import git
+
+ChangedFiles = Dict[str, Tuple[str, ...]]
+
+_COMMIT_MARKER = '\x00'
+
+
+def _git(repo: git.Repo) -> git.cmd.Git:
+    """Return a git command that doesn't quote unusual paths."""
+    return repo.git(c='core.quotePath=false')
+
+
+_LOG_ARGS = ['--name-only', '--no-renames', '--diff-merges=first-parent',
+             '--format=%x00%H']
+
+
+def _parse(output: str) -> ChangedFiles:
+    """Return the paths of every commit listed by `git log`."""
+    changed: ChangedFiles = {}
+    for chunk in output.split(_COMMIT_MARKER):
+        lines = chunk.splitlines()
+        if not lines:
+            continue
+        changed[lines[0]] = tuple(line for line in lines[1:] if line)
+    return changed
+
+
+def read_changed_files(repo: git.Repo, rev: str,
+                       first_parent: bool = False,
+                       max_count: Optional[int] = None) -> ChangedFiles:
+    """Return the files changed by every commit of a range.
+
+    :param repo: Repository to query
+    :type repo: git.Repo
+
+    :param rev: Range to read, ex. `1.0.0..master`
+    :type rev: str
+
+    :param first_parent: Only follow the first parent of merges
+    :type first_parent: bool
+
+    :param max_count: Only read the newest commits of the range
+    :type max_count: int
+
+    :returns: The sha of every commit mapped to the paths it changed
+    :rtype: dict
+    """
+    args = list(_LOG_ARGS)
+    if first_parent:
+        args.append('--first-parent')
+    if max_count is not None:
+        args.append('--max-count={}'.format(max_count))
+    return _parse(_git(repo).log(*args, rev))
+
+
+def read_commits_changed_files(repo: git.Repo,
+                               shas: List[str]) -> ChangedFiles:
+    """Return the files changed by some commits, without walking a range.
+
+    Used when only part of a range is scanned, ex. batch by batch until
+    the scan budget is exhausted.
+
+    :param repo: Repository to query
+    :type repo: git.Repo
+
+    :param shas: Commits to read
+    :type shas: list
+
+    :returns: The sha of every commit mapped to the paths it changed
+    :rtype: dict
+    """
+    if not shas:
+        return {}
+    return _parse(_git(repo).log('--no-walk=unsorted', *_LOG_ARGS, *shas))
+
+
+def commit_changed_files(commit: git.objects.commit.Commit) -> Tuple[
+        str, ...]:
+    """Return the files changed by a single commit.
+
+    Only meant for commits evaluated outside of a run, a run reads all
+    the paths with `read_changed_files`.
+    """
+    args = ['-r', '--name-only', '--no-renames', '--no-commit-id']
+    if commit.parents:
+        args.append(commit.parents[0].hexsha)
+    else:
+        args.append('--root')
+    output = _git(commit.repo).diff_tree(*args, commit.hexsha)
+    return tuple(line for line in output.splitlines() if line)
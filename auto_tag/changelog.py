@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Release notes for many releases at once.
+
+Regenerating the notes of every release one tag pair at a time reads the
+overlapping history again for every pair. Here the history is walked
+once (see `auto_tag.timeline.walk_commits`) and cut at the release
+boundaries: every commit is read exactly once and lands in the notes of
+the first release containing it.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import git
+
+from auto_tag import timeline
+
+UNRELEASED = 'Unreleased'
+
+
+class ReleaseNotes():  # pylint: disable=too-few-public-methods
+    """The commits of a release."""
+
+    def __init__(self, tag: Optional[str], previous: Optional[str],
+                 commits: List[Tuple[str, str]]) -> None:
+        """Initialize the notes.
+
+        :param tag: Tag of the release, None for the commits that are not
+                    released yet
+        :param previous: Tag of the previous release, None if the walk
+                         started before it
+        :param commits: Sha and heading of every commit, newest first
+        """
+        self.tag = tag
+        self.previous = previous
+        self.commits = commits
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the notes as JSON serializable data."""
+        return {
+            'tag': self.tag,
+            'previous': self.previous,
+            'commits': [{'sha': sha, 'heading': heading}
+                        for sha, heading in self.commits],
+        }
+
+
+def generate(repo: git.Repo, rev: str,
+             since: Optional[str] = None) -> List[ReleaseNotes]:
+    """Return the notes of every release reachable from `rev`.
+
+    :param repo: Repository to query
+    :param rev: Last revision to include, usually a branch or a tag
+    :param since: Only include the releases after this tag
+
+    :returns: The notes of every release, newest first, preceded by the
+              commits that are not released yet if there are any
+    :rtype: list
+    """
+    releases: List[timeline.ReleaseKey] = []
+    commits: Dict[Optional[str], List[Tuple[str, str]]] = {}
+    for sha, first, tagged, message in timeline.walk_commits(
+            repo, rev, since, messages=True):
+        releases.extend(tagged)
+        commits.setdefault(first[1] if first else None, []).append(
+            (sha, message.split('\n', 1)[0].strip()))
+
+    tags = [tag for _, tag in sorted(releases, reverse=True)]
+    notes = []
+    if commits.get(None):
+        notes.append(ReleaseNotes(None, tags[0] if tags else since,
+                                  commits[None]))
+    for index, tag in enumerate(tags):
+        previous = tags[index + 1] if index + 1 < len(tags) else since
+        notes.append(ReleaseNotes(tag, previous, commits.get(tag, [])))
+    return notes
+
+
+def to_markdown(notes: List[ReleaseNotes]) -> str:
+    """Render release notes as Markdown, one section per release."""
+    sections = []
+    for release in notes:
+        lines = ['## {}'.format(release.tag or UNRELEASED), '']
+        lines.extend('* {}'.format(heading) for _, heading in release.commits)
+        sections.append('\n'.join(lines))
+    return '\n\n'.join(sections) + '\n' if sections else ''
+
+
+def to_json(notes: List[ReleaseNotes]) -> str:
+    """Render release notes as a JSON list."""
+    return json.dumps([release.to_dict() for release in notes], indent=2)
@@ -1,30 +1,60 @@
 #!/usr/bin/env python3
 """
 CLI parser for auto-tag.
+
+This module is imported for every invocation (including `--help`) so it
+must only depend on the standard library and `auto_tag.constants`.
 """
 import logging
 import argparse
 
 from auto_tag import constants
-from auto_tag import tag_search_strategy
 
+COMMAND_INDEX = 'index'
+COMMAND_CHANGELOG = 'changelog'
+COMMAND_BACKFILL = 'backfill'
+COMMAND_WATCH = 'watch'
 
-def get_parser() -> argparse.ArgumentParser:
-    """Return the argument parser setup."""
-    parser = argparse.ArgumentParser(
-        description='Tag branch based on commit messages')
+COMMANDS = [
+    COMMAND_INDEX,
+    COMMAND_CHANGELOG,
+    COMMAND_BACKFILL,
+    COMMAND_WATCH,
+]
+
+
+def _add_repository_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments selecting the repository, branch and logging."""
     parser.add_argument('-b', '--branch', type=str, default='master',
                         help='On what branch to work on. Default `master`')
     parser.add_argument('-r', '--repo', type=str, default='.',
                         help='Path to repository. Default `.`')
-    parser.add_argument('-u', '--upstream_remote', type=str, nargs='*',
-                        help=('To what remote to push to.'
-                              'Can be specified multiple time.'))
     #  pylint:disable=no-member, protected-access
     parser.add_argument('-l', '--logging', type=str, default='INFO',
                         help='Logging level.',
                         choices=list(logging._nameToLevel.keys()))
 
+
+def _add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments selecting the detectors configuration."""
+    parser.add_argument('-c', '--config', type=str, default=None,
+                        help='Path to detectors configuration.')
+    parser.add_argument('--no-config-cache', action='store_true',
+                        help=('Don\'t cache the parsed configuration next to '
+                              'the configuration file.'))
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Return the argument parser setup."""
+    parser = argparse.ArgumentParser(
+        description='Tag branch based on commit messages',
+        epilog='Other commands: {}, see `auto-tag COMMAND --help`'.format(
+            ', '.join(COMMANDS)))
+    _add_repository_arguments(parser)
+    parser.add_argument('-u', '--upstream_remote', type=str, nargs='*',
+                        help=('To what remote to push to.'
+                              'Can be specified multiple time.'))
+
     parser.add_argument('--name', type=str, default=None,
                         help=('User name used for creating git objects.'
                               'If not specified the system one will be used.'))
@@ -32,8 +62,7 @@ def get_parser() -> argparse.ArgumentParser:
                         help=('Email name used for creating git objects.'
                               'If not specified the system one will be used.'))
 
-    parser.add_argument('-c', '--config', type=str, default=None,
-                        help='Path to detectors configuration.')
+    _add_config_arguments(parser)
 
     parser.add_argument('--skip-tag-if-one-already-present',
                         action='store_true',
@@ -45,7 +74,239 @@ def get_parser() -> argparse.ArgumentParser:
 
     parser.add_argument('--tag-search-strategy',
                         choices=constants.SEARCH_STRATEGYS,
-                        default=tag_search_strategy.DEFAULT_STRAGETY_NAME,
+                        default=constants.DEFAULT_SEARCH_STRATEGY,
                         help='Strategy for searching the tag.')
 
+    parser.add_argument('--commit-graph',
+                        choices=constants.COMMIT_GRAPH_MODES,
+                        default=constants.COMMIT_GRAPH_USE,
+                        help=('How to handle the git commit-graph used to '
+                              'speed up ancestry checks. `use` only reads an '
+                              'existing one, `write-if-missing` creates it '
+                              'when absent and `refresh` always updates it.'))
+
+    parser.add_argument('--deepen-from', type=str, default=None,
+                        help=('If the repository is a shallow clone, deepen '
+                              'it from this remote until a tag is found.'))
+    parser.add_argument('--deepen-step', type=int,
+                        default=constants.DEFAULT_DEEPEN_STEP,
+                        help=('Number of commits fetched by the first '
+                              'deepening step, it doubles after each step. '
+                              'Default `{}`').format(
+                                  constants.DEFAULT_DEEPEN_STEP))
+
+    parser.add_argument('--first-parent', action='store_true',
+                        help=('Only follow the first parent of merge '
+                              'commits, when searching for tags on the '
+                              'branch and when reading the new commits.'))
+
+    parser.add_argument('--merge-units', action='store_true',
+                        help=('Used with --first-parent, classify every '
+                              'merge commit together with the commits it '
+                              'merged.'))
+
+    parser.add_argument('--no-detector-pushdown', action='store_false',
+                        dest='detector_pushdown',
+                        help=('Evaluate every commit in Python instead of '
+                              'letting git preselect the commits matching '
+                              'the detectors. Slower, but the hits of all '
+                              'the detectors are reported.'))
+
+    parser.add_argument('--pipeline', action='store_true',
+                        help=('Classify the new commits while a reader '
+                              'thread streams them from git, instead of '
+                              'listing them all first. Faster on large '
+                              'ranges and cold caches.'))
+
+    parser.add_argument('--release-pointer', action='store_true',
+                        help=('Record the created tag in '
+                              'refs/auto-tag/last/<branch> and start the '
+                              'next run from it, if it still exists and is '
+                              'on the branch, instead of searching all the '
+                              'tags. Tags created by hand after the last '
+                              'run are not seen.'))
+
+    parser.add_argument('--prerelease', metavar='CHANNEL',
+                        help=('Create a pre-release of the next version on '
+                              'this channel instead of a release, ex. '
+                              '1.2.0-rc.1 for `--prerelease rc`. The version '
+                              'is bumped from the last stable tag and the '
+                              'counter from the last pre-release of it.'))
+
+    parser.add_argument('--max-tag-retries', type=int,
+                        default=constants.DEFAULT_MAX_TAG_RETRIES,
+                        help=('How many times to compute the tag again when '
+                              'another run created it first. The first '
+                              'upstream remote decides who owns a tag. '
+                              'Default `{}`').format(
+                                  constants.DEFAULT_MAX_TAG_RETRIES))
+
+    parser.add_argument('--max-commits', type=int, default=None,
+                        help=('Scan at most this many new commits, the '
+                              'newest ones. See --budget-policy.'))
+    parser.add_argument('--max-scan-seconds', type=float, default=None,
+                        help=('Scan the new commits for at most this many '
+                              'seconds. See --budget-policy.'))
+    parser.add_argument('--budget-policy', choices=constants.BUDGET_POLICIES,
+                        default=constants.BUDGET_POLICY_FAIL,
+                        help=('What to do when there are more commits than '
+                              'the scan budget allows: `fail`, `assume-*` '
+                              'tags with at least that bump, `background` '
+                              'doesn\'t tag and runs auto-tag again without '
+                              'a budget in a detached process, logging to '
+                              '`{}` in the git directory. Default `{}`'
+                              ).format(constants.DEFAULT_BACKGROUND_LOG,
+                                       constants.BUDGET_POLICY_FAIL))
+    parser.add_argument('--no-scan-budget', action='store_true',
+                        help=('Ignore --max-commits and --max-scan-seconds, '
+                              'used by the background run.'))
+
+    parser.add_argument('--profile', action='store_true',
+                        help=('Log the wall time, CPU time and call count '
+                              'of every phase of the run.'))
+    parser.add_argument('--profile-pstats', type=str, default=None,
+                        help=('Profile the whole run with cProfile and dump '
+                              'the statistics to this file.'))
+    parser.add_argument('--profile-collapsed', type=str, default=None,
+                        help=('Sample the stack during the whole run and '
+                              'write a flamegraph compatible collapsed stack '
+                              'file.'))
+
+    parser.add_argument('--metrics-file', type=str, default=None,
+                        help=('Write the cost of the run (phase durations, '
+                              'tags and commits read, detector hits, push '
+                              'latency) as an OpenMetrics textfile, ex. for '
+                              'the node-exporter textfile collector.'))
+
+    return parser
+
+
+def get_watch_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the `watch` command.
+
+    It accepts all the tagging arguments, they apply to every run.
+    """
+    parser = get_parser()
+    parser.prog = 'auto-tag {}'.format(COMMAND_WATCH)
+    parser.description = (
+        'Keep running and tag a branch every time it moves, instead of '
+        'polling auto-tag. The metrics and profiling arguments are ignored.')
+    parser.epilog = None
+    parser.add_argument('branches', nargs='*', metavar='BRANCH',
+                        help=('Branches to watch, before the other '
+                              'arguments. Default the --branch one.'))
+    parser.add_argument('--interval', type=float,
+                        default=constants.DEFAULT_WATCH_INTERVAL,
+                        help=('Seconds between two checks of the branches. '
+                              'Default `{}`').format(
+                                  constants.DEFAULT_WATCH_INTERVAL))
+    parser.add_argument('--debounce', type=float,
+                        default=constants.DEFAULT_WATCH_DEBOUNCE,
+                        help=('Seconds a branch must not move before it is '
+                              'tagged. Default `{}`').format(
+                                  constants.DEFAULT_WATCH_DEBOUNCE))
+    parser.add_argument('--run-on-start', action='store_true',
+                        help='Tag the branches once before watching them.')
+    parser.add_argument('--max-runs', type=int, default=None,
+                        help='Stop after tagging this many times.')
+    return parser
+
+
+def get_index_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the `index` command."""
+    parser = argparse.ArgumentParser(
+        prog='auto-tag {}'.format(COMMAND_INDEX),
+        description=('Build or update the release timeline index of a '
+                     'branch, or query it without running git.'))
+    _add_repository_arguments(parser)
+    _add_config_arguments(parser)
+    parser.add_argument('--database', type=str, default=None,
+                        help=('Path to the index. Default `{}` in the git '
+                              'directory').format(constants.DEFAULT_INDEX_FILE))
+    parser.add_argument('--rebuild', action='store_true',
+                        help=('Read the whole history again, ex. after '
+                              'changing the detectors or tagging old '
+                              'commits.'))
+
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument('--contains', type=str, default=None,
+                       metavar='COMMIT',
+                       help=('Print the first release containing COMMIT '
+                             '(full or abbreviated sha) instead of '
+                             'updating the index.'))
+    query.add_argument('--show', type=str, default=None, metavar='TAG',
+                       help='Print a release as JSON.')
+    query.add_argument('--list', action='store_true',
+                       help='Print all the releases as JSON.')
+    return parser
+
+
+def get_changelog_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the `changelog` command."""
+    parser = argparse.ArgumentParser(
+        prog='auto-tag {}'.format(COMMAND_CHANGELOG),
+        description=('Print the notes of many releases, reading every '
+                     'commit once.'))
+    _add_repository_arguments(parser)
+    parser.add_argument('--from', type=str, default=None, dest='since',
+                        metavar='TAG',
+                        help=('Only include the releases after this tag. '
+                              'Default all the releases.'))
+    parser.add_argument('--to', type=str, default=None, metavar='REV',
+                        help=('Last revision to include, ex. a tag. Default '
+                              'the branch, with the commits that are not '
+                              'released yet.'))
+    parser.add_argument('--format', choices=constants.CHANGELOG_FORMATS,
+                        default=constants.CHANGELOG_FORMAT_MARKDOWN,
+                        help='Output format. Default `{}`'.format(
+                            constants.CHANGELOG_FORMAT_MARKDOWN))
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='Write the changelog to this file.')
+    return parser
+
+
+def get_backfill_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the `backfill` command."""
+    parser = argparse.ArgumentParser(
+        prog='auto-tag {}'.format(COMMAND_BACKFILL),
+        description=('Plan a tag for every merge commit after the last '
+                     'tag, walking the branch once.'))
+    _add_repository_arguments(parser)
+    _add_config_arguments(parser)
+    parser.add_argument('--tag-search-strategy',
+                        choices=constants.SEARCH_STRATEGYS,
+                        default=constants.DEFAULT_SEARCH_STRATEGY,
+                        help='Strategy for searching the last tag.')
+    parser.add_argument('--every-commit', action='store_true',
+                        help=('Plan a tag for every commit on the '
+                              'first-parent chain, not only the merges.'))
+    parser.add_argument('--append-v-to-tag', action='store_true',
+                        help='Append a v to the tag (ex v1.0.5)')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help=('Store the progress in this file and resume '
+                              'from it if it exists.'))
+    parser.add_argument('--checkpoint-every', type=int,
+                        default=constants.DEFAULT_CHECKPOINT_EVERY,
+                        help=('Number of release points planned between '
+                              'two checkpoints. Default `{}`').format(
+                                  constants.DEFAULT_CHECKPOINT_EVERY))
+    parser.add_argument('--format', choices=constants.BACKFILL_FORMATS,
+                        default=constants.BACKFILL_FORMAT_TEXT,
+                        help=('Output format, `text` prints the tag, the '
+                              'commit and the change type. Default `{}`'
+                              ).format(constants.BACKFILL_FORMAT_TEXT))
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='Write the plan to this file.')
+    parser.add_argument('--apply', action='store_true',
+                        help=('Create all the planned tags with a single ref '
+                              'transaction, none is created if one of them '
+                              'already exists.'))
+    parser.add_argument('--pack-refs', action='store_true',
+                        help='Pack the refs after creating the tags.')
+    parser.add_argument('--name', type=str, default=None,
+                        help=('Tagger name used by --apply. If not specified '
+                              'the system one will be used.'))
+    parser.add_argument('--email', type=str, default=None,
+                        help=('Tagger email used by --apply. If not '
+                              'specified the system one will be used.'))
     return parser
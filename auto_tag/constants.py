@@ -24,11 +24,102 @@ SEARCH_STRATEGYS = [
     SEARCH_STRATEGY_LATEST_TAG_IN_BRANCH,
 ]
 
+DEFAULT_SEARCH_STRATEGY = SEARCH_STRATEGY_BIGGEST_TAG_IN_BRANCH
+
 CHANGE_TYPES = dict(CHANGE_TYPE_PAIRS)
 CHANGE_TYPES_REVERSE = {name: value for value, name in CHANGE_TYPE_PAIRS}
 
 PREFIX_TO_ELIMINATE = ['v']
 
+# NOTE: what part of the commit message the message detectors read
+SCOPE_MESSAGE = 'message'
+SCOPE_HEAD = 'head'
+SCOPE_LINES = 'lines'
+SCOPE_CHARS = 'chars'
+SCOPE_TRAILERS = 'trailers'
+
+SCOPES = [
+    SCOPE_MESSAGE,
+    SCOPE_HEAD,
+    SCOPE_LINES,
+    SCOPE_CHARS,
+    SCOPE_TRAILERS,
+]
+
+# NOTE: scopes that need a `scope_limit`
+LIMITED_SCOPES = [SCOPE_LINES, SCOPE_CHARS]
+
+COMMIT_GRAPH_USE = 'use'
+COMMIT_GRAPH_WRITE_IF_MISSING = 'write-if-missing'
+COMMIT_GRAPH_REFRESH = 'refresh'
+
+COMMIT_GRAPH_MODES = [
+    COMMIT_GRAPH_USE,
+    COMMIT_GRAPH_WRITE_IF_MISSING,
+    COMMIT_GRAPH_REFRESH,
+]
+
+DEFAULT_DEEPEN_STEP = 50
+
+CHANGELOG_FORMAT_MARKDOWN = 'markdown'
+CHANGELOG_FORMAT_JSON = 'json'
+
+CHANGELOG_FORMATS = [
+    CHANGELOG_FORMAT_MARKDOWN,
+    CHANGELOG_FORMAT_JSON,
+]
+
+BACKFILL_FORMAT_TEXT = 'text'
+BACKFILL_FORMAT_JSON = 'json'
+
+BACKFILL_FORMATS = [
+    BACKFILL_FORMAT_TEXT,
+    BACKFILL_FORMAT_JSON,
+]
+
+# NOTE: release points classified between two backfill checkpoints
+DEFAULT_CHECKPOINT_EVERY = 100
+
+# NOTE: created in the git directory of the repository
+DEFAULT_INDEX_FILE = 'auto-tag-index.sqlite'
+
+# NOTE: commits per batch and batches queued by the commit reader
+DEFAULT_PIPELINE_BATCH = 256
+DEFAULT_PIPELINE_DEPTH = 8
+
+# NOTE: seconds between two polls of the watched branches and seconds a
+# branch must not move before it is run
+DEFAULT_WATCH_INTERVAL = 1.0
+DEFAULT_WATCH_DEBOUNCE = 3.0
+
+BUDGET_POLICY_FAIL = 'fail'
+BUDGET_POLICY_ASSUME_PATCH = 'assume-patch'
+BUDGET_POLICY_ASSUME_MINOR = 'assume-minor'
+BUDGET_POLICY_ASSUME_MAJOR = 'assume-major'
+BUDGET_POLICY_BACKGROUND = 'background'
+
+BUDGET_POLICIES = [
+    BUDGET_POLICY_FAIL,
+    BUDGET_POLICY_ASSUME_PATCH,
+    BUDGET_POLICY_ASSUME_MINOR,
+    BUDGET_POLICY_ASSUME_MAJOR,
+    BUDGET_POLICY_BACKGROUND,
+]
+
+# NOTE: change type of the commits a budget limited run didn't scan
+BUDGET_ASSUMED_CHANGE_TYPES = {
+    BUDGET_POLICY_ASSUME_PATCH: PATCH,
+    BUDGET_POLICY_ASSUME_MINOR: MINOR,
+    BUDGET_POLICY_ASSUME_MAJOR: MAJOR,
+}
+
+# NOTE: created in the git directory of the repository
+DEFAULT_BACKGROUND_LOG = 'auto-tag-background.log'
+
+DEFAULT_MAX_TAG_RETRIES = 10
+# NOTE: seconds, doubled on every retry
+DEFAULT_RETRY_BACKOFF = 0.05
+
 DEFAULT_CONFIG_DETECTORS = """
 detectors:
 
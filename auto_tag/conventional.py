@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Conventional Commits parser.
+
+Parses a commit message following https://www.conventionalcommits.org in
+a single pass over its lines:
+
+    feat(api)!: remove the v1 endpoints
+
+    The v1 endpoints were deprecated a year ago.
+
+    BREAKING CHANGE: clients must use /v2
+    Reviewed-by: Jane
+"""
+import re
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+_HEADER = re.compile(
+    r'(?P<type>[A-Za-z0-9_-]+)(?:\((?P<scope>[^()]*)\))?(?P<breaking>!)?:\s')
+_TRAILER = re.compile(r'(?P<token>BREAKING CHANGE|[A-Za-z0-9-]+)(?::\s| #)')
+
+BREAKING_TOKENS = ('BREAKING CHANGE', 'BREAKING-CHANGE')
+
+
+class ConventionalCommit():  # pylint: disable=too-few-public-methods
+    """A parsed commit message."""
+
+    def __init__(self, commit_type: Optional[str], scope: Optional[str],
+                 breaking: bool, description: str,
+                 trailers: List[Tuple[str, str]]) -> None:
+        """Initialize the parsed message.
+
+        :param commit_type: Lower case type, None if the header doesn't
+                            follow the specification
+        :param scope: Scope of the change if one was specified
+        :param breaking: True if the header has `!` or a breaking change
+                         trailer is present
+        :param description: The header, without type and scope
+        :param trailers: Every trailer as (token, value), in order
+        """
+        self.type = commit_type
+        self.scope = scope
+        self.breaking = breaking
+        self.description = description
+        self.trailers = trailers
+
+
+def _parse_trailer(line: str) -> Optional[Tuple[str, str]]:
+    """Return (token, value) if the line starts a trailer."""
+    match = _TRAILER.match(line)
+    if match is None:
+        return None
+    return match.group('token'), line[match.end():].strip()
+
+
+def parse_trailers(lines: List[str]) -> List[Tuple[str, str]]:
+    """Return the trailers of a message, from its last paragraph.
+
+    The last paragraph only holds trailers if it starts with a trailer.
+    A value runs on until the next `token: ` or `token #` line, so the
+    lines that don't start a trailer are part of the previous one.
+
+    :param lines: Lines of the message, without the header
+    """
+    trailers: List[Tuple[str, str]] = []
+    valid = True
+    for line in lines:
+        if not line.strip():
+            trailers, valid = [], True
+            continue
+        if not valid:
+            continue
+        trailer = _parse_trailer(line)
+        if trailer is not None:
+            trailers.append(trailer)
+        elif trailers:
+            token, value = trailers[-1]
+            trailers[-1] = (token, '{}\n{}'.format(value, line.strip()))
+        else:
+            valid = False
+    return trailers if valid else []
+
+
+def _is_breaking_change(line: str) -> bool:
+    """Return True if the line starts a breaking change footer."""
+    trailer = _parse_trailer(line)
+    return trailer is not None and trailer[0] in BREAKING_TOKENS
+
+
+def trailer_block(message: str) -> str:
+    """Return the trailers paragraph of a message, empty if there is none.
+
+    Only the end of the message is read, so the cost doesn't depend on
+    the size of the body.
+    """
+    end = len(message)
+    while end and message[end - 1] == '\n':
+        end -= 1
+    start = message.rfind('\n\n', 0, end)
+    if start == -1:
+        # NOTE: a single paragraph is the header, it has no trailers
+        return ''
+    block = message[start + 2:end]
+    return block if parse_trailers(block.split('\n')) else ''
+
+
+def parse(message: str) -> ConventionalCommit:
+    """Parse a commit message.
+
+    :param message: The whole commit message
+
+    :returns: The parsed message, with a None type if the header doesn't
+              follow the specification
+    :rtype: ConventionalCommit
+    """
+    header, *lines = message.strip('\n').split('\n')
+    trailers = parse_trailers(lines)
+    # NOTE: a breaking change footer counts even if it is followed by
+    # another paragraph
+    breaking = any(_is_breaking_change(line) for line in lines)
+
+    match = _HEADER.match(header)
+    if match is None:
+        return ConventionalCommit(None, None, breaking, header, trailers)
+    return ConventionalCommit(
+        match.group('type').lower(), match.group('scope'),
+        breaking or bool(match.group('breaking')),
+        header[match.end():].strip(), trailers)
@@ -2,39 +2,156 @@
 """
 Automatically tags branches base on commit message
 """
+import contextlib
 import logging
+import random
+import time
 from typing import (
+    Any,
     Callable,
+    Dict,
     Tuple,
     Optional,
     List,
     Iterable,
+    Union,
 )
 
 import semantic_version
 import git
 
+from auto_tag import ancestry
+from auto_tag import budget as auto_tag_budget
+from auto_tag import changed_files as auto_tag_changed_files
 from auto_tag import constants
 from auto_tag import detectors as auto_tag_detectors
+from auto_tag import exception
 from auto_tag import git_custom_env
+from auto_tag import metrics as auto_tag_metrics
+from auto_tag import pipeline as auto_tag_pipeline
+from auto_tag import prerelease as auto_tag_prerelease
+from auto_tag import profiling
+from auto_tag import pushdown
+from auto_tag import release_pointer as auto_tag_release_pointer
+from auto_tag import shallow
 from auto_tag import tag_search_strategy
-
-
-class AutoTag():
+from auto_tag import tag_writer
+
+
+class AutoTagResult():  # pylint: disable=too-many-instance-attributes
+    """Outcome of an `AutoTag.work` call."""
+
+    def __init__(self, branch: str) -> None:
+        """Initialize an empty result for `branch`."""
+        self.branch = branch
+        #: Name of the tag the new version is based on
+        self.last_tag: Optional[str] = None
+        #: Commits the range starts (excluded) and ends at
+        self.commit_range: Tuple[Optional[str], Optional[str]] = (None, None)
+        #: Sha of every commit in the range, newest first
+        self.commits: List[str] = []
+        #: Name of every detector mapped to the commits it triggered on
+        self.detector_hits: Dict[str, List[str]] = {}
+        self.change_type: int = constants.PATCH
+        self.next_tag: Optional[str] = None
+        #: True if the tag was created by this run
+        self.created: bool = False
+        #: Every remote the tag was pushed to mapped to the outcome
+        self.pushed_remotes: Dict[str, bool] = {}
+        #: How many times a tag was computed, more than one if another
+        #: run took the version first
+        self.attempts: int = 0
+        #: True if the scan budget was exhausted, only the newest commits
+        #: were scanned
+        self.budget_limited: bool = False
+
+    @property
+    def change_type_name(self) -> str:
+        """Return the name of the change type (MAJOR, MINOR, PATCH)."""
+        return constants.CHANGE_TYPES[self.change_type]
+
+    @property
+    def pushed(self) -> bool:
+        """Return True if the tag reached all the requested remotes."""
+        return bool(self.pushed_remotes) and all(
+            self.pushed_remotes.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the result as JSON serializable data."""
+        return {
+            'branch': self.branch,
+            'last_tag': self.last_tag,
+            'commit_range': list(self.commit_range),
+            'commits': self.commits,
+            'detector_hits': self.detector_hits,
+            'change_type': self.change_type_name,
+            'next_tag': self.next_tag,
+            'created': self.created,
+            'pushed': self.pushed,
+            'pushed_remotes': self.pushed_remotes,
+            'attempts': self.attempts,
+            'budget_limited': self.budget_limited,
+        }
+
+
+class AutoTag():  # pylint: disable=too-many-instance-attributes
     """Class  wrapper for auto-tag functionality."""
 
-    def __init__(
-            self, repo: str, branch: str,
+    def __init__(  # pylint: disable=too-many-arguments, too-many-locals
+            self, repo: Union[str, git.Repo], branch: str,
             upstream_remotes: Optional[List[str]],
             detectors: Iterable[auto_tag_detectors.BaseDetector],
             search_strategy: Callable = tag_search_strategy.DEFAULT_STRATEGY,  # type: ignore
             git_name: Optional[str] = None,
             git_email: Optional[str] = None,
             logger: Optional[logging.Logger] = None,
-            append_v: bool = False, skip_if_exists: bool = False) -> None:
+            append_v: bool = False, skip_if_exists: bool = False,
+            commit_graph_mode: str = constants.COMMIT_GRAPH_USE,
+            deepen_remote: Optional[str] = None,
+            deepen_step: int = constants.DEFAULT_DEEPEN_STEP,
+            profiler: Optional[profiling.PhaseProfiler] = None,
+            metrics: Optional[auto_tag_metrics.RunMetrics] = None,
+            max_tag_retries: int = constants.DEFAULT_MAX_TAG_RETRIES,
+            retry_backoff: float = constants.DEFAULT_RETRY_BACKOFF,
+            first_parent: bool = False, merge_units: bool = False,
+            detector_pushdown: bool = True,
+            prerelease: Optional[str] = None,
+            pipeline: bool = False,
+            release_pointer: bool = False,
+            max_commits: Optional[int] = None,
+            max_scan_seconds: Optional[float] = None,
+            budget_policy: str = constants.BUDGET_POLICY_FAIL) -> None:
         """Initializa the AutoTag class.
 
+        :param repo: Path to the repository or an already open git.Repo,
+                     which is reused by every call to `work`
+        :param detectors: Detectors to evaluate, they can be shared between
+                          instances
         :param logger: If an existing logger is to be used
+        :param max_tag_retries: How many times to recompute the tag when
+                                another run created the same version first
+        :param retry_backoff: Base delay in seconds between two attempts,
+                              doubled on every attempt and randomized
+        :param first_parent: Only follow the first parent of merge commits,
+                             when searching for tags and reading commits
+        :param merge_units: With `first_parent`, classify every merge
+                            commit together with the commits it merged
+        :param detector_pushdown: Let git preselect the commits when all
+                                  the detectors can be pushed down, see
+                                  `auto_tag.pushdown`
+        :param prerelease: Create a pre-release of the next version on
+                           this channel (ex. `1.2.0-rc.1`) instead of a
+                           release, see `auto_tag.prerelease`
+        :param pipeline: Classify the new commits while a reader thread
+                         streams them from git, see `auto_tag.pipeline`
+        :param release_pointer: Start from the last tag created for the
+                                branch, if it is still valid, instead of
+                                searching, see `auto_tag.release_pointer`
+        :param max_commits: Scan at most this many new commits
+        :param max_scan_seconds: Scan the new commits for at most this many
+                                 seconds
+        :param budget_policy: What to do when a budget is exhausted, one
+                              of `constants.BUDGET_POLICIES`
         :param args: CLI arguments
         """
         self._logger = logger or logging.getLogger(__name__)
@@ -48,25 +165,100 @@ class AutoTag():
         self._append_v = append_v
 
         self._skip_if_exists = skip_if_exists
+        self._commit_graph_mode = commit_graph_mode
+        self._deepen_remote = deepen_remote
+        self._deepen_step = deepen_step
+        self._profiler = profiler or profiling.PhaseProfiler()
+        self._metrics = metrics
+        self._max_tag_retries = max_tag_retries
+        self._retry_backoff = retry_backoff
+        self._first_parent = first_parent
+        self._merge_units = merge_units and first_parent
+        self._detector_pushdown = detector_pushdown
+        if prerelease is not None:
+            auto_tag_prerelease.validate_channel(prerelease)
+        self._prerelease = prerelease
+        self._pipeline = pipeline
+        # NOTE: the pointer only follows releases, not pre-releases
+        self._release_pointer = release_pointer and prerelease is None
+        if budget_policy not in constants.BUDGET_POLICIES:
+            raise exception.ConfigurationError(
+                'Unknown budget policy {}, expected one of {}'.format(
+                    budget_policy, ', '.join(constants.BUDGET_POLICIES)))
+        self._max_commits = max_commits
+        self._max_scan_seconds = max_scan_seconds
+        self._budget_policy = budget_policy
+
+    @property
+    def profiler(self) -> profiling.PhaseProfiler:
+        """Return the profiler that times the phases of `work`."""
+        return self._profiler
 
     def get_latest_tag(self, repo: git.Repo) -> Tuple[Optional[
             git.refs.tag.TagReference], Optional[semantic_version.Version]]:
         """Return the last tag for the given repo in a Version class.
 
+        If the release pointer of the branch is used and valid, its tag is
+        returned without searching. Otherwise, if the repository is a
+        shallow clone and a remote to deepen from was configured, the clone
+        is deepened until a tag is found.
+
         :param repo: git.Repository to query for tags
         :type repo: git.Repo
 
         :returns: The latest tag from the repository
         :rtype: (git.Tag, semantic_version.Version)
         """
-        raw_tag = self._search_strategy(
-            repo=repo, branch=self._branch)
+        extra_args: Dict[str, Any] = {}
+        if self._metrics is not None:
+            extra_args['metrics'] = self._metrics
+        if self._first_parent:
+            extra_args['first_parent'] = True
+        if self._prerelease is not None:
+            # NOTE: the version is bumped from the last stable release
+            extra_args['stable_only'] = True
+
+        def search() -> Optional[git.refs.tag.TagReference]:
+            return self._search_strategy(
+                repo=repo, branch=self._branch, **extra_args)
+
+        raw_tag = None
+        if self._release_pointer:
+            raw_tag = auto_tag_release_pointer.resolve(
+                repo, self._branch, self._logger)
+        if raw_tag is None:
+            if self._deepen_remote and shallow.is_shallow(repo):
+                raw_tag = shallow.deepen_until_found(
+                    repo, self._deepen_remote, search,
+                    initial_step=self._deepen_step, logger=self._logger)
+            else:
+                raw_tag = search()
+            # NOTE: repair the pointer, or create it on the first run
+            self._update_release_pointer(repo, raw_tag)
         if raw_tag is None:
             return None, None
         sem_tag = semantic_version.Version(
             tag_search_strategy.clean_tag_name(str(raw_tag)))
         return raw_tag, sem_tag
 
+    def _update_release_pointer(
+            self, repo: git.Repo,
+            tag: Optional[git.refs.tag.TagReference]) -> None:
+        """Point the release pointer of the branch to `tag`, if used."""
+        if not self._release_pointer or tag is None:
+            return
+        try:
+            auto_tag_release_pointer.write_pointer(repo, self._branch, tag)
+        except git.GitCommandError as exc:
+            self._logger.warning(
+                'Can\'t update the release pointer of %s: %s',
+                self._branch, exc)
+
+    def _drop_release_pointer(self, repo: git.Repo) -> None:
+        """Delete the release pointer of the branch, if used."""
+        if self._release_pointer:
+            auto_tag_release_pointer.delete_pointer(repo, self._branch)
+
     @staticmethod
     def bump_tag(
             tag: Optional[semantic_version.Version],
@@ -83,6 +275,36 @@ class AutoTag():
 
         return tag.next_patch()
 
+    @staticmethod
+    def _get_range(branch: str,
+                   tag: Optional[git.refs.tag.TagReference]) -> str:
+        """Return the range of new commits, `tag..branch`."""
+        if tag is None:
+            return branch
+        # NOTE: the tag is resolved directly, looking it up in `repo.tags`
+        # would list every tag
+        try:
+            return '{}..{}'.format(tag.commit.hexsha, branch)
+        except ValueError:
+            return branch
+
+    def get_changed_files(
+            self, repo: git.Repo, branch: str,
+            tag: Optional[git.refs.tag.TagReference],
+            max_count: Optional[int] = None) -> \
+            auto_tag_changed_files.ChangedFiles:
+        """Return the files changed by the new commits.
+
+        :param max_count: Only read the newest commits
+
+        :returns: The sha of every new commit mapped to the paths it
+                  changed
+        :rtype: dict
+        """
+        return auto_tag_changed_files.read_changed_files(
+            repo, self._get_range(branch, tag), self._first_parent,
+            max_count)
+
     def get_all_commits_from_a_tag(
             self, repo: git.Repo, branch: str,
             tag: Optional[git.refs.tag.TagReference]) -> List[
@@ -91,6 +313,11 @@ class AutoTag():
         Return all commits from the branch that
         happened father the specified tag.
 
+        The commits are the `tag..branch` range, so everything reachable
+        from the tag is excluded. If the tag is not an ancestor of the
+        branch only the commits after the merge base are returned. In
+        first-parent mode only the first parent of merges is followed.
+
         :param repo: git.Repository to query for commits
         :type repo: git.Repo
 
@@ -103,27 +330,114 @@ class AutoTag():
         :returns: List of commits.
         :rtype: list of git.objects.commit.Commit
         """
-        stop_commit = None
-        if str(tag) in repo.tags:
-            stop_commit = repo.tags[str(tag)].commit
-
-        commits = []
-        for commit in repo.iter_commits(rev=branch):
-            if commit == stop_commit:
-                break
-            commits.append(commit)
+        commits = list(repo.iter_commits(
+            rev=self._get_range(branch, tag),
+            first_parent=self._first_parent))
         self._logger.debug(
             'Commits found from after tag %s: %s', tag, commits)
         return commits
 
-    def get_change_type(self, commits: List[git.objects.commit.Commit]) -> int:
-        """Evaluate all detectors on a commit and decide on the change type."""
+    @staticmethod
+    def get_merge_units(
+            repo: git.Repo,
+            commits: List[git.objects.commit.Commit]) -> Dict[
+                str, List[git.objects.commit.Commit]]:
+        """Return the commits brought in by every merge commit.
+
+        :param commits: First-parent commits
+        :type commits: list
+
+        :returns: The sha of every merge commit mapped to the commits
+                  reachable from it but not from its first parent
+        :rtype: dict
+        """
+        units: Dict[str, List[git.objects.commit.Commit]] = {}
+        for commit in commits:
+            if len(commit.parents) < 2:
+                continue
+            first_parent, *merged = commit.parents
+            unit = units[commit.hexsha] = []
+            for parent in merged:
+                unit.extend(
+                    merged_commit for merged_commit in repo.iter_commits(
+                        rev='{}..{}'.format(first_parent.hexsha,
+                                            parent.hexsha))
+                    if merged_commit not in unit)
+        return units
+
+    @staticmethod
+    def _detect(detector: auto_tag_detectors.BaseDetector,
+                commit: git.objects.commit.Commit,
+                changed_files: Optional[
+                    auto_tag_changed_files.ChangedFiles]) -> Optional[int]:
+        """Run a detector, on the changed files if it needs them.
+
+        :returns: The change type or None if the detector didn't trigger
+        :rtype: int
+        """
+        if detector.needs_changed_files and changed_files is not None:
+            triggered = detector.evaluate_files(  # type: ignore
+                changed_files.get(commit.hexsha, ()))
+            return detector.change_type if triggered else None
+        return detector.detect(commit)
+
+    def classify(self, commits: List[git.objects.commit.Commit],
+                 units: Optional[Dict[str, List[
+                     git.objects.commit.Commit]]] = None,
+                 changed_files: Optional[
+                     auto_tag_changed_files.ChangedFiles] = None) -> Tuple[
+                         int, Dict[str, List[str]]]:
+        """Evaluate all detectors on the commits.
+
+        :param units: Extra commits to evaluate together with a commit,
+                      keyed by its sha. A detector triggering on any of
+                      them counts as a hit on that commit.
+        :param changed_files: Paths changed by every commit, keyed by its
+                              sha, for the detectors that need them
+
+        :returns: The change type and, for every detector, the sha of the
+                  commits it triggered on
+        :rtype: (int, dict)
+        """
+        units = units or {}
         change_type = constants.PATCH
+        hits: Dict[str, List[str]] = {
+            detector.name: [] for detector in self._detectors}
+        evaluations = {detector.name: 0 for detector in self._detectors}
         for commit in commits:
+            unit = [commit] + units.get(commit.hexsha, [])
             for detector in self._detectors:
-                if detector.evaluate(commit):
-                    change_type = max(change_type, detector.change_type)
+                for member in unit:
+                    evaluations[detector.name] += 1
+                    detected = self._detect(detector, member, changed_files)
+                    if detected is not None:
+                        hits[detector.name].append(commit.hexsha)
+                        change_type = max(change_type, detected)
+                        break
+
+        self._count_detections(evaluations, hits)
+        return change_type, hits
+
+    def _count_detections(self, evaluations: Dict[str, int],
+                          hits: Dict[str, List[str]]) -> None:
+        """Record the evaluations and hits of every detector."""
+        if self._metrics is None:
+            return
+        for name, shas in hits.items():
+            self._metrics.inc(auto_tag_metrics.DETECTOR_EVALUATIONS,
+                              evaluations[name], detector=name)
+            self._metrics.inc(auto_tag_metrics.DETECTOR_HITS,
+                              len(shas), detector=name)
+
+    def get_pushdown_plan(self) -> Optional[pushdown.PushdownPlan]:
+        """Return how to push the detectors down to git, if possible."""
+        if not self._detector_pushdown or self._merge_units:
+            return None
+        return pushdown.plan(self._detectors, self._logger)
 
+    def get_change_type(self, commits: List[git.objects.commit.Commit]) -> int:
+        """Evaluate all detectors on a commit and decide on the change type."""
+        change_type, _ = self.classify(commits)
         return change_type
 
     @staticmethod
@@ -134,33 +448,91 @@ class AutoTag():
                 return remote
         return None
 
-    def push_to_remotes(self, repo: git.Repo, tag: str) -> None:
-        """Push a tag to the specified remotes."""
-        if self._upstream_remotes:
-            self._logger.info('Start pushing to remotes: %s.',
-                              self._upstream_remotes)
+    def _push_to_remote(self, repo: git.Repo, remote_name: str,
+                        tag: str) -> Tuple[bool, bool]:
+        """Push a tag to a remote.
+
+        :returns: If the push succeeded and if the remote already had the
+                  tag, because another run pushed it first
+        :rtype: (bool, bool)
+        """
+        remote = self.get_remote(repo, remote_name)
+        if not remote:
+            self._logger.error(
+                'Can\'t find remote with name `%s`', remote_name)
+            return False, False
+
+        self._logger.info('Push %s to %s', tag, remote)
+        start = time.perf_counter()
+        push_infos = remote.push(tag_writer.tag_ref(str(tag)))
+        if self._metrics is not None:
+            self._metrics.observe(
+                auto_tag_metrics.PUSH_DURATION,
+                time.perf_counter() - start, remote=remote_name)
+        pushed = bool(push_infos) and not any(
+            info.flags & git.PushInfo.ERROR for info in push_infos)
+        # NOTE: runs tagging the same commit in the same second with the
+        # same identity write identical tag objects, the second push is
+        # then "up to date" instead of rejected
+        taken = any(info.flags & (
+            git.PushInfo.REJECTED | git.PushInfo.REMOTE_REJECTED |
+            git.PushInfo.UP_TO_DATE) for info in push_infos)
+        if not pushed:
+            log = self._logger.warning if taken else self._logger.error
+            log('Failed to push %s to %s: %s', tag, remote_name,
+                [info.summary.strip() for info in push_infos])
+        return pushed, taken
+
+    def push_to_remotes(self, repo: git.Repo, tag: str,
+                        remotes: Optional[List[str]] = None) -> Dict[
+                            str, bool]:
+        """Push a tag to the specified remotes.
+
+        :param remotes: Remotes to push to, the upstream remotes if not
+                        specified
+
+        :returns: Every remote mapped to True if the push succeeded
+        :rtype: dict
+        """
+        if remotes is None:
+            remotes = self._upstream_remotes
+        pushed: Dict[str, bool] = {}
+        if remotes:
+            self._logger.info('Start pushing to remotes: %s.', remotes)
         else:
             self._logger.info('No push remote was specified')
-            return
-        for remote_name in self._upstream_remotes:
-            remote = self.get_remote(repo, remote_name)
-            if remote:
-                self._logger.info('Push %s to %s', tag, remote)
-                remote.push(str(tag))
-            else:
-                self._logger.error(
-                    'Can\'t find remote with name `%s`', remote_name)
+            return pushed
+        for remote_name in remotes:
+            pushed[remote_name], _ = self._push_to_remote(
+                repo, remote_name, tag)
+        return pushed
+
+    def get_commit_headings(
+            self, repo: git.Repo, branch: str,
+            tag: Optional[git.refs.tag.TagReference]) -> List[str]:
+        """Return the first line of the message of every new commit.
+
+        The messages are read from a single `git log` stream, so commits
+        the detectors didn't need are never decoded in Python.
+        """
+        args = ['--format=%x00%B']
+        if self._first_parent:
+            args.append('--first-parent')
+        output = repo.git.log(
+            *args, self._get_range(branch, tag), '--')
+        return [message.split('\n', 1)[0].strip()
+                for message in output.split('\x00')[1:]]
 
     @staticmethod
-    def _create_tag_message(commits: List[git.objects.commit.Commit],
+    def _create_tag_message(headings: List[str],
                             tag: semantic_version.Version) -> str:
         """Create a tag message that contains informations
         from the commits. """
 
         tag_message = 'Release {} \n\n'.format(str(tag))
 
-        for message in [c.message for c in commits]:
-            tag_message += '    * {}\n'.format(message.split('\n')[0].strip())
+        for heading in headings:
+            tag_message += '    * {}\n'.format(heading)
         return tag_message
 
     @staticmethod
@@ -171,41 +543,329 @@ class AutoTag():
         """Check if the last_tag is also applied on the latest commit."""
         if last_tag is None:
             return False
-        commit = list(repo.iter_commits(rev=branch_name))[0]
-        return last_tag.commit == commit
+        return last_tag.commit == repo.commit(branch_name)
 
-    def work(self) -> None:
-        """Main entry point.
+    def _open_repo(self) -> git.Repo:
+        """Return the repository, reusing the handle if one was given."""
+        if isinstance(self._repo, git.Repo):
+            return self._repo
+        return git.Repo(self._repo, odbt=git.GitDB)
+
+    def _walk_commits(
+            self, repo: git.Repo,
+            last_tag: Optional[git.refs.tag.TagReference],
+            budget: auto_tag_budget.ScanBudget) -> List[
+                git.objects.commit.Commit]:
+        """Return the new commits, the newest ones the budget allows."""
+        if not budget.enabled:
+            return self.get_all_commits_from_a_tag(
+                repo, self._branch, last_tag)
+        commits = []
+        for commit in repo.iter_commits(
+                rev=self._get_range(self._branch, last_tag),
+                first_parent=self._first_parent):
+            if not budget.take(1):
+                break
+            commits.append(commit)
+        return commits
 
-        :param args: Argument to work on
+    def _budget_exhausted(self, budget: auto_tag_budget.ScanBudget,
+                          result: AutoTagResult) -> None:
+        """Apply the budget policy once the budget is exhausted.
+
+        :raises exception.ScanBudgetExceeded: If the policy is to fail
         """
-        repo = git.Repo(self._repo, odbt=git.GitDB)
-        self._logger.info('Start tagging %s', repo)
-        last_tag, latest_tag_sem = self.get_latest_tag(repo)
+        if self._budget_policy == constants.BUDGET_POLICY_FAIL:
+            raise exception.ScanBudgetExceeded(
+                'Can\'t scan the new commits of {} within the budget, '
+                'stopped after {}'.format(self._branch, budget.describe()))
+        self._logger.warning('Scan budget exhausted after %s, policy %s',
+                             budget.describe(), self._budget_policy)
+        result.budget_limited = True
+
+    def _read_sequentially(
+            self, repo: git.Repo,
+            last_tag: Optional[git.refs.tag.TagReference],
+            result: AutoTagResult,
+            budget: auto_tag_budget.ScanBudget) -> Tuple[
+                List[git.objects.commit.Commit], int]:
+        """List all the new commits, then classify them.
+
+        :returns: The new commits and the change type
+        :rtype: (list, int)
+        """
+        profiler = self._profiler
+        with profiler.phase('commit_walk'):
+            commits = self._walk_commits(repo, last_tag, budget)
+            if budget.exhausted:
+                self._budget_exhausted(budget, result)
+            units = self.get_merge_units(
+                repo, commits) if self._merge_units else {}
+        changed = None
+        # NOTE: the paths are only read if a detector needs them
+        if any(detector.needs_changed_files for detector in self._detectors):
+            with profiler.phase('changed_files'):
+                changed = self.get_changed_files(
+                    repo, self._branch, last_tag,
+                    len(commits) if budget.exhausted else None)
+        if self._metrics is not None:
+            self._metrics.inc(
+                auto_tag_metrics.COMMITS_SCANNED,
+                len(commits) + sum(len(unit) for unit in units.values()))
+        with profiler.phase('detectors'):
+            # NOTE: the pushdown would scan the whole range
+            pushdown_plan = None if budget.exhausted else \
+                self.get_pushdown_plan()
+            if pushdown_plan is None:
+                type_of_change, result.detector_hits = self.classify(
+                    commits, units, changed)
+            else:
+                type_of_change, result.detector_hits = pushdown_plan.run(
+                    repo, self._get_range(self._branch, last_tag),
+                    self._first_parent)
+                self._count_detections(
+                    pushdown_plan.evaluations, result.detector_hits)
+        return commits, type_of_change
+
+    def _read_pipelined(
+            self, repo: git.Repo,
+            last_tag: Optional[git.refs.tag.TagReference],
+            result: AutoTagResult,
+            budget: auto_tag_budget.ScanBudget) -> Tuple[
+                List[git.objects.commit.Commit], int, List[str]]:
+        """Classify the new commits while a reader thread streams them.
+
+        The changed files and the pushdown, if the detectors need them,
+        are read from git while the reader is already streaming. With a
+        budget the detectors are not pushed down and the changed files
+        are read batch by batch, only for the commits the budget takes,
+        both would otherwise scan the whole range.
+
+        :returns: The new commits, the change type and the headings of
+                  the commits for the tag message
+        :rtype: (list, int, list)
+        """
+        rev = self._get_range(self._branch, last_tag)
+        commits: List[git.objects.commit.Commit] = []
+        headings: List[str] = []
+        with auto_tag_pipeline.CommitReader(
+                repo, rev, self._first_parent) as reader:
+            changed = None
+            needs_files = any(detector.needs_changed_files
+                              for detector in self._detectors)
+            if needs_files and not budget.enabled:
+                changed = self.get_changed_files(repo, self._branch, last_tag)
+            pushdown_plan = None if budget.enabled else \
+                self.get_pushdown_plan()
+            if pushdown_plan is None:
+                type_of_change = constants.PATCH
+                result.detector_hits = {
+                    detector.name: [] for detector in self._detectors}
+            else:
+                type_of_change, result.detector_hits = pushdown_plan.run(
+                    repo, rev, self._first_parent)
+                self._count_detections(
+                    pushdown_plan.evaluations, result.detector_hits)
+
+            for batch in reader:
+                batch = batch[:budget.take(len(batch))]
+                commits.extend(batch)
+                headings.extend(map(auto_tag_pipeline.heading, batch))
+                units = self.get_merge_units(
+                    repo, batch) if self._merge_units else {}
+                if self._metrics is not None:
+                    self._metrics.inc(
+                        auto_tag_metrics.COMMITS_SCANNED,
+                        len(batch) + sum(len(unit)
+                                         for unit in units.values()))
+                if needs_files and budget.enabled:
+                    changed = auto_tag_changed_files.read_commits_changed_files(
+                        repo, [commit.hexsha for commit in batch])
+                if pushdown_plan is None:
+                    type_of_change = max(type_of_change, self._classify_into(
+                        result.detector_hits, batch, units, changed))
+                if budget.exhausted:
+                    self._budget_exhausted(budget, result)
+                    break
+        return commits, type_of_change, headings
+
+    def _classify_into(
+            self, hits: Dict[str, List[str]],
+            commits: List[git.objects.commit.Commit],
+            units: Dict[str, List[git.objects.commit.Commit]],
+            changed_files: Optional[
+                auto_tag_changed_files.ChangedFiles]) -> int:
+        """Classify some commits, adding the hits to the ones so far.
+
+        :returns: The change type of the commits
+        :rtype: int
+        """
+        change_type, new_hits = self.classify(commits, units, changed_files)
+        for name, shas in new_hits.items():
+            hits[name].extend(shas)
+        return change_type
+
+    def _compute_tag(self, repo: git.Repo, result: AutoTagResult) -> Tuple[
+            Optional[git.refs.tag.TagReference], semantic_version.Version,
+            Optional[List[str]]]:
+        """Find the last tag, classify the new commits and bump the tag.
+
+        If the scan budget is exhausted, the change type is at least the
+        one the budget policy assumes for the commits that were not
+        scanned.
+
+        :returns: The last tag, the next version and, if the pipeline read
+                  them or the scan was budget limited, the headings of the
+                  new commits
+        :rtype: (git.Tag, semantic_version.Version, list)
+        """
+        profiler = self._profiler
+        with profiler.phase('tag_search'):
+            last_tag, latest_tag_sem = self.get_latest_tag(repo)
 
         self._logger.info('Found tag %s', last_tag)
-        commits = self.get_all_commits_from_a_tag(
-            repo, self._branch, last_tag)
-        type_of_change = self.get_change_type(commits)
+        headings = None
+        result.budget_limited = False
+        budget = auto_tag_budget.ScanBudget(
+            self._max_commits, self._max_scan_seconds)
+        if self._pipeline:
+            with profiler.phase('pipeline'):
+                commits, type_of_change, headings = self._read_pipelined(
+                    repo, last_tag, result, budget)
+        else:
+            commits, type_of_change = self._read_sequentially(
+                repo, last_tag, result, budget)
+        if result.budget_limited:
+            type_of_change = max(
+                type_of_change, constants.BUDGET_ASSUMED_CHANGE_TYPES.get(
+                    self._budget_policy, constants.PATCH))
+            # NOTE: the message only lists the commits that were scanned
+            headings = [auto_tag_pipeline.heading(commit)
+                        for commit in commits]
         next_tag = self.bump_tag(latest_tag_sem, type_of_change)
-        # NOTE(mmicu): Here we need to check if the next tag exists
+        if self._prerelease is not None:
+            with profiler.phase('prerelease_counter'):
+                next_tag = auto_tag_prerelease.next_prerelease(
+                    repo, next_tag, self._prerelease, self._append_v)
         tag = 'v{}'.format(next_tag) if self._append_v else str(next_tag)
 
+        result.last_tag = str(last_tag) if last_tag is not None else None
+        result.commit_range = (
+            last_tag.commit.hexsha if last_tag is not None else None,
+            repo.commit(self._branch).hexsha)
+        result.commits = [commit.hexsha for commit in commits]
+        result.change_type = type_of_change
+        result.next_tag = tag
+
         self._logger.info('Bumping tag %s -> %s', last_tag, next_tag)
+        return last_tag, next_tag, headings
 
-        with git_custom_env.GitCustomeEnvironment(repo.working_dir,
-                                                  self._git_name,
-                                                  self._git_email):
-            tag_on_last_commit = self._is_last_commit_already_tagged(
-                repo, last_tag, self._branch)
+    def _allocate_tag(self, repo: git.Repo, result: AutoTagResult) -> None:
+        """Create the next tag, recomputing it if another run took it.
 
-            if self._skip_if_exists and tag_on_last_commit:
+        The tag is created locally with an atomic create-only ref update
+        and pushed to the first upstream remote, which decides which run
+        owns a version. When the remote already has the tag, the local one
+        is removed, the tags are fetched from the remote and the next tag
+        is computed again after a randomized backoff.
+        """
+        profiler = self._profiler
+        authority = self._upstream_remotes[:1]
+        failed_tag = None
+        while True:
+            result.attempts += 1
+            last_tag, next_tag, headings = self._compute_tag(repo, result)
+            if result.budget_limited and (
+                    self._budget_policy == constants.BUDGET_POLICY_BACKGROUND):
+                self._logger.warning(
+                    'Not tagging %s, the scan is left to a run without a '
+                    'budget', self._branch)
+                result.next_tag = None
+                return
+            tag = str(result.next_tag)
+            if tag == failed_tag:
+                # NOTE: the tag exists but is not seen by the search
+                # strategy (ex. on another branch), retrying won't help
+                raise exception.TagAllocationFailed(
+                    'Tag {} already exists'.format(tag))
+
+            if self._skip_if_exists and self._is_last_commit_already_tagged(
+                    repo, last_tag, self._branch):
                 self._logger.info(
                     ('The tag is already tagged, following your CLI option'
                      ' we will skip tagging.'))
-            else:
-                repo.create_tag(
-                    str(tag),
-                    message=self._create_tag_message(commits, next_tag))
+                return
+
+            with profiler.phase('tag_create'):
+                head = str(result.commit_range[1])
+                if headings is None:
+                    headings = self.get_commit_headings(repo, head, last_tag)
+                created = tag_writer.create_tag(
+                    repo, tag, repo.commit(head),
+                    self._create_tag_message(headings, next_tag))
+            rejected = False
+            if created and authority:
+                with profiler.phase('push'):
+                    pushed, rejected = self._push_to_remote(
+                        repo, authority[0], tag)
+                if rejected:
+                    tag_writer.delete_tag(repo, tag)
+                else:
+                    result.pushed_remotes[authority[0]] = pushed
+            if created and not rejected:
+                result.created = True
+                self._update_release_pointer(repo, git.TagReference(
+                    repo, tag_writer.tag_ref(tag)))
+                return
+
+            self._logger.warning('Tag %s was created by another run', tag)
+            failed_tag = tag
+            # NOTE: the other run's tag is fetched below, the next attempt
+            # has to search for it
+            self._drop_release_pointer(repo)
+            if result.attempts > self._max_tag_retries:
+                raise exception.TagAllocationFailed(
+                    'Can\'t allocate a tag after {} attempts'.format(
+                        result.attempts))
+            if self._metrics is not None:
+                self._metrics.inc(auto_tag_metrics.TAG_ALLOCATION_RETRIES)
+            if authority:
+                with profiler.phase('fetch_tags'):
+                    tag_writer.fetch_tags(repo, authority[0])
+            time.sleep(random.uniform(
+                0, self._retry_backoff * 2 ** (result.attempts - 1)))
+
+    def work(self) -> AutoTagResult:
+        """Main entry point.
 
-        self.push_to_remotes(repo, tag)
+        :returns: What was found and done during the run
+        :rtype: AutoTagResult
+        """
+        profiler = self._profiler
+        result = AutoTagResult(self._branch)
+        repo = self._open_repo()
+        self._logger.info('Start tagging %s', repo)
+        with profiler.phase('commit_graph'):
+            ancestry.ensure_commit_graph(
+                repo, self._commit_graph_mode, logger=self._logger)
+
+        with contextlib.ExitStack() as stack:
+            # NOTE: callbacks run in reverse order, so restoring the
+            # configuration on exit is also timed as `config_writes`
+            stack.callback(profiler.stop, 'config_writes')
+            with profiler.phase('config_writes'):
+                stack.enter_context(git_custom_env.GitCustomeEnvironment(
+                    repo, self._git_name, self._git_email))
+            stack.callback(profiler.start, 'config_writes')
+
+            self._allocate_tag(repo, result)
+
+        if result.created:
+            with profiler.phase('push'):
+                result.pushed_remotes.update(self.push_to_remotes(
+                    repo, str(result.next_tag),
+                    self._upstream_remotes[1:]))
+
+        if self._metrics is not None:
+            self._metrics.observe_phases(profiler.phases)
+        return result
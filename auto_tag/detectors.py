@@ -4,19 +4,36 @@ Change type detectors.
 
 Parses a configuration with what type of change do you want to produce.
 """
-from typing import Any, NoReturn
+from __future__ import annotations
+
+from typing import (
+    Any, Dict, NoReturn, Optional, Sequence, Tuple, TYPE_CHECKING)
 import abc
 import logging
 import re
-import git
 
+from auto_tag import changed_files
 from auto_tag import constants
+from auto_tag import conventional
 from auto_tag import exception
 
+if TYPE_CHECKING:
+    # NOTE: only needed for annotations, importing GitPython is slow and
+    # the detectors are also loaded to validate a configuration
+    import git
+
 
 class BaseDetector(metaclass=abc.ABCMeta):
     """Base detector class."""
 
+    #: If True the detector is evaluated on the files changed by a commit
+    #: with `evaluate_files`, which are read in bulk for the whole range
+    needs_changed_files = False
+
+    #: Change type used when a configuration doesn't specify
+    #: `produce_type_change`, None if it is required
+    default_change_type: Optional[str] = None
+
     def __init__(self, name: str, change_type: str,
                  strip: bool = True, **kwargs: Any) -> None:
         """Initialize the detector."
@@ -70,6 +87,63 @@ class BaseDetector(metaclass=abc.ABCMeta):
         :rtype: bool
         """
 
+    def detect(self, commit: git.objects.commit.Commit) -> Optional[int]:
+        """Return the type of change the commit produces, if any.
+
+        :param commit: The commit to evaluate
+
+        :returns: The change type or None if this detector didn't trigger
+        :rtype: int
+        """
+        return self.change_type if self.evaluate(commit) else None
+
+    def grep_filter(self) -> Optional[Tuple[str, bool]]:
+        """Return a filter git can use to preselect commits.
+
+        Every commit this detector triggers on must have a line matching
+        the filter, the matching commits are still evaluated.
+
+        :returns: The fixed string to search and if the search ignores
+                  case, None if the detector can't be pushed down to git
+        :rtype: (str, bool)
+        """
+        return None
+
+
+def _nth_index(text: str, char: str, count: int) -> int:
+    """Return the index of the `count`th `char`, -1 if there are less."""
+    index = -1
+    for _ in range(count):
+        index = text.find(char, index + 1)
+        if index == -1:
+            break
+    return index
+
+
+def scope_message(message: str, scope: str,
+                  scope_limit: Optional[int] = None) -> str:
+    """Return the part of a message a detector has to read.
+
+    Only the needed slice is read and copied, the cost doesn't depend on
+    the size of the message.
+
+    :param message: The whole commit message
+    :param scope: One of `constants.SCOPES`
+    :param scope_limit: Number of lines or characters for the
+                        `lines` and `chars` scopes
+    """
+    if scope == constants.SCOPE_HEAD:
+        end = message.find('\n')
+        return message if end == -1 else message[:end]
+    if scope == constants.SCOPE_LINES:
+        end = _nth_index(message, '\n', int(scope_limit or 0))
+        return message if end == -1 else message[:end]
+    if scope == constants.SCOPE_CHARS:
+        return message[:scope_limit]
+    if scope == constants.SCOPE_TRAILERS:
+        return conventional.trailer_block(message)
+    return message
+
 
 class BasePatternBaseDetector(BaseDetector):
     """Check if the commit message respects a pattern"""
@@ -78,6 +152,10 @@ class BasePatternBaseDetector(BaseDetector):
         """Initialize the detector.
 
         :param pattern: The pattern to match if it starts with
+        :param scope: What part of the message to read, one of
+                      `constants.SCOPES`, default the whole message
+        :param scope_limit: Number of lines or characters to read for the
+                            `lines` and `chars` scopes
 
         :param *args: Check with the base class
         :param **kwargs: Check with the base class
@@ -86,12 +164,24 @@ class BasePatternBaseDetector(BaseDetector):
             *args, **kwargs)
 
         self._pattern: str = str(kwargs.get('pattern'))
+        self._scope: str = kwargs.get('scope', constants.SCOPE_MESSAGE)
+        self._scope_limit: Optional[int] = kwargs.get('scope_limit')
 
     @property
     def pattern(self) -> str:
         """Return pattern value of the detector."""
         return self._pattern
 
+    @property
+    def scope(self) -> str:
+        """Return what part of the message the detector reads."""
+        return self._scope
+
+    @property
+    def scope_limit(self) -> Optional[int]:
+        """Return how many lines or characters the detector reads."""
+        return self._scope_limit
+
     def validate_detector_params(self) -> NoReturn:
         """Check if all the parameters given to the detector make sens."""
         super().validate_detector_params()
@@ -100,6 +190,23 @@ class BasePatternBaseDetector(BaseDetector):
                 ('Patter: {} is not valid.'
                  'it must be specified and of type string').format(
                      self._pattern))
+        if self._scope not in constants.SCOPES:
+            raise exception.DetectorValidationException(
+                'Scope {} is not valid. Accepted scopes are {}'.format(
+                    self._scope, constants.SCOPES))
+        if self._scope in constants.LIMITED_SCOPES and (
+                not isinstance(self._scope_limit, int) or
+                isinstance(self._scope_limit, bool) or
+                self._scope_limit < 1):
+            raise exception.DetectorValidationException(
+                ('scope_limit: {} is not valid. It must be a positive '
+                 'integer for the {} scope').format(
+                     self._scope_limit, self._scope))
+
+    def _get_message(self, commit: git.objects.commit.Commit) -> str:
+        """Return the part of the commit message in the scope."""
+        return scope_message(
+            str(commit.message), self._scope, self._scope_limit)
 
 
 class BasePatternSimpleComparationDetector(BasePatternBaseDetector):
@@ -132,6 +239,15 @@ class BasePatternSimpleComparationDetector(BasePatternBaseDetector):
                  'it must be of type bool').format(
                      self._case_sensitive))
 
+    def grep_filter(self) -> Optional[Tuple[str, bool]]:
+        """Return the pattern, git searches it in every line."""
+        if '\n' in self._pattern:
+            return None
+        # NOTE: git and Python fold the case of non ASCII text differently
+        if not self._case_sensitive and not self._pattern.isascii():
+            return None
+        return self._pattern, not self._case_sensitive
+
     def __prepare_text(self, text: str) -> str:
         """Prepare a text according to the config."""
         if not self._case_sensitive:
@@ -142,7 +258,7 @@ class BasePatternSimpleComparationDetector(BasePatternBaseDetector):
 
     def _prepare_commit_message(self, commit: git.objects.commit.Commit) -> str:
         """Get the prepared commit message according to the config."""
-        return self.__prepare_text(commit.message)
+        return self.__prepare_text(self._get_message(commit))
 
 
 class CommitMessageHeadStartsWithDetector(
@@ -215,13 +331,156 @@ class CommitMessageMatchesRegexDetector(BasePatternBaseDetector):
         :returns: True if this detector got triggered
         :rtype: book
         """
-        return bool(self._compiled_regex.search(commit.message))
+        return bool(self._compiled_regex.search(self._get_message(commit)))
+
+
+class BaseFilesChangedDetector(BasePatternBaseDetector):
+    """Check the files changed by a commit."""
+
+    needs_changed_files = True
+
+    def evaluate(self, commit: git.objects.commit.Commit) -> bool:
+        """Check the files changed by a commit.
+
+        :param commit: The commit to evaluate
+
+        :returns: True if this detector got triggered
+        :rtype: bool
+        """
+        return self.evaluate_files(
+            changed_files.commit_changed_files(commit))
+
+    def evaluate_files(self, paths: Sequence[str]) -> bool:
+        """Check if any of the changed files matches.
+
+        :param paths: Paths changed by a commit
+
+        :returns: True if this detector got triggered
+        :rtype: bool
+        """
+        return any(self._matches(path) for path in paths)
+
+    @abc.abstractmethod
+    def _matches(self, path: str) -> bool:
+        """Return True if the path matches the pattern."""
+
+
+class FilesChangedStartsWithDetector(BaseFilesChangedDetector):
+    """Check if a commit changed files under a particular path."""
+
+    def _matches(self, path: str) -> bool:
+        return path.startswith(self._pattern)
+
+
+class FilesChangedMatchesRegexDetector(BaseFilesChangedDetector):
+    """Check if a commit changed files matching a regex pattern."""
+
+    def __init__(self, *args: str, **kwargs: Any) -> None:
+        """Initialize the detector.
+
+        :param pattern: The regex the changed paths are searched with
+
+        :param *args: Check with the base class
+        :param **kwargs: Check with the base class
+        """
+        super().__init__(
+            *args, **kwargs)
+
+        self._compiled_regex = re.compile(self._pattern)
+
+    def _matches(self, path: str) -> bool:
+        return bool(self._compiled_regex.search(path))
+
+
+class ConventionalCommitDetector(BaseDetector):
+    """Classify commits following the Conventional Commits specification.
+
+    The header type (`feat`, `fix`, ...) is mapped to a change type with
+    `types`. A `!` after the type/scope or a `BREAKING CHANGE` trailer
+    produce the change type of the detector (MAJOR by default).
+    """
+
+    default_change_type = 'MAJOR'
+
+    DEFAULT_TYPES = {
+        'feat': 'MINOR',
+        'fix': 'PATCH',
+    }
+
+    def __init__(self, name: str, change_type: str = 'MAJOR',
+                 **kwargs: Any) -> None:
+        """Initialize the detector.
+
+        :param change_type: Change type of breaking changes
+        :param types: Commit type mapped to the change type it produces,
+                      types not in the mapping don't trigger the detector
+
+        :param **kwargs: Check with the base class
+        """
+        super().__init__(
+            name, change_type, **kwargs)
+
+        types = kwargs.get('types')
+        if types is None:
+            types = self.DEFAULT_TYPES
+        # NOTE: anything else than a mapping is rejected by the validation
+        self._types: Dict[str, str] = dict(types) if isinstance(
+            types, dict) else types
+
+    @property
+    def types(self) -> Dict[str, str]:
+        """Return the commit types and the change types they produce."""
+        return self._types
+
+    def validate_detector_params(self) -> NoReturn:
+        """Check if all the parameters given to the detector make sens."""
+        super().validate_detector_params()
+        if not isinstance(self._types, dict):
+            raise exception.DetectorValidationException(
+                ('types: {} is not valid. It must map commit types to '
+                 'change types').format(self._types))
+        for commit_type, change_type in self._types.items():
+            if change_type not in constants.CHANGE_TYPES.values():
+                raise exception.DetectorValidationException(
+                    ('Change type {} of commit type {} is not valid. Accepted'
+                     ' change types are {}').format(
+                         change_type, commit_type,
+                         constants.CHANGE_TYPES.values()))
+
+    def detect(self, commit: git.objects.commit.Commit) -> Optional[int]:
+        """Return the type of change the commit produces, if any.
+
+        :param commit: The commit to evaluate
+
+        :returns: The change type or None if this detector didn't trigger
+        :rtype: int
+        """
+        parsed = conventional.parse(str(commit.message))
+        if parsed.breaking:
+            return self.change_type
+        change_type_name = self._types.get(parsed.type) if parsed.type else None
+        if change_type_name is None:
+            return None
+        return constants.CHANGE_TYPES_REVERSE[change_type_name]
+
+    def evaluate(self, commit: git.objects.commit.Commit) -> bool:
+        """Check if the commit follows the specification with a known type
+
+        :param commit: The commit to evaluate
+
+        :returns: True if this detector got triggered
+        :rtype: bool
+        """
+        return self.detect(commit) is not None
 
 
 DETECTORS = [
     CommitMessageHeadStartsWithDetector,
     CommitMessageContainsDetector,
     CommitMessageMatchesRegexDetector,
+    FilesChangedStartsWithDetector,
+    FilesChangedMatchesRegexDetector,
+    ConventionalCommitDetector,
 ]
 
 
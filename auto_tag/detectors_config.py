@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 """
 Prepare Detectors based on a file config.
+
+The YAML configuration is first parsed and checked into a "detector
+plan", a list of plain dictionaries (name, type, change type and
+parameters) that is cheap to serialize. Plans of a file are cached next
+to it, keyed by the hash of the file content, so following runs don't
+parse YAML at all. Only the parse is skipped: the detectors are still
+built from the plan on every run, which costs a fraction of the parse.
 """
 from typing import Any
+from typing import Dict
 from typing import Optional
 from typing import Union
 from typing import List
+import hashlib
+import json
 import logging
 import io
-import yaml
+import os
 
 from auto_tag import exception
 from auto_tag import detectors
@@ -17,67 +27,203 @@ from auto_tag import constants
 
 # pylint:disable=too-few-public-methods
 
+# NOTE: bump this when the format of the plan changes so old caches are
+# not used anymore
+PLAN_VERSION = 1
+
+DetectorPlan = List[Dict[str, Any]]
+
+
+def _load_yaml(data: str) -> Any:
+    """Parse YAML, using the libyaml based loader when it is available."""
+    # NOTE: PyYAML is only imported when a configuration is parsed
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    try:
+        return yaml.load(io.StringIO(data), Loader=loader)
+    except yaml.YAMLError as exc:
+        raise exception.BaseAutoTagException(
+            'Can\'t handle config {}'.format(exc))
+
+
+def compile_plan(data: str, logger: Optional[Any] = None) -> DetectorPlan:
+    """Parse and check a YAML configuration and return its detector plan.
+
+    :param data: The YAML configuration
+    :param logger: If specified what logger to use
+
+    :returns: One dictionary for every detector
+    :rtype: list
+    """
+    logger = logger or logging.getLogger(__name__)
+    config = _load_yaml(data)
+
+    if not isinstance(config, dict) or 'detectors' not in config:
+        raise exception.ConfigurationError("Can't find key detectors")
+
+    plan = []
+    for detector_name, detector_data in config['detectors'].items():
+        logger.debug('Found detector %s', detector_name)
+        if 'type' not in detector_data:
+            raise exception.ConfigurationError(
+                'Can\'t find type for detector {}'.format(detector_name))
+        # NOTE: fail early on unknown detectors, before caching the plan
+        detector_class = detectors.detector_factory(detector_data['type'])
+
+        produce_type_change = detector_data.get(
+            'produce_type_change',
+            getattr(detector_class, 'default_change_type', None))
+        if produce_type_change is None:
+            raise exception.ConfigurationError(
+                'Can\'t find produce_type_change for detector {}'.format(
+                    detector_name))
+
+        plan.append({
+            'name': detector_name,
+            'type': detector_data['type'],
+            'produce_type_change': produce_type_change,
+            'params': detector_data.get('params') or {},
+        })
+    return plan
+
+
+def build_detectors(plan: DetectorPlan,
+                    logger: Optional[Any] = None) -> List[
+                        detectors.BaseDetector]:
+    """Instantiate the detectors described by a plan and check them.
+
+    :raises exception.DetectorValidationException: If the parameters of
+                                                   a detector are invalid
+    """
+    logger = logger or logging.getLogger(__name__)
+    result = []
+    for step in plan:
+        detector_class = detectors.detector_factory(step['type'])
+        logger.debug('Detector %s is %s', step['name'], detector_class)
+        logger.debug('Detector %s produces %s',
+                     step['name'], step['produce_type_change'])
+        logger.debug('Detector %s has extra args %s',
+                     step['name'], step['params'])
+
+        detector_obj = detector_class(
+            name=step['name'], change_type=step['produce_type_change'],
+            **step['params'])
+        # NOTE: fail when loading the configuration, not in the middle
+        # of a run, ex. an unknown scope would read the whole message
+        detector_obj.validate_detector_params()
+
+        logger.info('Prepared detector %s of type %s -> %s',
+                    step['name'], detector_class,
+                    step['produce_type_change'])
+        result.append(detector_obj)
+    return result
+
+
+# NOTE: the default detectors are built at import time, running with the
+# default configuration must not need PyYAML. They have to stay equivalent
+# to `constants.DEFAULT_CONFIG_DETECTORS`, which is what we document.
+DEFAULT_DETECTORS = (
+    detectors.CommitMessageHeadStartsWithDetector(
+        name='check_for_feature_heading', change_type='MINOR',
+        pattern='feature'),
+    detectors.CommitMessageContainsDetector(
+        name='check_for_breaking_change', change_type='MAJOR',
+        pattern='BREAKING_CHANGE', case_sensitive=False),
+)
+
+
+def get_cache_path(filepath: str) -> str:
+    """Return where the plan of a configuration file is cached."""
+    directory, name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(directory, '.{}.auto-tag-cache.json'.format(name))
+
+
+def _content_hash(data: str) -> str:
+    """Return the key used to validate a cached plan."""
+    digest = hashlib.sha256(data.encode('utf-8'))
+    digest.update(str(PLAN_VERSION).encode('utf-8'))
+    return digest.hexdigest()
+
 
 class DetectorsConfig():
     """Handles instantiation of detectors based on a config file."""
 
-    def __init__(self, data: str, logger: Optional[Any] = None) -> None:
-        """Initiate the config."""
+    def __init__(self, data: str, logger: Optional[Any] = None,
+                 cache_path: Optional[str] = None,
+                 compiled: Optional[List[detectors.BaseDetector]] = None
+                 ) -> None:
+        """Initiate the config.
+
+        :param data: The YAML configuration
+        :param logger: If specified what logger to use
+        :param cache_path: Where to cache the plan, no caching
+                           if not specified
+        :param compiled: Detectors already built from `data`, if specified
+                         `data` is never parsed
+        """
         self._data = data
         self._logger = logger or logging.getLogger(__name__)
-        self._detectors: Union[List[detectors.BaseDetector], None] = None
+        self._cache_path = cache_path
+        self._detectors: Union[List[detectors.BaseDetector], None] = compiled
 
     @classmethod
-    def from_file(cls, filepath: str, logger: Optional[Any] = None) -> Any:
+    def from_file(cls, filepath: str, logger: Optional[Any] = None,
+                  use_cache: bool = True) -> Any:
         """Read config from a file."""
         with open(filepath, 'r', encoding='utf-8') as file_stream:
-            return cls(file_stream.read(), logger)
+            data = file_stream.read()
+        cache_path = get_cache_path(filepath) if use_cache else None
+        return cls(data, logger, cache_path=cache_path)
 
     @classmethod
     def from_default(cls, logger: Optional[Any] = None) -> Any:
         """Return a configuration of the default setting."""
-        return cls(constants.DEFAULT_CONFIG_DETECTORS, logger)
+        return cls(constants.DEFAULT_CONFIG_DETECTORS, logger,
+                   compiled=list(DEFAULT_DETECTORS))
+
+    def _read_cached_plan(self, key: str) -> Optional[DetectorPlan]:
+        """Return the cached plan if it was parsed from the same data."""
+        if self._cache_path is None:
+            return None
+        try:
+            with open(self._cache_path, 'r', encoding='utf-8') as stream:
+                cached = json.load(stream)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict) or cached.get('key') != key:
+            return None
+        self._logger.debug('Using cached detectors from %s',
+                           self._cache_path)
+        return cached.get('plan')
+
+    def _write_cached_plan(self, key: str, plan: DetectorPlan) -> None:
+        """Cache the plan, failing to do so is not an error."""
+        if self._cache_path is None:
+            return
+        tmp_path = '{}.{}.tmp'.format(self._cache_path, os.getpid())
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as stream:
+                json.dump({'key': key, 'plan': plan}, stream)
+            os.replace(tmp_path, self._cache_path)
+        except (OSError, TypeError, ValueError) as exc:
+            self._logger.debug('Can\'t cache detectors to %s: %s',
+                               self._cache_path, exc)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_plan(self) -> DetectorPlan:
+        """Return the plan, from the cache if possible."""
+        key = _content_hash(self._data)
+        plan = self._read_cached_plan(key)
+        if plan is None:
+            plan = compile_plan(self._data, self._logger)
+            self._write_cached_plan(key, plan)
+        return plan
 
     def _parse_detectors(self) -> None:
         """Parse the file and instantiate detectors."""
-        self._detectors = []
-        stream = io.StringIO(self._data)
-        try:
-            data = yaml.safe_load(stream)
-        except yaml.YAMLError as exc:
-            raise exception.BaseAutoTagException(
-                'Can\'t handle config {}'.format(exc))
-
-        if 'detectors' not in data:
-            raise exception.ConfigurationError("Can't find key detectors")
-
-        for detector_name, data in data['detectors'].items():
-            self._logger.debug('Found detector %s', detector_name)
-            if 'type' not in data:
-                raise exception.ConfigurationError(
-                    'Can\'t find type for detector {}'.format(detector_name))
-            detector_class = detectors.detector_factory(data['type'])
-
-            self._logger.debug('Detector %s is %s',
-                               detector_name, detector_class)
-
-            if 'produce_type_change' not in data:
-                raise exception.ConfigurationError(
-                    'Can\'t find produce_type_change for detector {}'.format(
-                        detector_name))
-            change_type = data['produce_type_change']
-            self._logger.debug('Detector %s produces %s',
-                               detector_name, change_type)
-
-            extra_args = data.get('params', {})
-            self._logger.debug('Detector %s has extra args %s',
-                               detector_name, extra_args)
-            detector_obj = detector_class(
-                name=detector_name, change_type=change_type, **extra_args)
-
-            self._logger.info('Prepared detector %s of type %s -> %s',
-                              detector_name, detector_class, change_type)
-            self._detectors.append(detector_obj)
+        self._detectors = build_detectors(self.get_plan(), self._logger)
 
     @property
     def detectors(self) -> Union[List[detectors.BaseDetector], None]:  # type: ignore
@@ -1,24 +1,26 @@
 #!/usr/bin/env python3
 """
 Package entry point.
+
+Only the CLI parser is imported eagerly, the modules that depend on
+GitPython, PyYAML or semantic_version are imported once a code path
+needs them so `--help` and argument errors stay fast.
 """
-from typing import List
+from typing import Any, List, Optional
+import argparse
+import os
 import sys
 import logging
-import logging.config
-
-from auto_tag import core, cli, detectors_config, tag_search_strategy
 
+from auto_tag import cli
+from auto_tag import constants
 
-def main(cli_args: List[str]) -> None:
-    """Main entry point for Auto-Tag module."""
-
-    parser = cli.get_parser()
-    args = parser.parse_args(cli_args)
 
+def _get_logger(level: str) -> logging.Logger:
+    """Return the logger used by the CLI."""
     logger = logging.getLogger(__name__)
     # pylint:disable=no-member, protected-access
-    logger.setLevel(logging._nameToLevel[args.logging])
+    logger.setLevel(logging._nameToLevel[level])
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.DEBUG)
 
@@ -31,26 +33,263 @@ def main(cli_args: List[str]) -> None:
 
     # add console_handler to logger
     logger.addHandler(console_handler)
+    return logger
+
+
+def _load_config(args: argparse.Namespace) -> Any:
+    """Return the detectors configuration selected by the CLI arguments."""
+    # pylint:disable=import-outside-toplevel
+    from auto_tag import detectors_config
 
     if args.config:
-        config = detectors_config.DetectorsConfig.from_file(
-            args.config)
-    else:
-        config = detectors_config.DetectorsConfig.from_default()
+        return detectors_config.DetectorsConfig.from_file(
+            args.config, use_cache=not args.no_config_cache)
+    return detectors_config.DetectorsConfig.from_default()
+
+
+def _create_autotag(  # pylint: disable=too-many-arguments
+        args: argparse.Namespace, repo: Any, branch: str, detectors: Any,
+        logger: logging.Logger, run_metrics: Optional[Any] = None,
+        scan_budget: bool = True) -> Any:
+    """Return an AutoTag for a branch according to the CLI arguments."""
+    # pylint:disable=import-outside-toplevel
+    from auto_tag import core
+    from auto_tag import tag_search_strategy
 
     search_strategy = tag_search_strategy.SEARCH_METHODS_MAPPING[
         args.tag_search_strategy]
-    autotag = core.AutoTag(
-        repo=args.repo, branch=args.branch,
+    scan_budget = scan_budget and not args.no_scan_budget
+    return core.AutoTag(
+        repo=repo, branch=branch,
         upstream_remotes=args.upstream_remote,
-        detectors=config.detectors,
+        detectors=detectors,
         search_strategy=search_strategy,  # type: ignore
         git_name=args.name, git_email=args.email,
         append_v=args.append_v_to_tag,
         skip_if_exists=args.skip_tag_if_one_already_present,
+        commit_graph_mode=args.commit_graph,
+        deepen_remote=args.deepen_from,
+        deepen_step=args.deepen_step,
+        max_tag_retries=args.max_tag_retries,
+        first_parent=args.first_parent,
+        merge_units=args.merge_units,
+        detector_pushdown=args.detector_pushdown,
+        prerelease=args.prerelease,
+        pipeline=args.pipeline,
+        release_pointer=args.release_pointer,
+        max_commits=args.max_commits if scan_budget else None,
+        max_scan_seconds=args.max_scan_seconds if scan_budget else None,
+        budget_policy=args.budget_policy,
+        metrics=run_metrics,
         logger=logger
     )
-    autotag.work()
+
+
+def _continue_in_background(cli_args: List[str], repo_path: str,
+                            logger: logging.Logger) -> None:
+    """Run auto-tag again without a scan budget, in a detached process."""
+    # pylint:disable=import-outside-toplevel
+    import subprocess
+    import git
+
+    log_path = os.path.join(git.Repo(repo_path).common_dir,
+                            constants.DEFAULT_BACKGROUND_LOG)
+    with open(log_path, 'a', encoding='utf-8') as log_file:
+        # NOTE: the output is not inherited, a CI step would otherwise
+        # wait for the background run to finish
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, '-m', 'auto_tag', *cli_args, '--no-scan-budget'],
+            stdin=subprocess.DEVNULL, stdout=log_file,
+            stderr=subprocess.STDOUT, start_new_session=True)
+    logger.info('Continuing in the background (pid %d), see %s',
+                process.pid, log_path)
+
+
+def _tag(args: argparse.Namespace, logger: logging.Logger,
+         cli_args: List[str]) -> None:
+    """Tag the branch according to the CLI arguments."""
+    # pylint:disable=import-outside-toplevel
+    from auto_tag import metrics, profiling
+
+    run_metrics = None
+    if args.metrics_file:
+        run_metrics = metrics.RunMetrics(
+            {'repo': os.path.abspath(args.repo), 'branch': args.branch})
+
+    with profiling.RunProfiler(args.profile_pstats, args.profile_collapsed):
+        autotag = _create_autotag(
+            args, args.repo, args.branch, _load_config(args).detectors,
+            logger, run_metrics)
+        try:
+            result = autotag.work()
+        finally:
+            if run_metrics is not None:
+                run_metrics.write_textfile(args.metrics_file)
+
+    if args.profile:
+        for line in autotag.profiler.report():
+            logger.info(line)
+    if result.budget_limited and (
+            args.budget_policy == constants.BUDGET_POLICY_BACKGROUND):
+        _continue_in_background(cli_args, args.repo, logger)
+
+
+def _watch(args: argparse.Namespace, logger: logging.Logger) -> None:
+    """Tag the branches every time they move."""
+    # pylint:disable=import-outside-toplevel
+    import git
+    from auto_tag import watch
+
+    detectors = _load_config(args).detectors
+    branches = args.branches or [args.branch]
+    # NOTE: the runs get the path and open the repository every time, a
+    # handle kept open doesn't see the pack files added since
+    autotags = {branch: _create_autotag(args, args.repo, branch, detectors,
+                                        logger)
+                for branch in branches}
+    # NOTE: the watch already runs in the background, a budget limited
+    # run is continued in it
+    unbounded = {branch: _create_autotag(args, args.repo, branch, detectors,
+                                         logger, scan_budget=False)
+                 for branch in branches}
+
+    def run(branch: str) -> None:
+        result = autotags[branch].work()
+        if result.budget_limited and (
+                args.budget_policy == constants.BUDGET_POLICY_BACKGROUND):
+            result = unbounded[branch].work()
+        logger.info('%s: %s -> %s', branch, result.last_tag,
+                    result.next_tag)
+
+    branch_watch = watch.Watch(
+        watch.RefWatcher(git.Repo(args.repo), branches), run, args.interval,
+        args.debounce, logger=logger)
+    runs = 0
+    if args.run_on_start:
+        for branch in branches:
+            run(branch)
+        runs = len(branches)
+    logger.info('Watching %s', ', '.join(branches))
+    try:
+        branch_watch.run(None if args.max_runs is None
+                         else max(args.max_runs - runs, 0))
+    except KeyboardInterrupt:
+        logger.info('Stopped watching')
+
+
+def _index(args: argparse.Namespace, logger: logging.Logger) -> None:
+    """Update or query the release timeline index."""
+    # pylint:disable=import-outside-toplevel
+    import json
+    import git
+    from auto_tag import timeline
+
+    repo = None
+    database = args.database
+    if database is None:
+        repo = git.Repo(args.repo, odbt=git.GitDB)
+        database = os.path.join(repo.common_dir, constants.DEFAULT_INDEX_FILE)
+
+    with timeline.TimelineIndex(database, logger=logger) as index:
+        if args.contains is not None or args.show is not None:
+            if args.contains is not None:
+                release = index.release_containing(args.contains)
+            else:
+                release = index.release(args.show)
+            if release is None:
+                logger.error('No indexed release found')
+                sys.exit(1)
+            print(release.tag if args.contains is not None else json.dumps(
+                release.to_dict(), indent=2))
+        elif args.list:
+            print(json.dumps([release.to_dict()
+                              for release in index.releases()], indent=2))
+        else:
+            index.update(repo or git.Repo(args.repo, odbt=git.GitDB),
+                         args.branch, _load_config(args).detectors,
+                         rebuild=args.rebuild)
+
+
+def _write_output(path: Optional[str], output: str) -> None:
+    """Write the output of a command to a file, or to stdout."""
+    if path:
+        with open(path, 'w', encoding='utf-8') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+def _changelog(args: argparse.Namespace, logger: logging.Logger) -> None:
+    """Print the notes of the releases selected by the CLI arguments."""
+    # pylint:disable=import-outside-toplevel
+    import git
+    from auto_tag import changelog
+
+    repo = git.Repo(args.repo, odbt=git.GitDB)
+    notes = changelog.generate(repo, args.to or args.branch, args.since)
+    logger.debug('Found %d releases', len(notes))
+    if args.format == constants.CHANGELOG_FORMAT_JSON:
+        output = changelog.to_json(notes) + '\n'
+    else:
+        output = changelog.to_markdown(notes)
+
+    _write_output(args.output, output)
+
+
+def _backfill(args: argparse.Namespace, logger: logging.Logger) -> None:
+    """Print the tags a backfill of the branch would create."""
+    # pylint:disable=import-outside-toplevel
+    import json
+    import git
+    from auto_tag import backfill, tag_search_strategy
+
+    repo = git.Repo(args.repo, odbt=git.GitDB)
+    plan = backfill.Backfill(
+        repo, args.branch,
+        _load_config(args).detectors, every_commit=args.every_commit,
+        append_v=args.append_v_to_tag, checkpoint=args.checkpoint,
+        checkpoint_every=args.checkpoint_every, logger=logger,
+        search_strategy=tag_search_strategy.SEARCH_METHODS_MAPPING[
+            args.tag_search_strategy]).run()
+    if args.format == constants.BACKFILL_FORMAT_JSON:
+        output = json.dumps(
+            [planned.to_dict() for planned in plan], indent=2) + '\n'
+    else:
+        output = ''.join(
+            '{} {} {}\n'.format(planned.tag, planned.sha, planned.change_type)
+            for planned in plan)
+    _write_output(args.output, output)
+
+    if args.apply:
+        if args.name:
+            repo.git.update_environment(GIT_COMMITTER_NAME=args.name)
+        if args.email:
+            repo.git.update_environment(GIT_COMMITTER_EMAIL=args.email)
+        backfill.create_tags(repo, plan, pack_refs=args.pack_refs)
+        logger.info('Created %d tags', len(plan))
+
+
+_COMMANDS = {
+    cli.COMMAND_INDEX: (cli.get_index_parser, _index),
+    cli.COMMAND_CHANGELOG: (cli.get_changelog_parser, _changelog),
+    cli.COMMAND_BACKFILL: (cli.get_backfill_parser, _backfill),
+    cli.COMMAND_WATCH: (cli.get_watch_parser, _watch),
+}
+
+
+def main(cli_args: List[str]) -> None:
+    """Main entry point for Auto-Tag module."""
+
+    if cli_args and cli_args[0] in _COMMANDS:
+        get_parser, command = _COMMANDS[cli_args[0]]
+        args = get_parser().parse_args(cli_args[1:])
+        command(args, _get_logger(args.logging))
+        return
+
+    parser = cli.get_parser()
+    args = parser.parse_args(cli_args)
+    logger = _get_logger(args.logging)
+    _tag(args, logger, cli_args)
 
 
 if __name__ == '__main__':
@@ -26,3 +26,23 @@ class CantFindBranch(BaseAutoTagException):
 
 class UnknowkSearchStrategy(BaseAutoTagException):
     """Invalid search strategy."""
+
+
+class TagAllocationFailed(BaseAutoTagException):
+    """Can't create a tag that no other run created."""
+
+
+class TimelineIndexError(BaseAutoTagException):
+    """The release timeline index can't be used."""
+
+
+class AmbiguousCommit(BaseAutoTagException):
+    """An abbreviated sha matches more than one commit."""
+
+
+class InvalidPrereleaseChannel(BaseAutoTagException):
+    """A pre-release channel is not a valid identifier."""
+
+
+class ScanBudgetExceeded(BaseAutoTagException):
+    """The new commits can't be scanned within the budget."""
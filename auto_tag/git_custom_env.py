@@ -4,6 +4,7 @@ Automatically tags branches base on commit message
 """
 from typing import Optional
 from typing import Any
+from typing import Union
 
 import git
 
@@ -12,10 +13,16 @@ class GitCustomeEnvironment():
     """Custom Git Configuration context manager."""
 
     # pylint: disable=no-member
-    def __init__(self, repo_path: str,
+    def __init__(self, repo_path: Union[str, git.Repo],
                  name: Optional[str], email: Optional[str]) -> None:
-        """Initialize the context manager."""
-        self._repo = git.Repo(repo_path, odbt=git.GitDB)
+        """Initialize the context manager.
+
+        :param repo_path: Path to the repository or an already open git.Repo
+        """
+        if isinstance(repo_path, git.Repo):
+            self._repo = repo_path
+        else:
+            self._repo = git.Repo(repo_path, odbt=git.GitDB)
         self._name = name
         self._email = email
         self._old_name = None
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Run cost metrics exported as an OpenMetrics textfile.
+
+The file is meant to be picked up by the node-exporter textfile collector,
+so it is written atomically (temporary file + rename).
+"""
+import os
+import time
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0)
+
+PHASE_DURATION = 'auto_tag_phase_duration_seconds'
+PUSH_DURATION = 'auto_tag_push_duration_seconds'
+TAGS_ENUMERATED = 'auto_tag_tags_enumerated'
+TAGS_PEELED = 'auto_tag_tags_peeled'
+COMMITS_SCANNED = 'auto_tag_commits_scanned'
+DETECTOR_EVALUATIONS = 'auto_tag_detector_evaluations'
+DETECTOR_HITS = 'auto_tag_detector_hits'
+TAG_ALLOCATION_RETRIES = 'auto_tag_tag_allocation_retries'
+
+HELP = {
+    PHASE_DURATION: 'Wall time spent in every phase of the run.',
+    PUSH_DURATION: 'Time spent pushing the tag to every remote.',
+    TAGS_ENUMERATED: 'Tags listed while searching for the last tag.',
+    TAGS_PEELED: 'Tags peeled to their commit while searching.',
+    COMMITS_SCANNED: 'Commits read after the last tag.',
+    DETECTOR_EVALUATIONS: 'Detector evaluations on commits.',
+    DETECTOR_HITS: 'Detector evaluations that triggered.',
+    TAG_ALLOCATION_RETRIES: 'Tags recomputed because another run took them.',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def _format_labels(labels: Labels) -> str:
+    """Render labels as `{name="value",...}`."""
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value))
+                          for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class RunMetrics():
+    """Collect counters and histograms describing the cost of a run."""
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None,
+                 buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        """Initialize the metrics.
+
+        :param const_labels: Labels added to every sample (ex. repo, branch)
+        :param buckets: Upper bounds of the histogram buckets, in seconds
+        """
+        self._const_labels = tuple(sorted((const_labels or {}).items()))
+        self._buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+
+    def _labels(self, labels: Dict[str, str]) -> Labels:
+        return self._const_labels + tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """Increment the counter `name`."""
+        samples = self._counters.setdefault(name, {})
+        key = self._labels(labels)
+        samples[key] = samples.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Add an observation to the histogram `name`."""
+        self._histograms.setdefault(name, {}).setdefault(
+            self._labels(labels), []).append(value)
+
+    def observe_phases(self, phases: Dict[str, Dict[str, float]]) -> None:
+        """Add the wall time of every phase recorded by a PhaseProfiler."""
+        for phase, values in phases.items():
+            self.observe(PHASE_DURATION, values['wall'], phase=phase)
+
+    def counter(self, name: str) -> float:
+        """Return the total value of a counter over all its labels."""
+        return sum(self._counters.get(name, {}).values())
+
+    def render(self) -> str:
+        """Render all the metrics in the OpenMetrics text format."""
+        lines = []
+        for name in sorted(self._counters):
+            lines.append('# HELP {} {}'.format(name, HELP.get(name, name)))
+            lines.append('# TYPE {} counter'.format(name))
+            for labels, value in sorted(self._counters[name].items()):
+                lines.append('{}_total{} {}'.format(
+                    name, _format_labels(labels), _format_value(value)))
+
+        for name in sorted(self._histograms):
+            lines.append('# HELP {} {}'.format(name, HELP.get(name, name)))
+            lines.append('# TYPE {} histogram'.format(name))
+            lines.append('# UNIT {} seconds'.format(name))
+            for labels, values in sorted(self._histograms[name].items()):
+                for bound in self._buckets + (float('inf'),):
+                    count = sum(1 for value in values if value <= bound)
+                    bound_label = '+Inf' if bound == float('inf') else repr(
+                        bound)
+                    lines.append('{}_bucket{} {}'.format(
+                        name, _format_labels(labels + (('le', bound_label),)),
+                        count))
+                lines.append('{}_sum{} {}'.format(
+                    name, _format_labels(labels), repr(float(sum(values)))))
+                lines.append('{}_count{} {}'.format(
+                    name, _format_labels(labels), len(values)))
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write the metrics to `path`."""
+        tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), time.time_ns())
+        with open(tmp_path, 'w', encoding='utf-8') as stream:
+            stream.write(self.render())
+        os.replace(tmp_path, path)
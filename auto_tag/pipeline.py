@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Overlap reading the commits from git with classifying them.
+
+Without a pipeline the new commits are listed, then classified, then
+read again for the tag message, so git and Python take turns. Here a
+reader thread streams the commits from a single `git log` process into
+a bounded queue, in batches, while the caller classifies them and
+collects the headings of the tag message. The reader spends its time
+waiting on git, without holding the GIL, so a run takes about as long as
+the slowest of the two instead of their sum.
+
+The queue is bounded: when the caller is slower than git the reader
+stops reading and git blocks on the full pipe, so the memory used
+doesn't grow with the length of the history.
+"""
+import binascii
+import queue
+import threading
+from types import TracebackType
+from typing import Any, Iterator, List, Optional, Type
+
+import git
+
+from auto_tag import constants
+
+# NOTE: marks the end of the stream in the queue
+_END = object()
+# NOTE: seconds between two checks that the reader was stopped
+_POLL_INTERVAL = 0.1
+_CHUNK_SIZE = 1 << 16
+
+
+def _make_commit(repo: git.Repo, header: bytes,
+                 body: bytes) -> git.objects.commit.Commit:
+    """Return a commit with the sha, parents and message already set.
+
+    The other attributes are read from the object database when they are
+    first accessed, as for any commit listed by GitPython.
+    """
+    sha, *parents = header.decode('ascii').split()
+    return git.objects.commit.Commit(
+        repo, binascii.unhexlify(sha),
+        message=body.decode('utf-8', 'replace'),
+        parents=tuple(
+            git.objects.commit.Commit(repo, binascii.unhexlify(parent))
+            for parent in parents))
+
+
+def heading(commit: git.objects.commit.Commit) -> str:
+    """Return the first line of the message of a commit."""
+    return str(commit.message).split('\n', 1)[0].strip()
+
+
+class CommitReader():
+    """Stream the commits of a range from a reader thread.
+
+    Use it as a context manager and iterate over it to get the commits in
+    batches, newest first, in the order of `git log`::
+
+        with pipeline.CommitReader(repo, 'v1.0.0..master') as reader:
+            for batch in reader:
+                ...
+
+    Leaving the context early stops the reader and git.
+    """
+
+    def __init__(self, repo: git.Repo, rev: str, first_parent: bool = False,
+                 batch_size: int = constants.DEFAULT_PIPELINE_BATCH,
+                 depth: int = constants.DEFAULT_PIPELINE_DEPTH) -> None:
+        """Initialize the reader.
+
+        :param repo: Repository to read the commits from
+        :param rev: Range of commits to read, ex. `v1.0.0..master`
+        :param first_parent: Only follow the first parent of merge commits
+        :param batch_size: Number of commits in a batch
+        :param depth: Number of batches the queue holds, the reader waits
+                      when it is full
+        """
+        self._repo = repo
+        self._rev = rev
+        self._first_parent = first_parent
+        self._batch_size = batch_size
+        self._queue: 'queue.Queue[Any]' = queue.Queue(maxsize=depth)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._read, name='auto-tag-commit-reader', daemon=True)
+        self._process: Optional[Any] = None
+        self._done = False
+
+    def __enter__(self) -> 'CommitReader':
+        """Start the reader thread."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        """Stop the reader thread."""
+        self.close()
+
+    def __iter__(self) -> Iterator[List[git.objects.commit.Commit]]:
+        """Yield the batches of commits as the reader produces them.
+
+        :raises git.GitCommandError: If git failed to list the commits
+        """
+        while not self._done:
+            item = self._queue.get()
+            if item is _END:
+                self._done = True
+            elif isinstance(item, Exception):
+                self._done = True
+                raise item
+            else:
+                yield item
+
+    def close(self) -> None:
+        """Stop the reader thread and git, if they are still running."""
+        self._stopped.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _put(self, item: Any) -> bool:
+        """Queue an item, waiting while the queue is full.
+
+        :returns: False if the reader was stopped while waiting
+        :rtype: bool
+        """
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _records(self) -> Iterator[git.objects.commit.Commit]:
+        """Yield the commits of the range as git lists them."""
+        args = ['-z', '--format=%H %P%x00%B']
+        if self._first_parent:
+            args.append('--first-parent')
+        self._process = self._repo.git.log(
+            *args, self._rev, '--', as_process=True)
+        stdout = self._process.stdout
+        # NOTE: the commits are separated by NUL, as are their header
+        # and message, so the fields alternate between the two
+        fields: List[bytes] = []
+        pending = b''
+        try:
+            for chunk in iter(lambda: stdout.read1(_CHUNK_SIZE), b''):
+                if self._stopped.is_set():
+                    return
+                *complete, pending = (pending + chunk).split(b'\x00')
+                fields.extend(complete)
+                for index in range(0, len(fields) - 1, 2):
+                    yield _make_commit(
+                        self._repo, fields[index], fields[index + 1])
+                del fields[:len(fields) - len(fields) % 2]
+            self._process.wait()
+        finally:
+            if self._process.poll() is None:
+                self._process.kill()
+
+    def _read(self) -> None:
+        """Read the commits into the queue, in batches."""
+        try:
+            batch: List[git.objects.commit.Commit] = []
+            for commit in self._records():
+                batch.append(commit)
+                if len(batch) >= self._batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+            if batch and not self._put(batch):
+                return
+        except Exception as error:  # pylint: disable=broad-except
+            if not self._put(error):
+                return
+        self._put(_END)
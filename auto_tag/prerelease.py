@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Pre-release channels.
+
+A pre-release of the next version is tagged `<version>-<channel>.<N>`,
+ex. `1.2.0-rc.3`. The version is computed as for a release, from the last
+stable tag, and `N` is one more than the highest counter already tagged
+for that version and channel.
+
+The counters are found by listing only the refs under the
+`refs/tags/<version>-<channel>.` prefix. Git looks a prefix up directly
+(a binary search in `packed-refs` and a single directory of loose refs)
+so the cost doesn't depend on how many tags the repository has.
+"""
+import re
+from typing import Optional
+
+import git
+import semantic_version
+
+from auto_tag import exception
+from auto_tag import tag_writer
+
+_CHANNEL = re.compile('[0-9A-Za-z-]+')
+
+
+def validate_channel(channel: str) -> None:
+    """Check that a channel is a valid semantic version identifier.
+
+    :raises exception.InvalidPrereleaseChannel: If it isn't
+    """
+    if not _CHANNEL.fullmatch(channel) or channel.isdigit():
+        raise exception.InvalidPrereleaseChannel(
+            'Pre-release channel {} is not valid, it must only contain '
+            'letters, digits and hyphens and not be a number'.format(channel))
+
+
+def tag_prefix(version: semantic_version.Version, channel: str,
+               append_v: bool = False) -> str:
+    """Return the prefix of the pre-release tags of a version."""
+    return '{}{}-{}.'.format('v' if append_v else '', version, channel)
+
+
+def last_counter(repo: git.Repo, version: semantic_version.Version,
+                 channel: str, append_v: bool = False) -> Optional[int]:
+    """Return the highest counter tagged for a version and channel.
+
+    :param repo: Repository to query
+    :param version: Version the pre-releases are for, ex. `1.2.0`
+    :param channel: Pre-release channel, ex. `rc`
+    :param append_v: The tags start with a v (ex v1.2.0-rc.1)
+
+    :returns: The highest counter, None if there is no such pre-release
+    :rtype: int
+    """
+    prefix = tag_prefix(version, channel, append_v)
+    output = repo.git.for_each_ref(
+        '--format=%(refname:strip=2)',
+        '{}{}*'.format(tag_writer.TAGS_PREFIX, prefix))
+    counters = [int(name[len(prefix):]) for name in output.splitlines()
+                if name[len(prefix):].isdigit()]
+    return max(counters) if counters else None
+
+
+def next_prerelease(repo: git.Repo, version: semantic_version.Version,
+                    channel: str,
+                    append_v: bool = False) -> semantic_version.Version:
+    """Return the next pre-release of a version, ex. `1.2.0-rc.4`."""
+    counter = last_counter(repo, version, channel, append_v)
+    return semantic_version.Version('{}-{}.{}'.format(
+        version, channel, 1 if counter is None else counter + 1))
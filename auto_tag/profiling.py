@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Profiling helpers.
+
+`PhaseProfiler` keeps wall time, CPU time and call counts for the phases
+of a run, it is cheap enough to always be enabled. `RunProfiler` profiles
+a whole run with cProfile and/or a stack sampler whose output can be fed
+to flamegraph tools.
+"""
+import collections
+import contextlib
+import sys
+import threading
+import time
+from typing import Any
+from typing import Counter
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+DEFAULT_SAMPLE_INTERVAL = 0.001
+
+
+class PhaseProfiler():
+    """Record wall time, CPU time and call counts for named phases."""
+
+    def __init__(self) -> None:
+        """Initialize the profiler."""
+        self._phases: Dict[str, Dict[str, float]] = {}
+        self._started: Dict[str, Tuple[float, float]] = {}
+
+    def start(self, name: str) -> None:
+        """Mark the start of a phase."""
+        self._started[name] = (time.perf_counter(), time.process_time())
+
+    def stop(self, name: str) -> None:
+        """Mark the end of a phase started with `start`."""
+        wall_start, cpu_start = self._started.pop(name)
+        phase = self._phases.setdefault(
+            name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+        phase['wall'] += time.perf_counter() - wall_start
+        phase['cpu'] += time.process_time() - cpu_start
+        phase['calls'] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the wrapped block as the phase `name`."""
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    @property
+    def phases(self) -> Dict[str, Dict[str, float]]:
+        """Return the recorded phases in the order they first ran."""
+        return self._phases
+
+    def report(self) -> List[str]:
+        """Return a human readable table of the recorded phases."""
+        lines = ['{:<16} {:>10} {:>10} {:>6}'.format(
+            'phase', 'wall (s)', 'cpu (s)', 'calls')]
+        for name, phase in self._phases.items():
+            lines.append('{:<16} {:>10.4f} {:>10.4f} {:>6}'.format(
+                name, phase['wall'], phase['cpu'], int(phase['calls'])))
+        return lines
+
+
+class StackSampler():
+    """Periodically sample the stack of a thread.
+
+    The samples are written in the "collapsed stack" format understood by
+    `flamegraph.pl`, speedscope and similar tools.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 thread_id: Optional[int] = None) -> None:
+        """Initialize the sampler.
+
+        :param interval: Seconds between two samples
+        :param thread_id: Thread to sample, default the current one
+        """
+        self._interval = interval
+        self._thread_id = thread_id or threading.get_ident()
+        self._samples: Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def samples(self) -> Counter[str]:
+        """Return the number of samples for every collapsed stack."""
+        return self._samples
+
+    def _sample(self) -> None:
+        """Record the current stack of the sampled thread."""
+        # pylint: disable=protected-access
+        frame = sys._current_frames().get(self._thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('{}:{}'.format(code.co_filename, code.co_name))
+            frame = frame.f_back
+        if stack:
+            self._samples[';'.join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._sample()
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self._thread = threading.Thread(
+            target=self._run, name='auto-tag-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write_collapsed(self, path: str) -> None:
+        """Write the samples in the collapsed stack format."""
+        with open(path, 'w', encoding='utf-8') as stream:
+            for stack, count in sorted(self._samples.items()):
+                stream.write('{} {}\n'.format(stack, count))
+
+
+class RunProfiler():
+    """Profile a whole run with cProfile and/or a stack sampler."""
+
+    def __init__(self, pstats_path: Optional[str] = None,
+                 collapsed_path: Optional[str] = None,
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        """Initialize the profiler.
+
+        :param pstats_path: Where to dump the cProfile statistics
+        :param collapsed_path: Where to write the collapsed stacks
+        :param sample_interval: Seconds between two stack samples
+        """
+        self._pstats_path = pstats_path
+        self._collapsed_path = collapsed_path
+        self._profile: Any = None
+        if pstats_path:
+            import cProfile  # pylint: disable=import-outside-toplevel
+            self._profile = cProfile.Profile()
+        self._sampler = StackSampler(
+            sample_interval) if collapsed_path else None
+
+    def __enter__(self) -> 'RunProfiler':
+        if self._sampler is not None:
+            self._sampler.start()
+        if self._profile is not None:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, _type: Optional[Any],
+                 value: Optional[Any], traceback: Optional[Any]) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self._pstats_path)
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler.write_collapsed(str(self._collapsed_path))
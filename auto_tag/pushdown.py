@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Push detectors down to git's commit filtering.
+
+Detectors that can describe the commits they trigger on as a fixed
+string (see `BaseDetector.grep_filter`) are turned into `git log --grep`
+calls, so only the matching commits are read and evaluated in Python.
+
+The detectors are grouped by the change type they produce and the groups
+run from the most significant change type to the least significant one:
+as soon as a group triggers, the less significant ones can't change the
+result and are not run.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import git
+
+from auto_tag import constants
+from auto_tag import detectors as auto_tag_detectors
+
+
+Filter = Tuple[auto_tag_detectors.BaseDetector, str, bool]
+
+
+class PushdownPlan():
+    """Detectors grouped by change type, with their git filters."""
+
+    def __init__(self, groups: List[Tuple[int, List[Filter]]],
+                 logger: Optional[Any] = None) -> None:
+        """Initialize the plan.
+
+        :param groups: Change types, most significant first, with every
+                       detector producing it, its pattern and if the
+                       pattern ignores case
+        :param logger: If specified what logger to use
+        """
+        self._groups = groups
+        self._logger = logger or logging.getLogger(__name__)
+        #: Number of Python evaluations of every detector in the last run
+        self.evaluations: Dict[str, int] = {}
+
+    @property
+    def groups(self) -> List[Tuple[int, List[Filter]]]:
+        """Return the change types and their detectors."""
+        return self._groups
+
+    @staticmethod
+    def _grep(repo: git.Repo, rev: str, patterns: List[str],
+              ignore_case: bool, first_parent: bool) -> List[str]:
+        """Return the sha of the commits with a line matching a pattern."""
+        args = ['--format=%H', '--fixed-strings']
+        args.extend('--grep={}'.format(pattern) for pattern in patterns)
+        if ignore_case:
+            args.append('--regexp-ignore-case')
+        if first_parent:
+            args.append('--first-parent')
+        return repo.git.log(*args, rev, '--').split()
+
+    def _run_group(self, repo: git.Repo, rev: str, group: List[Filter],
+                   first_parent: bool,
+                   hits: Dict[str, List[str]]) -> bool:
+        """Evaluate the detectors of a group on their candidates.
+
+        :returns: True if any detector triggered
+        :rtype: bool
+        """
+        triggered = False
+        for ignore_case in (False, True):
+            members = [(detector, pattern) for detector, pattern, ignore
+                       in group if ignore == ignore_case]
+            if not members:
+                continue
+            candidates = self._grep(
+                repo, rev, [pattern for _, pattern in members],
+                ignore_case, first_parent)
+            for sha in candidates:
+                commit = repo.commit(sha)
+                for detector, _ in members:
+                    self.evaluations[detector.name] += 1
+                    if detector.evaluate(commit):
+                        hits[detector.name].append(sha)
+                        triggered = True
+        return triggered
+
+    def run(self, repo: git.Repo, rev: str,
+            first_parent: bool = False) -> Tuple[int, Dict[str, List[str]]]:
+        """Classify the commits of a range.
+
+        :param repo: Repository to query
+        :param rev: Range of commits to classify, ex. `1.0.0..master`
+        :param first_parent: Only follow the first parent of merges
+
+        :returns: The change type and, for every detector, the sha of the
+                  commits it triggered on. Detectors of a group that
+                  didn't run have no hits.
+        :rtype: (int, dict)
+        """
+        hits: Dict[str, List[str]] = {}
+        self.evaluations = {}
+        for _, group in self._groups:
+            for detector, _, _ in group:
+                hits[detector.name] = []
+                self.evaluations[detector.name] = 0
+
+        for change_type, group in self._groups:
+            if self._run_group(repo, rev, group, first_parent, hits):
+                self._logger.debug(
+                    'Found a %s change, skipping less significant detectors',
+                    constants.CHANGE_TYPES[change_type])
+                return change_type, hits
+        return constants.PATCH, hits
+
+
+def plan(detectors: Iterable[auto_tag_detectors.BaseDetector],
+         logger: Optional[Any] = None) -> Optional[PushdownPlan]:
+    """Return a pushdown plan, None if a detector can't be pushed down.
+
+    :param detectors: Detectors to evaluate
+    :param logger: If specified what logger to use
+
+    :returns: The plan or None if the commits have to be evaluated in
+              Python
+    :rtype: PushdownPlan
+    """
+    logger = logger or logging.getLogger(__name__)
+    groups: Dict[int, List[Filter]] = {}
+    for detector in detectors:
+        grep_filter = detector.grep_filter()
+        if detector.needs_changed_files or grep_filter is None:
+            logger.debug('Detector %s can\'t be pushed down to git',
+                         detector.name)
+            return None
+        pattern, ignore_case = grep_filter
+        groups.setdefault(detector.change_type, []).append(
+            (detector, pattern, ignore_case))
+    return PushdownPlan(sorted(groups.items(), reverse=True), logger)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+A pointer to the last release of a branch.
+
+Finding the last tag with a search strategy lists every tag and, for the
+`*-in-branch` strategies, checks which ones are on the branch. Instead,
+every tag auto-tag creates is recorded in `refs/auto-tag/last/<branch>`
+and the next run starts from it after three checks:
+
+* tags: no tag was created, deleted or moved since the pointer was
+  written, ex. by hand or by a fetch
+* existence: the tag still points to the object that was recorded
+* ancestry: the tag is an ancestor of the branch
+
+If one of them fails, ex. a newer tag was created by hand, or the branch
+was force-pushed, the search strategy is used and the pointer repaired.
+The tags are compared through a fingerprint of `for-each-ref refs/tags`,
+listed by git alone, which costs a fraction of a search strategy.
+
+The pointer is a ref to a small blob holding the name of the tag, the
+object it pointed to and the fingerprint of the tags, so it works for
+lightweight tags too and is never collected by `git gc`.
+"""
+import hashlib
+import io
+import logging
+from typing import Any, Optional, Tuple
+
+import git
+from gitdb.base import IStream
+
+from auto_tag import ancestry
+from auto_tag import tag_writer
+
+POINTER_PREFIX = 'refs/auto-tag/last/'
+
+
+def pointer_ref(branch: str) -> str:
+    """Return the ref of the release pointer of `branch`."""
+    return POINTER_PREFIX + branch
+
+
+def tags_fingerprint(repo: git.Repo) -> str:
+    """Return a hash of every tag and the object it points to."""
+    output = repo.git.for_each_ref(
+        '--format=%(refname) %(objectname)', 'refs/tags')
+    return hashlib.sha1(output.encode('utf-8')).hexdigest()
+
+
+def read_pointer(repo: git.Repo, branch: str,
+                 logger: Optional[Any] = None) -> Optional[
+                     Tuple[str, str, str]]:
+    """Return the tag recorded for a branch.
+
+    :param repo: Repository to query
+    :param branch: Branch the pointer was recorded for
+    :param logger: If specified what logger to use
+
+    :returns: The name of the tag, the sha of the object it pointed to
+              and the fingerprint of the tags, None if the branch has no
+              pointer or it is malformed
+    :rtype: (str, str, str)
+    """
+    try:
+        blob = git.Reference(repo, pointer_ref(branch)).object
+    except ValueError:
+        return None
+    try:
+        name, sha, fingerprint = blob.data_stream.read().decode(
+            'utf-8').split()
+    except ValueError:
+        # NOTE: ex. the ref was updated by hand
+        logger = logger or logging.getLogger(__name__)
+        logger.info('Release pointer of %s is stale, %s doesn\'t hold a '
+                    'tag', branch, pointer_ref(branch))
+        return None
+    return name, sha, fingerprint
+
+
+def write_pointer(repo: git.Repo, branch: str,
+                  tag: git.refs.tag.TagReference) -> None:
+    """Point the release pointer of a branch to `tag`."""
+    data = '{}\n{}\n{}\n'.format(
+        tag.name, tag.object.hexsha, tags_fingerprint(repo)).encode('utf-8')
+    istream = repo.odb.store(IStream(b'blob', len(data), io.BytesIO(data)))
+    repo.git.update_ref(pointer_ref(branch), istream.hexsha.decode('ascii'))
+
+
+def delete_pointer(repo: git.Repo, branch: str) -> None:
+    """Delete the release pointer of a branch, if it has one."""
+    repo.git.update_ref('-d', pointer_ref(branch))
+
+
+def resolve(repo: git.Repo, branch: str,
+            logger: Optional[Any] = None) -> Optional[
+                git.refs.tag.TagReference]:
+    """Return the tag of the release pointer if it is still valid.
+
+    :param repo: Repository to query
+    :param branch: Branch the pointer was recorded for
+    :param logger: If specified what logger to use
+
+    :returns: The tag, None if there is no pointer or it is not valid
+    :rtype: git.TagReference
+    """
+    logger = logger or logging.getLogger(__name__)
+    pointer = read_pointer(repo, branch, logger)
+    if pointer is None:
+        logger.debug('No release pointer for %s', branch)
+        return None
+    name, sha, fingerprint = pointer
+
+    if tags_fingerprint(repo) != fingerprint:
+        logger.info('Release pointer of %s is stale, the tags changed since '
+                    'it was written', branch)
+        return None
+    tag = git.TagReference(repo, tag_writer.tag_ref(name))
+    try:
+        exists = tag.object.hexsha == sha
+    except ValueError:
+        exists = False
+    if not exists:
+        logger.info('Release pointer of %s is stale, tag %s was deleted or '
+                    'moved', branch, name)
+        return None
+    if not ancestry.is_ancestor(repo, tag.commit.hexsha, branch):
+        logger.info('Release pointer of %s is stale, tag %s is not on the '
+                    'branch anymore', branch, name)
+        return None
+    return tag
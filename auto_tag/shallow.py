@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Support for shallow clones.
+
+CI systems usually clone with `--depth N`. If the last tag is older than
+that the tag search can't see it, so we deepen the clone step by step
+(doubling the step every time) until the search finds a tag or the clone
+is no longer shallow.
+"""
+import logging
+import os
+from typing import Any
+from typing import Callable
+from typing import Optional
+
+import git
+
+from auto_tag import constants
+
+
+def is_shallow(repo: git.Repo) -> bool:
+    """Check if the repository is a shallow clone."""
+    return os.path.isfile(_shallow_file(repo))
+
+
+def _shallow_file(repo: git.Repo) -> str:
+    """Return the path of the file where git keeps the shallow boundary."""
+    return os.path.join(repo.common_dir, 'shallow')
+
+
+def _read_boundary(repo: git.Repo) -> Optional[str]:
+    """Return the current shallow boundary or None if not shallow."""
+    try:
+        with open(_shallow_file(repo), 'r', encoding='utf-8') as stream:
+            return stream.read()
+    except FileNotFoundError:
+        return None
+
+
+def deepen(repo: git.Repo, remote: str, depth: int) -> None:
+    """Fetch `depth` more commits of history from `remote`."""
+    repo.git.fetch(remote, '--deepen={}'.format(depth))
+
+
+def deepen_until_found(
+        repo: git.Repo, remote: str, search: Callable[[], Any],
+        initial_step: int = constants.DEFAULT_DEEPEN_STEP,
+        logger: Optional[Any] = None) -> Any:
+    """Deepen a shallow clone until `search` returns something.
+
+    :param repo: Repository to deepen
+    :param remote: Name of the remote to fetch history from
+    :param search: Callable returning None while nothing was found
+    :param initial_step: How many commits to fetch on the first step, the
+                         step doubles after every fetch
+    :param logger: If specified what logger to use
+
+    :returns: The last value returned by `search`
+    """
+    logger = logger or logging.getLogger(__name__)
+    step = initial_step
+    result = search()
+
+    while result is None:
+        boundary = _read_boundary(repo)
+        if boundary is None:
+            break
+
+        logger.info('Shallow clone, no tag found. Deepening by %s '
+                    'commits from %s', step, remote)
+        deepen(repo, remote, step)
+        if _read_boundary(repo) == boundary:
+            logger.warning('Deepening from %s made no progress', remote)
+            break
+
+        step *= 2
+        result = search()
+
+    return result
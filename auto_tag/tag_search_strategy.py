@@ -10,8 +10,18 @@ from typing import Optional
 import git
 import semantic_version
 
+from auto_tag import ancestry
 from auto_tag import constants
 from auto_tag import exception
+from auto_tag import metrics as auto_tag_metrics
+
+
+def _count_tags(kwargs: Any, enumerated: int, peeled: int) -> None:
+    """Record how many tags a strategy listed and peeled."""
+    metrics = kwargs.get('metrics')
+    if metrics is not None:
+        metrics.inc(auto_tag_metrics.TAGS_ENUMERATED, enumerated)
+        metrics.inc(auto_tag_metrics.TAGS_PEELED, peeled)
 
 
 # pylint: disable=unused-argument
@@ -24,6 +34,23 @@ def clean_tag_name(tag_name: str) -> str:
     return tag_name
 
 
+def is_prerelease(tag_name: str) -> bool:
+    """Check if a tag is a pre-release, ex. `1.2.0-rc.1`."""
+    try:
+        version = semantic_version.Version(clean_tag_name(tag_name))
+    except ValueError:
+        return False
+    return bool(version.prerelease)
+
+
+def _filter_stable(tags: List[git.refs.tag.TagReference],
+                   kwargs: Any) -> List[git.refs.tag.TagReference]:
+    """Drop the pre-release tags if the strategy was asked to."""
+    if not kwargs.get('stable_only'):
+        return tags
+    return [tag for tag in tags if not is_prerelease(tag.name)]
+
+
 def get_biggest_tag_in_repo(
         repo: git.Repo, *args: Any, **kwargs: Any) -> git.refs.tag.TagReference:
     """Return the last tag for the given repo in a Version class.
@@ -37,8 +64,9 @@ def get_biggest_tag_in_repo(
         (
             tag,
             semantic_version.Version(clean_tag_name(tag.name))
-        ) for tag in repo.tags
+        ) for tag in _filter_stable(list(repo.tags), kwargs)
     ]
+    _count_tags(kwargs, len(repo.tags), 0)
 
     if sem_versions:
         latest_tag, _ = max(sem_versions, key=lambda x: x[1])
@@ -48,7 +76,8 @@ def get_biggest_tag_in_repo(
 
 def _get_tags_on_branch(
         repo: git.Repo,
-        branch_name: str) -> List[git.refs.tag.TagReference]:
+        branch_name: str,
+        first_parent: bool = False) -> List[git.refs.tag.TagReference]:
     """Get all the tags on this specific branch.
 
     :param repo: Repository to query for tags
@@ -57,17 +86,15 @@ def _get_tags_on_branch(
     :param branch_name: name of the branch
     :type branch_name: string
 
+    :param first_parent: Only consider the first-parent chain of the branch
+    :type first_parent: bool
+
     :returns: List of tags from this branch
     :rtype: list
     """
-    commits_to_tag = {tag.commit: tag for tag in repo.tags}
-    found_tags = []
-
-    for commit in repo.iter_commits(rev=branch_name):
-        if commit in commits_to_tag:
-            found_tags.append(
-                commits_to_tag[commit])
-    return found_tags
+    if first_parent:
+        return ancestry.tags_on_first_parent(repo, branch_name)
+    return ancestry.tags_reachable_from(repo, branch_name)
 
 
 def get_biggest_tag_in_branch(
@@ -80,13 +107,15 @@ def get_biggest_tag_in_branch(
     :returns: The latest tag from the repository
     :rtype: str
     """
-    tags = _get_tags_on_branch(repo, branch)
+    tags = _get_tags_on_branch(
+        repo, branch, kwargs.get('first_parent', False))
+    _count_tags(kwargs, len(tags), 0)
 
     sem_versions = [
         (
             tag,
             semantic_version.Version(clean_tag_name(tag.name))
-        ) for tag in tags
+        ) for tag in _filter_stable(tags, kwargs)
     ]
     if sem_versions:
         latest_tag, _ = max(sem_versions, key=lambda x: x[1])
@@ -105,8 +134,10 @@ def get_latest_tag_in_repo(
     :rtype: str
     """
     committed_date_to_tag = [
-        (time.gmtime(tag.commit.committed_date), tag) for tag in repo.tags
+        (time.gmtime(tag.commit.committed_date), tag)
+        for tag in _filter_stable(list(repo.tags), kwargs)
     ]
+    _count_tags(kwargs, len(committed_date_to_tag), len(committed_date_to_tag))
     # if there are no tags
     if not committed_date_to_tag:
         return None
@@ -130,8 +161,10 @@ def get_latest_tag_in_branch(
         (
             time.gmtime(tag.commit.committed_date),
             tag
-        ) for tag in _get_tags_on_branch(repo, branch)
+        ) for tag in _filter_stable(_get_tags_on_branch(
+            repo, branch, kwargs.get('first_parent', False)), kwargs)
     ]
+    _count_tags(kwargs, len(committed_date_to_tag), len(committed_date_to_tag))
     # if there are no tags
     if not committed_date_to_tag:
         return None
@@ -155,7 +188,7 @@ SEARCH_METHODS_MAPPING = {
         get_latest_tag_in_branch
 }
 
-DEFAULT_STRAGETY_NAME = constants.SEARCH_STRATEGY_BIGGEST_TAG_IN_BRANCH
+DEFAULT_STRAGETY_NAME = constants.DEFAULT_SEARCH_STRATEGY
 DEFAULT_STRATEGY = SEARCH_METHODS_MAPPING[DEFAULT_STRAGETY_NAME]
 
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Create and remove tags with atomic ref updates.
+
+A tag is created in two steps: the annotated tag object is written to the
+object database, then `refs/tags/<name>` is created with `git update-ref`
+using the all-zero old value, which only succeeds if the ref does not
+exist. Two runs computing the same version can't both own it, the loser
+sees a clean failure and can recompute.
+
+`BulkTagWriter` creates many tags at once: the tag objects are written
+as loose objects by GitPython, in process, without a git process per
+tag, and all the refs are created by a single `git update-ref --stdin`
+transaction, either all of them or none.
+"""
+import io
+import re
+import tempfile
+from typing import List, Tuple
+
+import git
+from gitdb.base import IStream
+
+from auto_tag import exception
+
+TAGS_PREFIX = 'refs/tags/'
+NULL_SHA = '0' * 40
+
+_EXTRA_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _clean_message(message: str) -> str:
+    """Clean up a message the way `git tag -m` does."""
+    lines = [line.rstrip() for line in message.splitlines()]
+    cleaned = _EXTRA_BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip('\n')
+    return cleaned + '\n' if cleaned else ''
+
+
+def tag_ref(name: str) -> str:
+    """Return the full ref of the tag `name`."""
+    return TAGS_PREFIX + name
+
+
+def _get_tagger(repo: git.Repo) -> str:
+    """Return the committer identity git would use, with the current time.
+
+    The user configuration and the `GIT_COMMITTER_*` variables are
+    honored.
+    """
+    return repo.git.var('GIT_COMMITTER_IDENT')
+
+
+def _store_tag_object(repo: git.Repo, name: str, sha: str, tagger: str,
+                      message: str) -> str:
+    """Write an annotated tag object for the commit `sha`."""
+    data = 'object {}\ntype commit\ntag {}\ntagger {}\n\n{}'.format(
+        sha, name, tagger, _clean_message(message)).encode('utf-8')
+    istream = repo.odb.store(IStream(b'tag', len(data), io.BytesIO(data)))
+    return istream.hexsha.decode('ascii')
+
+
+def write_tag_object(repo: git.Repo, name: str,
+                     commit: git.objects.commit.Commit,
+                     message: str) -> str:
+    """Write an annotated tag object for `commit` and return its sha."""
+    return _store_tag_object(
+        repo, name, commit.hexsha, _get_tagger(repo), message)
+
+
+def create_tag(repo: git.Repo, name: str,
+               commit: git.objects.commit.Commit, message: str) -> bool:
+    """Create the annotated tag `name` only if it does not exist yet.
+
+    :param repo: Repository to create the tag in
+    :param name: Name of the tag
+    :param commit: Commit to tag
+    :param message: Message of the tag
+
+    :returns: True if the tag was created, False if it already existed
+    :rtype: bool
+    """
+    tag_sha = write_tag_object(repo, name, commit, message)
+    try:
+        repo.git.update_ref(tag_ref(name), tag_sha, NULL_SHA)
+    except git.GitCommandError:
+        if tag_exists(repo, name):
+            return False
+        raise
+    return True
+
+
+def delete_tag(repo: git.Repo, name: str) -> None:
+    """Delete the tag `name` if it exists."""
+    if tag_exists(repo, name):
+        repo.git.update_ref('-d', tag_ref(name))
+
+
+def tag_exists(repo: git.Repo, name: str) -> bool:
+    """Return True if the tag `name` exists."""
+    try:
+        repo.git.show_ref('--verify', '--quiet', tag_ref(name))
+    except git.GitCommandError:
+        return False
+    return True
+
+
+def existing_tags(repo: git.Repo, names: List[str]) -> List[str]:
+    """Return the tags of `names` that exist, listed by one git process."""
+    existing = set(repo.git.for_each_ref(
+        '--format=%(refname)', TAGS_PREFIX).splitlines())
+    return [name for name in names if tag_ref(name) in existing]
+
+
+def fetch_tags(repo: git.Repo, remote: str) -> None:
+    """Fetch all the tags of `remote`, replacing the local ones."""
+    repo.git.fetch(remote, '--no-tags', '+{0}*:{0}*'.format(TAGS_PREFIX))
+
+
+def _update_refs(repo: git.Repo, commands: List[str]) -> None:
+    """Run `update-ref` commands as a single transaction."""
+    with tempfile.TemporaryFile() as stream:
+        stream.write(''.join(
+            '{}\n'.format(command) for command in commands).encode('utf-8'))
+        stream.seek(0)
+        repo.git.update_ref('--stdin', istream=stream)
+
+
+def delete_tags(repo: git.Repo, names: List[str]) -> None:
+    """Delete the tags `names` with a single ref transaction."""
+    _update_refs(repo, ['delete {}'.format(tag_ref(name)) for name in names])
+
+
+class BulkTagWriter():
+    """Create many annotated tags with a single ref transaction."""
+
+    def __init__(self, repo: git.Repo, pack_refs: bool = False) -> None:
+        """Initialize the writer.
+
+        :param repo: Repository to create the tags in
+        :param pack_refs: Pack the refs once the tags are created, so the
+                          tags don't stay as thousands of loose files
+        """
+        self._repo = repo
+        self._pack_refs = pack_refs
+        self._tagger = _get_tagger(repo)
+        self._tags: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def add(self, name: str, sha: str, message: str) -> str:
+        """Write the tag object of a tag to create.
+
+        The object is written as a loose object, `git gc` packs them.
+
+        :param name: Name of the tag
+        :param sha: Commit to tag
+        :param message: Message of the tag
+
+        :returns: The sha of the tag object
+        :rtype: str
+        """
+        tag_sha = _store_tag_object(
+            self._repo, name, sha, self._tagger, message)
+        self._tags.append((name, tag_sha))
+        return tag_sha
+
+    def commit(self) -> None:
+        """Create all the refs, only if none of the tags exist yet.
+
+        :raises exception.TagAllocationFailed: If a tag already exists, no
+                                               tag is created
+        """
+        if not self._tags:
+            return
+        try:
+            _update_refs(self._repo, [
+                'create {} {}'.format(tag_ref(name), tag_sha)
+                for name, tag_sha in self._tags])
+        except git.GitCommandError as exc:
+            existing = existing_tags(
+                self._repo, [name for name, _ in self._tags])
+            if not existing:
+                raise
+            raise exception.TagAllocationFailed(
+                'Tags already exist, none was created: {}'.format(
+                    ', '.join(existing))) from exc
+        if self._pack_refs:
+            self._repo.git.pack_refs()
+        self._tags = []
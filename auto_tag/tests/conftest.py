@@ -18,6 +18,9 @@ from typing import (
     Union,
 )
 
+TEST_NAME = 'test_user'
+TEST_EMAIL = 'test@email.com'
+
 BRANCH_NAME_A = 'branch_a'
 BRANCH_NAME_B = 'branch_b'
 
@@ -33,6 +36,22 @@ TAGS = {
 }
 
 
+def set_user(repo: git.Repo) -> None:
+    """Set the identity git uses for the tags created in `repo`."""
+    with repo.config_writer() as config_writer:
+        config_writer.set_value('user', 'name', TEST_NAME)
+        config_writer.set_value('user', 'email', TEST_EMAIL)
+
+
+def commit_file(repo: git.Repo, message: str) -> git.objects.commit.Commit:
+    """Commit a new empty file with the given message."""
+    file_path = os.path.join(
+        repo.working_dir, 'f_{}'.format(len(list(repo.iter_commits()))))
+    open(file_path, 'w+').close()
+    repo.index.add([file_path])
+    return repo.index.commit(message)
+
+
 @pytest.fixture
 def simple_repo(tmpdir: LocalPath) -> str:
     """Return a simple repository with 3 basic commits and no tags."""
@@ -108,3 +127,24 @@ def simple_repo_two_branches(simple_repo: str) -> str:
             repo.create_tag(tag, ref=commit)
 
     return simple_repo
+
+
+@pytest.fixture
+def pr_merge_repo(simple_repo: str) -> str:
+    """Return a repository where a pull request was merged in master.
+
+    master: 1.0.0 - fix: hotfix - Merge pull request #1
+    pull request: 1.0.0 - feature: wip 1 - feature: wip 2 (tag 5.0.0)
+    """
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    base = repo.head.commit
+    repo.create_tag('1.0.0', ref=base)
+
+    wip = base
+    for message in ('feature: wip 1', 'feature: wip 2'):
+        wip = repo.index.commit(message, parent_commits=[wip], head=False)
+    repo.create_tag('5.0.0', ref=wip)
+
+    hotfix = repo.index.commit('fix: hotfix')
+    repo.index.commit('Merge pull request #1', parent_commits=[hotfix, wip])
+    return simple_repo
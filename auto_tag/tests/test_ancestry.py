@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the commit-graph backed ancestry queries
+"""
+from typing import Iterable
+
+import git
+import pytest
+
+from auto_tag import ancestry
+from auto_tag import constants
+from auto_tag import core
+from auto_tag import detectors
+# pylint:disable=invalid-name
+
+
+def test_ensure_commit_graph_use_does_not_write(simple_repo: str) -> None:
+    """The default mode must never write a commit-graph."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    assert not ancestry.has_commit_graph(repo)
+    assert not ancestry.ensure_commit_graph(repo, constants.COMMIT_GRAPH_USE)
+    assert not ancestry.has_commit_graph(repo)
+
+
+@pytest.mark.parametrize('mode', [constants.COMMIT_GRAPH_WRITE_IF_MISSING,
+                                  constants.COMMIT_GRAPH_REFRESH])
+def test_ensure_commit_graph_writes(mode: str, simple_repo: str) -> None:
+    """Check that the writing modes create a commit-graph."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    assert ancestry.ensure_commit_graph(repo, mode)
+    assert ancestry.has_commit_graph(repo)
+
+    # a second call must work on top of the existing commit-graph
+    assert ancestry.ensure_commit_graph(repo, mode)
+    assert ancestry.has_commit_graph(repo)
+
+
+def test_is_ancestor(simple_repo: str) -> None:
+    """Check both directions of the ancestry relation."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    commits = list(repo.iter_commits())
+    first, last = commits[-1].hexsha, commits[0].hexsha
+
+    assert ancestry.is_ancestor(repo, first, last)
+    assert ancestry.is_ancestor(repo, last, last)
+    assert not ancestry.is_ancestor(repo, last, first)
+
+
+def test_tags_reachable_from(simple_repo_two_branches: str) -> None:
+    """Only the tags from the history of a branch are returned."""
+    repo = git.Repo(simple_repo_two_branches, odbt=git.GitDB)
+    ancestry.write_commit_graph(repo)
+
+    tags_a = {tag.name for tag in ancestry.tags_reachable_from(
+        repo, 'branch_a')}
+    tags_b = {tag.name for tag in ancestry.tags_reachable_from(
+        repo, 'branch_b')}
+
+    assert tags_a == {'0.0.1', '1.0.1', '0.1.1'}
+    assert tags_b == {'0.0.1', '1.0.1', '0.1.1', '1.1.1'}
+
+
+def test_work_writes_commit_graph(
+    simple_repo: str,
+    default_detectors: Iterable[detectors.BaseDetector]
+) -> None:
+    """Check that AutoTag can create the commit-graph before tagging."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    autotag = core.AutoTag(
+        repo=simple_repo,
+        branch='master',
+        upstream_remotes=None,
+        detectors=default_detectors,
+        git_name='test_user',
+        git_email='test@email.com',
+        commit_graph_mode=constants.COMMIT_GRAPH_WRITE_IF_MISSING)
+    autotag.work()
+
+    assert ancestry.has_commit_graph(repo)
+    assert '0.0.1' in repo.tags
+
+
+def test_tags_on_first_parent(pr_merge_repo: str) -> None:
+    """Tags only reachable through a merged branch are ignored."""
+    repo = git.Repo(pr_merge_repo, odbt=git.GitDB)
+    assert [tag.name for tag in ancestry.tags_reachable_from(
+        repo, 'master')] == ['1.0.0', '5.0.0']
+    assert [tag.name for tag in ancestry.tags_on_first_parent(
+        repo, 'master')] == ['1.0.0']
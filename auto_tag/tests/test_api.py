@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the in-process API
+"""
+import json
+import os
+
+import git
+from py._path.local import LocalPath
+
+from auto_tag import api
+from auto_tag import constants
+from auto_tag import detectors
+from auto_tag import detectors_config
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME, commit_file
+# pylint:disable=invalid-name
+
+
+def test_result_of_a_run(simple_repo: str, tmpdir: LocalPath) -> None:
+    """The result must describe the whole run."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    base = list(repo.iter_commits())[-1]
+    repo.create_tag('1.2.3', ref=base)
+    feature = commit_file(repo, 'feature(api): new endpoint')
+    fix = commit_file(repo, 'fix(api): typo')
+
+    cloned_repo_path = os.path.join(tmpdir, 'cloned-repo')
+    cloned_repo = repo.clone(cloned_repo_path)
+
+    result = api.tag_repository(
+        cloned_repo_path, 'master', upstream_remotes=['origin'],
+        git_name=TEST_NAME, git_email=TEST_EMAIL)
+
+    assert result.last_tag == '1.2.3'
+    assert result.commit_range == (base.hexsha, fix.hexsha)
+    assert result.commits == [
+        fix.hexsha, feature.hexsha] + [
+            commit.hexsha for commit in list(repo.iter_commits())[2:-1]]
+    assert result.detector_hits == {
+        'check_for_feature_heading': [feature.hexsha],
+        'check_for_breaking_change': [],
+    }
+    assert result.change_type == constants.MINOR
+    assert result.change_type_name == 'MINOR'
+    assert result.next_tag == '1.3.0'
+    assert result.created
+    assert result.pushed
+    assert result.pushed_remotes == {'origin': True}
+    assert '1.3.0' in cloned_repo.tags
+    assert '1.3.0' in repo.tags
+    assert json.loads(json.dumps(result.to_dict()))['change_type'] == 'MINOR'
+
+
+def test_reuse_repo_and_detectors(simple_repo: str) -> None:
+    """An open repository and built detectors can be reused."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    compiled = [detectors.CommitMessageContainsDetector(
+        'breaking', 'MAJOR', pattern='!:')]
+
+    first = api.tag_repository(repo, detectors=compiled,
+                               git_name=TEST_NAME, git_email=TEST_EMAIL)
+    commit_file(repo, 'feat!: drop the old API')
+    second = api.tag_repository(repo, detectors=compiled,
+                                git_name=TEST_NAME, git_email=TEST_EMAIL)
+
+    assert first.next_tag == '0.0.1'
+    assert first.last_tag is None
+    assert first.commit_range[0] is None
+    assert second.last_tag == '0.0.1'
+    assert second.next_tag == '1.0.0'
+    assert not second.pushed
+    assert second.pushed_remotes == {}
+
+
+def test_skipped_run(simple_repo: str) -> None:
+    """Nothing is created when the last commit is already tagged."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('0.1.0', ref=repo.head.commit)
+
+    result = api.tag_repository(
+        simple_repo, detectors=detectors_config.DEFAULT_DETECTORS,
+        search_strategy=constants.SEARCH_STRATEGY_LATEST_TAG_IN_REPO,
+        skip_if_exists=True, upstream_remotes=['origin'])
+
+    assert result.next_tag == '0.1.1'
+    assert result.commits == []
+    assert not result.created
+    assert not result.pushed
+    assert '0.1.1' not in repo.tags
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test the backfill of untagged histories
+"""
+import json
+import os
+from typing import Iterable, List
+
+import git
+import pytest
+from py._path.local import LocalPath
+
+from auto_tag import backfill
+from auto_tag import detectors
+from auto_tag import entrypoint
+# pylint:disable=invalid-name
+
+
+def _merge_pull_request(repo: git.Repo,
+                        messages: List[str]) -> git.objects.commit.Commit:
+    """Merge a pull request with the given commits into the branch."""
+    wip = base = repo.head.commit
+    for message in messages:
+        wip = repo.index.commit(message, parent_commits=[wip], head=False)
+    return repo.index.commit('Merge pull request',
+                             parent_commits=[base, wip])
+
+
+@pytest.fixture
+def untagged_repo(simple_repo: str) -> str:
+    """Return a repository with three pull requests merged after 1.0.0."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    _merge_pull_request(repo, ['feature: api', 'fix: review'])
+    _merge_pull_request(repo, ['fix: typo'])
+    repo.index.commit('BREAKING_CHANGE: drop python 2')
+    _merge_pull_request(repo, ['fix: docs'])
+    repo.index.commit('not merged yet')
+    return simple_repo
+
+
+def test_segment(untagged_repo: str) -> None:
+    """Every commit belongs to the first merge containing it."""
+    repo = git.Repo(untagged_repo, odbt=git.GitDB)
+    base = repo.commit('1.0.0').hexsha
+
+    points = backfill.release_points(repo, 'master', base)
+    commits = backfill.segment(repo, 'master', points, base)
+
+    assert len(points) == 3
+    assert [len(commits[point]) for point in points] == [3, 2, 3]
+    assert len(backfill.release_points(
+        repo, 'master', base, every_commit=True)) == 5
+
+
+def test_plan(untagged_repo: str,
+              default_detectors: Iterable[detectors.BaseDetector]) -> None:
+    """The version is bumped at every merge, oldest first."""
+    repo = git.Repo(untagged_repo, odbt=git.GitDB)
+
+    plan = backfill.Backfill(repo, 'master', default_detectors).run()
+
+    assert [(planned.tag, planned.previous, planned.change_type)
+            for planned in plan] == [
+                ('1.1.0', '1.0.0', 'MINOR'),
+                ('1.1.1', '1.1.0', 'PATCH'),
+                ('2.0.0', '1.1.1', 'MAJOR')]
+    assert repo.tags['1.0.0'].commit.hexsha not in [
+        planned.sha for planned in plan]
+    assert '1.1.0' not in repo.tags
+
+
+def test_resume_from_checkpoint(
+        untagged_repo: str, tmpdir: LocalPath,
+        default_detectors: Iterable[detectors.BaseDetector]) -> None:
+    """A backfill continues after the last checkpointed release point."""
+    repo = git.Repo(untagged_repo, odbt=git.GitDB)
+    checkpoint = os.path.join(tmpdir, 'checkpoint.json')
+    expected = [planned.to_dict() for planned in backfill.Backfill(
+        repo, 'master', default_detectors).run()]
+
+    # NOTE: a backfill of master interrupted after the second merge
+    master = repo.head.reference
+    repo.head.reference = repo.create_head('partial', 'master~2')
+    partial = backfill.Backfill(repo, 'partial', default_detectors,
+                                checkpoint=checkpoint).run()
+    assert len(partial) == 2
+
+    with open(checkpoint, encoding='utf-8') as stream:
+        state = json.load(stream)
+    state['branch'] = 'master'
+    with open(checkpoint, 'w', encoding='utf-8') as stream:
+        json.dump(state, stream)
+    repo.head.reference = master
+
+    resumed = backfill.Backfill(repo, 'master', default_detectors,
+                                checkpoint=checkpoint, checkpoint_every=1)
+    assert [planned.to_dict() for planned in resumed.run()] == expected
+
+
+def test_backfill_command(untagged_repo: str,
+                          capsys: pytest.CaptureFixture) -> None:
+    """The backfill command prints the plan."""
+    entrypoint.main(['backfill', '-r', untagged_repo, '--append-v-to-tag',
+                     '-l', 'ERROR'])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines] == [
+        'v1.1.0', 'v1.1.1', 'v2.0.0']
+    assert lines[-1].split()[2] == 'MAJOR'
+
+
+def test_backfill_apply(untagged_repo: str) -> None:
+    """The planned tags are created when asked to."""
+    entrypoint.main(['backfill', '-r', untagged_repo, '--apply',
+                     '--name', 'test_user', '--email', 'test@email.com',
+                     '-l', 'ERROR'])
+
+    repo = git.Repo(untagged_repo, odbt=git.GitDB)
+    assert sorted(str(tag) for tag in repo.tags) == [
+        '1.0.0', '1.1.0', '1.1.1', '2.0.0']
+    assert repo.tags['2.0.0'].commit == repo.commit('master~1')
+    tag_object = repo.tags['2.0.0'].tag
+    assert tag_object is not None
+    assert tag_object.tagger.name == 'test_user'
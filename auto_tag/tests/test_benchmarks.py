@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the benchmark suite and its repository generator
+"""
+import json
+import os
+
+import git
+from py._path.local import LocalPath
+
+from benchmarks import repo_generator
+from benchmarks import run
+from auto_tag import tag_search_strategy
+# pylint:disable=invalid-name
+
+
+def test_generate_repo_shape(tmpdir: LocalPath) -> None:
+    """The generated repository must respect the requested shape."""
+    shape = repo_generator.RepoShape(
+        commits=60, tags=5, merge_every=3, side_length=2, prefixes=4,
+        message_size=300)
+    repo_path = repo_generator.generate_repo(
+        os.path.join(tmpdir, 'repo'), shape)
+    repo = git.Repo(repo_path)
+
+    commits = list(repo.iter_commits(rev=repo_generator.BRANCH))
+    assert len(commits) == 60
+    assert any(len(commit.parents) == 2 for commit in commits)
+    assert len(repo.tags) == 5
+    assert {path.split('/')[0] for path in
+            repo.git.ls_tree('-r', '--name-only', 'master').split()} == {
+                'project_0', 'project_1', 'project_2', 'project_3'}
+    assert len(commits[0].message) > 300
+
+    biggest = tag_search_strategy.get_biggest_tag_in_repo(repo)
+    assert biggest.name == repo_generator.tag_name(4)
+
+
+def test_run_benchmarks_records_json(tmpdir: LocalPath) -> None:
+    """Every benchmark must be present in the recorded results."""
+    output = os.path.join(tmpdir, 'results.json')
+    run.main(['--shape', 'small', '--repeat', '1', '--scan-commits', '100',
+              '-o', output])
+
+    with open(output, 'r', encoding='utf-8') as stream:
+        report = json.load(stream)
+
+    for name in tag_search_strategy.SEARCH_METHODS_MAPPING:
+        assert 'search_strategy[{}]'.format(name) in report['benchmarks']
+    for name in ('get_change_type', '_create_tag_message',
+                 'get_commit_headings', 'AutoTag.work',
+                 'AutoTag.work[pipeline]'):
+        assert report['benchmarks'][name]['runs'] == 1
+    assert report['shape']['commits'] == 1000
+    assert run.compare(report, report)
+
+
+def test_run_tag_benchmarks(simple_repo: str) -> None:
+    """The tag benchmarks leave no tag behind."""
+    results = run.run_tag_benchmarks(simple_repo, 5, repeat=1)
+
+    assert set(results) == {
+        'create_tags[repo.create_tag]', 'create_tags[tag_writer.create_tag]',
+        'create_tags[BulkTagWriter]', 'create_tags[BulkTagWriter+pack_refs]'}
+    assert not git.Repo(simple_repo).tags
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test the scan budget
+"""
+import subprocess
+from typing import Any, List
+
+import git
+import pytest
+
+from auto_tag import budget
+from auto_tag import changed_files
+from auto_tag import constants
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import entrypoint
+from auto_tag import exception
+from auto_tag import tag_writer
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME
+# pylint:disable=invalid-name
+
+
+@pytest.fixture
+def long_range_repo(simple_repo: str) -> str:
+    """Return a repository with a feature and 5 fixes after 1.0.0."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    repo.index.commit('feature: api')
+    for index in range(5):
+        repo.index.commit('fix: typo #{}'.format(index))
+    return simple_repo
+
+
+def _autotag(repo: str, **kwargs: Any) -> core.AutoTag:
+    """Return an AutoTag with a minor detector for master."""
+    return core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=[detectors.CommitMessageContainsDetector(
+            'minor', 'MINOR', pattern='feature')],
+        git_name=TEST_NAME, git_email=TEST_EMAIL, **kwargs)
+
+
+def test_take() -> None:
+    """The budget is exhausted once more commits than allowed are taken."""
+    now = [0.0]
+    scan_budget = budget.ScanBudget(max_commits=5, max_seconds=10,
+                                    clock=lambda: now[0])
+
+    assert scan_budget.enabled
+    assert scan_budget.take(3) == 3
+    assert scan_budget.take(2) == 2
+    assert not scan_budget.exhausted
+    assert scan_budget.take(2) == 0
+    assert scan_budget.exhausted
+
+    scan_budget = budget.ScanBudget(max_seconds=10, clock=lambda: now[0])
+    assert scan_budget.take(100) == 100
+    now[0] = 11
+    assert scan_budget.take(1) == 0
+    assert scan_budget.exhausted
+    assert not budget.ScanBudget().enabled
+
+
+@pytest.mark.parametrize('pipeline', [True, False])
+def test_fail_fast(long_range_repo: str, pipeline: bool) -> None:
+    """By default a run fails when the budget is exhausted."""
+    with pytest.raises(exception.ScanBudgetExceeded):
+        _autotag(long_range_repo, max_commits=5, pipeline=pipeline).work()
+
+    result = _autotag(long_range_repo, max_commits=6,
+                      pipeline=pipeline).work()
+    assert not result.budget_limited
+    assert result.next_tag == '1.1.0'
+
+
+@pytest.mark.parametrize('pipeline', [True, False])
+def test_assume_bump(long_range_repo: str, pipeline: bool) -> None:
+    """The commits that were not scanned are assumed to be a bump."""
+    result = _autotag(
+        long_range_repo, max_commits=3, pipeline=pipeline,
+        budget_policy=constants.BUDGET_POLICY_ASSUME_MAJOR).work()
+
+    assert result.budget_limited
+    assert result.to_dict()['budget_limited']
+    assert len(result.commits) == 3
+    assert result.next_tag == '2.0.0'
+    tag_object = git.Repo(long_range_repo).tags['2.0.0'].tag
+    assert tag_object is not None
+    assert 'fix: typo #4' in tag_object.message
+    assert 'fix: typo #1' not in tag_object.message
+
+
+def test_time_budget(long_range_repo: str) -> None:
+    """A budget of no time scans nothing."""
+    result = _autotag(
+        long_range_repo, max_scan_seconds=0,
+        budget_policy=constants.BUDGET_POLICY_ASSUME_PATCH).work()
+
+    assert result.budget_limited
+    assert result.commits == []
+    assert result.next_tag == '1.0.1'
+
+
+def test_pipeline_reads_the_files_of_the_scanned_commits(
+        long_range_repo: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """With a budget the changed files of the whole range are not read."""
+    def _read_range(*args: Any, **kwargs: Any) -> None:
+        raise AssertionError('the whole range was read')
+
+    monkeypatch.setattr(changed_files, 'read_changed_files', _read_range)
+    files_detector = detectors.FilesChangedStartsWithDetector(
+        'files', 'MAJOR', pattern='api/')
+
+    result = core.AutoTag(
+        repo=long_range_repo, branch='master', upstream_remotes=None,
+        detectors=[files_detector], git_name=TEST_NAME,
+        git_email=TEST_EMAIL, pipeline=True, max_scan_seconds=0,
+        budget_policy=constants.BUDGET_POLICY_ASSUME_PATCH).work()
+    assert result.budget_limited
+    assert result.next_tag == '1.0.1'
+    tag_writer.delete_tag(git.Repo(long_range_repo), '1.0.1')
+
+    result = core.AutoTag(
+        repo=long_range_repo, branch='master', upstream_remotes=None,
+        detectors=[files_detector], git_name=TEST_NAME,
+        git_email=TEST_EMAIL, pipeline=True, max_scan_seconds=60).work()
+    assert not result.budget_limited
+    assert len(result.commits) == 6
+
+
+def test_continue_in_background(long_range_repo: str,
+                                monkeypatch: pytest.MonkeyPatch) -> None:
+    """The run doesn't tag, a detached run without budget does."""
+    commands: List[List[str]] = []
+
+    class FakePopen():  # pylint: disable=too-few-public-methods
+        """Record the command instead of running it."""
+        pid = 1
+
+        def __init__(self, command: List[str], **kwargs: Any) -> None:
+            commands.append(command)
+            assert kwargs['start_new_session']
+
+    monkeypatch.setattr(subprocess, 'Popen', FakePopen)
+    entrypoint.main(['-r', long_range_repo, '--max-commits', '1',
+                     '--budget-policy', 'background', '-l', 'ERROR'])
+
+    repo = git.Repo(long_range_repo)
+    assert [str(tag) for tag in repo.tags] == ['1.0.0']
+    assert commands[0][1:3] == ['-m', 'auto_tag']
+    assert commands[0][-1] == '--no-scan-budget'
+
+    entrypoint.main(commands[0][3:] + ['--name', TEST_NAME,
+                                       '--email', TEST_EMAIL])
+    assert sorted(str(tag) for tag in repo.tags) == ['1.0.0', '1.1.0']
+    assert len(commands) == 1
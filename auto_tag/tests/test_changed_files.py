@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the changed files detection
+"""
+import os
+from typing import List
+
+import git
+
+from auto_tag import changed_files
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import detectors_config
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME
+# pylint:disable=invalid-name
+
+
+def _commit_files(repo: git.Repo, message: str,
+                  paths: List[str]) -> git.objects.commit.Commit:
+    """Commit new files at the given paths."""
+    for path in paths:
+        full_path = os.path.join(repo.working_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        open(full_path, 'w+').close()
+    repo.index.add(paths)
+    return repo.index.commit(message)
+
+
+def test_read_changed_files(simple_repo: str) -> None:
+    """All the paths of a range come from one stream, merges included."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    base = repo.head.commit
+    repo.create_tag('1.0.0', ref=base)
+    api = _commit_files(repo, 'api', ['api/views.py', 'api/urls.py'])
+    side = repo.create_head('side', base)
+    repo.head.reference = side
+    repo.head.reset(index=True, working_tree=True)
+    schema = _commit_files(repo, 'schema', ['schema/migrations/0001.sql'])
+    repo.head.reference = repo.heads.master
+    repo.head.reset(index=True, working_tree=True)
+    # NOTE: the merge has the files of both parents
+    repo.git.checkout(schema.hexsha, '--', 'schema')
+    merge = repo.index.commit('merge', parent_commits=[api, schema])
+
+    changed = changed_files.read_changed_files(repo, '1.0.0..master')
+    assert changed == {
+        merge.hexsha: ('schema/migrations/0001.sql',),
+        api.hexsha: ('api/urls.py', 'api/views.py'),
+        schema.hexsha: ('schema/migrations/0001.sql',),
+    }
+    assert set(changed_files.read_changed_files(
+        repo, '1.0.0..master', first_parent=True)) == {
+            merge.hexsha, api.hexsha}
+    assert changed_files.commit_changed_files(merge) == (
+        'schema/migrations/0001.sql',)
+    assert changed_files.read_commits_changed_files(
+        repo, [merge.hexsha, api.hexsha]) == {
+            merge.hexsha: changed[merge.hexsha],
+            api.hexsha: changed[api.hexsha]}
+
+
+def test_files_changed_bump(simple_repo: str) -> None:
+    """The paths changed since the last tag drive the bump."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref=repo.head.commit)
+    api = _commit_files(repo, 'touch the api', ['api/views.py'])
+    migration = _commit_files(repo, 'add a migration',
+                              ['schema/migrations/0002.sql'])
+
+    autotag = core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=[
+            detectors.FilesChangedStartsWithDetector(
+                'api', 'MINOR', pattern='api/'),
+            detectors.FilesChangedMatchesRegexDetector(
+                'migrations', 'MAJOR', pattern=r'^schema/migrations/'),
+        ], git_name=TEST_NAME, git_email=TEST_EMAIL)
+    result = autotag.work()
+
+    assert result.next_tag == '2.0.0'
+    assert result.detector_hits == {
+        'api': [api.hexsha], 'migrations': [migration.hexsha]}
+    assert autotag.profiler.phases['changed_files']['calls'] == 1
+
+
+def test_files_not_read_without_detector(simple_repo: str) -> None:
+    """The paths are not read if no detector needs them."""
+    autotag = core.AutoTag(
+        repo=simple_repo, branch='master', upstream_remotes=None,
+        detectors=detectors_config.DEFAULT_DETECTORS,
+        git_name=TEST_NAME, git_email=TEST_EMAIL)
+    autotag.work()
+    assert 'changed_files' not in autotag.profiler.phases
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the multi release changelog
+"""
+import json
+import os
+
+import git
+import pytest
+from py._path.local import LocalPath
+
+from auto_tag import changelog
+from auto_tag import entrypoint
+from auto_tag.tests.conftest import commit_file
+# pylint:disable=invalid-name
+
+
+@pytest.fixture
+def released_repo(simple_repo: str) -> str:
+    """Return a repository with three releases and an unreleased commit.
+
+    1.0.0 - feature: api - fix: typo (1.1.0) - feature: cli (2.0.0) - wip
+    """
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    commit_file(repo, 'feature: api\n\nlong body')
+    commit_file(repo, 'fix: typo')
+    repo.create_tag('1.1.0')
+    commit_file(repo, 'feature: cli')
+    repo.create_tag('v2.0.0')
+    commit_file(repo, 'wip')
+    return simple_repo
+
+
+def test_generate(released_repo: str) -> None:
+    """Every commit is in the notes of the first release containing it."""
+    repo = git.Repo(released_repo, odbt=git.GitDB)
+
+    notes = changelog.generate(repo, 'master')
+
+    assert [(release.tag, release.previous) for release in notes] == [
+        (None, 'v2.0.0'), ('v2.0.0', '1.1.0'), ('1.1.0', '1.0.0'),
+        ('1.0.0', None)]
+    assert [heading for _, heading in notes[2].commits] == [
+        'fix: typo', 'feature: api']
+    assert [heading for _, heading in notes[3].commits] == [
+        'commit #2', 'commit #1', 'commit #0']
+
+
+def test_generate_tag_range(released_repo: str) -> None:
+    """Only the releases between two tags are generated."""
+    repo = git.Repo(released_repo, odbt=git.GitDB)
+
+    notes = changelog.generate(repo, 'v2.0.0', since='1.0.0')
+
+    assert [(release.tag, release.previous) for release in notes] == [
+        ('v2.0.0', '1.1.0'), ('1.1.0', '1.0.0')]
+    assert changelog.to_markdown(notes) == (
+        '## v2.0.0\n\n* feature: cli\n\n'
+        '## 1.1.0\n\n* fix: typo\n* feature: api\n')
+
+
+def test_changelog_command(released_repo: str, tmpdir: LocalPath,
+                           capsys: pytest.CaptureFixture) -> None:
+    """The changelog command prints Markdown or writes JSON."""
+    entrypoint.main(['changelog', '-r', released_repo, '--from', '1.1.0'])
+    assert capsys.readouterr().out == (
+        '## Unreleased\n\n* wip\n\n## v2.0.0\n\n* feature: cli\n')
+
+    output = os.path.join(tmpdir, 'changelog.json')
+    entrypoint.main(['changelog', '-r', released_repo, '--from', '1.1.0',
+                     '--to', 'v2.0.0', '--format', 'json', '-o', output])
+    with open(output) as output_file:
+        notes = json.load(output_file)
+    assert notes == [{
+        'tag': 'v2.0.0', 'previous': '1.1.0',
+        'commits': [{'sha': git.Repo(released_repo).commit('v2.0.0').hexsha,
+                     'heading': 'feature: cli'}]}]
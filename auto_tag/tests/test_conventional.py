@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test the Conventional Commits parser
+"""
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import pytest
+
+from auto_tag import conventional
+# pylint:disable=invalid-name
+
+TEST_DATA_HEADERS = [
+    ('feat: add a flag', 'feat', None, False, 'add a flag'),
+    ('Fix(api): typo', 'fix', 'api', False, 'typo'),
+    ('refactor(core)!: drop python 2', 'refactor', 'core', True,
+     'drop python 2'),
+    ('feat!: new API', 'feat', None, True, 'new API'),
+    ('feat add a flag', None, None, False, 'feat add a flag'),
+    ('feat:no space', None, None, False, 'feat:no space'),
+    ('Merge branch \'master\'', None, None, False, 'Merge branch \'master\''),
+]
+
+TEST_DATA_TRAILERS = [
+    ('feat: x\n\nBREAKING CHANGE: use /v2', True,
+     [('BREAKING CHANGE', 'use /v2')]),
+    ('feat: x\n\nbody\n\nBREAKING-CHANGE: use /v2\nRefs #12', True,
+     [('BREAKING-CHANGE', 'use /v2'), ('Refs', '12')]),
+    ('feat: x\n\nBREAKING CHANGE: use /v2\n  and /v3\n', True,
+     [('BREAKING CHANGE', 'use /v2\nand /v3')]),
+    # NOTE: a value runs on until the next trailer
+    ('feat: x\n\nBREAKING CHANGE: the api changed\n'
+     'clients must migrate to v2\n', True,
+     [('BREAKING CHANGE', 'the api changed\nclients must migrate to v2')]),
+    ('feat: x\n\nReviewed-by: Jane\nand John\nRefs #12', False,
+     [('Reviewed-by', 'Jane\nand John'), ('Refs', '12')]),
+    # NOTE: only the last paragraph holds trailers, a breaking change
+    # footer counts anywhere
+    ('feat: x\n\nBREAKING CHANGE: use /v2\n\nsome body', True, []),
+    ('feat: x\n\nbody\n\nBREAKING-CHANGE: use /v2\n\nsome body', True, []),
+    ('feat: x\n\nnot a trailer\nReviewed-by: Jane', False, []),
+    ('feat: x\n\nbreaking change: lower case is not a trailer', False, []),
+]
+
+
+@pytest.mark.parametrize('message, commit_type, scope, breaking, description',
+                         TEST_DATA_HEADERS)
+def test_parse_header(message: str, commit_type: Optional[str],
+                      scope: Optional[str], breaking: bool,
+                      description: str) -> None:
+    """Check the type, scope and breaking marker of the header."""
+    parsed = conventional.parse(message)
+    assert parsed.type == commit_type
+    assert parsed.scope == scope
+    assert parsed.breaking == breaking
+    assert parsed.description == description
+
+
+@pytest.mark.parametrize('message, breaking, trailers', TEST_DATA_TRAILERS)
+def test_parse_trailers(message: str, breaking: bool,
+                        trailers: List[Tuple[str, str]]) -> None:
+    """Check the trailers and the breaking change footer."""
+    parsed = conventional.parse(message)
+    assert parsed.breaking == breaking
+    assert parsed.trailers == trailers
@@ -13,6 +13,7 @@ from auto_tag.detectors import CommitMessageHeadStartsWithDetector
 from auto_tag import detectors
 from typing import (
     Iterable,
+    List,
     Union
 )
 from py._path.local import LocalPath
@@ -365,7 +366,7 @@ def test_push_to_multiple_remotes(
     cloned_repo = repo.clone(cloned_repo_path)
     second_remote = git.Repo.init(second_remote_path, odbt=git.GitDB)
 
-    cloned_repo.create_remote('second_remote', second_remote.common_dir)
+    cloned_repo.create_remote('second_remote', str(second_remote.common_dir))
     autotag = core.AutoTag(
         repo=cloned_repo_path,
         branch='master',
@@ -444,8 +445,10 @@ def test_tag_message_has_heading(
     autotag.work()
 
     assert '2.0.0' in repo.tags
+    tag_object = repo.tags['2.0.0'].tag
+    assert tag_object is not None
     for message in messages:
-        assert message.split('\n')[0].strip() in repo.tags['2.0.0'].tag.message
+        assert message.split('\n')[0].strip() in tag_object.message
 
 
 def test_tag_message_user_exists_and_not_specified(
@@ -567,3 +570,101 @@ def test_tag_message_user_exists_and_specify_make_sure_clean_env(
 
     assert TEST_NAME == repo_config_name
     assert TEST_EMAIL == repo_config_email
+
+
+def _commit_on(repo: git.Repo, message: str, parents: list,
+               timestamp: int) -> git.objects.commit.Commit:
+    """Commit `message` with the given parents and commit date."""
+    date = '{} +0000'.format(timestamp)
+    return repo.index.commit(message, parent_commits=parents, head=False,
+                             author_date=date, commit_date=date)
+
+
+def test_commits_from_a_tag_not_on_the_branch(
+    simple_repo: str,
+    default_detectors: Iterable[detectors.BaseDetector]
+) -> None:
+    """Only commits after the merge base are read for an unrelated tag."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    base = repo.head.commit
+    side = _commit_on(repo, 'side', [base], 2000000000)
+    tag = repo.create_tag(BIG_TAG, ref=side)
+    new = _commit_on(repo, 'new', [base], 2000000100)
+    repo.heads.master.commit = new
+
+    autotag = core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=default_detectors)
+    assert autotag.get_all_commits_from_a_tag(repo, 'master', tag) == [new]
+
+
+def test_commits_from_a_tag_skip_merged_history(
+    simple_repo: str,
+    default_detectors: Iterable[detectors.BaseDetector]
+) -> None:
+    """Commits already behind the tag are excluded on merge histories."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    base = repo.head.commit
+    # NOTE: `master_commit` is older than the tagged commit, a walk that
+    # stops at the tagged commit in date order misses it
+    master_commit = _commit_on(repo, 'master', [base], 2000000000)
+    side_old = _commit_on(repo, 'side old', [base], 2000000050)
+    side_tagged = _commit_on(repo, 'side tagged', [side_old], 2000000100)
+    tag = repo.create_tag(BIG_TAG, ref=side_tagged)
+    merge = _commit_on(repo, 'merge', [master_commit, side_tagged],
+                       2000000200)
+    repo.heads.master.commit = merge
+
+    autotag = core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=default_detectors)
+    assert autotag.get_all_commits_from_a_tag(
+        repo, 'master', tag) == [merge, master_commit]
+
+
+@pytest.mark.parametrize('first_parent, merge_units, next_tag, hits', [
+    (False, False, '5.0.1', 0),
+    (True, False, '1.0.1', 0),
+    (True, True, '1.1.0', 1),
+])
+def test_first_parent(
+    first_parent: bool, merge_units: bool, next_tag: str, hits: int,
+    pr_merge_repo: str,
+    default_detectors: Iterable[detectors.BaseDetector]
+) -> None:
+    """Check that merged commits are skipped or classified as one unit."""
+    repo = git.Repo(pr_merge_repo, odbt=git.GitDB)
+    merge, hotfix = list(repo.iter_commits(first_parent=True))[:2]
+
+    result = core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=default_detectors, git_name=TEST_NAME,
+        git_email=TEST_EMAIL, first_parent=first_parent,
+        merge_units=merge_units).work()
+
+    assert result.next_tag == next_tag
+    assert result.detector_hits['check_for_feature_heading'] == [
+        merge.hexsha] * hits
+    if first_parent:
+        assert result.commits == [merge.hexsha, hotfix.hexsha]
+
+
+@pytest.mark.parametrize('messages, next_tag', [
+    (['fix: typo', 'docs: readme'], '1.0.1'),
+    (['fix: typo', 'feat(api): endpoint'], '1.1.0'),
+    (['feat(api): endpoint', 'chore!: drop python 2'], '2.0.0'),
+])
+def test_conventional_commits(
+    messages: List[str], next_tag: str, simple_repo: str
+) -> None:
+    """One detector produces every change type."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref=repo.head.commit)
+    for message in messages:
+        repo.index.commit(message)
+
+    result = core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=[detectors.ConventionalCommitDetector('conventional')],
+        git_name=TEST_NAME, git_email=TEST_EMAIL).work()
+    assert result.next_tag == next_tag
@@ -3,10 +3,12 @@
 Test simple flows of the AutoTag application
 """
 import os
+from typing import Any
 
 import pytest
 import git
 
+from auto_tag import constants
 from auto_tag import detectors
 from auto_tag import exception
 # pylint:disable=invalid-name
@@ -149,3 +151,130 @@ def test_CommitMessageMatchesRegexDetector_trigger(
     detector = detectors.CommitMessageMatchesRegexDetector(
         'name', 'MAJOR', pattern=pattern)
     assert detector.evaluate(commit) == expected
+
+
+TEST_DATA_FILES_CHANGED_DETECTOR = [
+    (detectors.FilesChangedStartsWithDetector, 'api/', True),
+    (detectors.FilesChangedStartsWithDetector, 'schema/', False),
+    (detectors.FilesChangedMatchesRegexDetector, r'^api/.*\.py$', True),
+    (detectors.FilesChangedMatchesRegexDetector, r'migrations/', False),
+]
+
+
+@pytest.mark.parametrize('detector_class, pattern, expected',
+                         TEST_DATA_FILES_CHANGED_DETECTOR)
+def test_FilesChangedDetector_trigger(
+        detector_class: type, pattern: str, expected: bool,
+        simple_repo: str) -> None:
+    """Check the detectors on paths and on a commit."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    os.mkdir(os.path.join(repo.working_dir, 'api'))
+    file_path = os.path.join(repo.working_dir, 'api', 'views.py')
+    open(file_path, 'w+').close()
+    repo.index.add([file_path])
+    commit = repo.index.commit('change the api')
+
+    detector = detector_class('name', 'MINOR', pattern=pattern)
+    assert detector.needs_changed_files
+    assert detector.evaluate_files(['README.md', 'api/views.py']) == expected
+    assert detector.evaluate(commit) == expected
+
+
+TEST_DATA_CONVENTIONAL_DETECTOR = [
+    ('feat(api): new endpoint', 'MINOR'),
+    ('fix: typo', 'PATCH'),
+    ('docs: readme', None),
+    ('perf!: faster', 'MAJOR'),
+    ('fix: typo\n\nBREAKING CHANGE: the typo was public', 'MAJOR'),
+    ('WIP', None),
+]
+
+
+@pytest.mark.parametrize('message, expected',
+                         TEST_DATA_CONVENTIONAL_DETECTOR)
+def test_ConventionalCommitDetector_trigger(
+        message: str, expected: str, simple_repo: str) -> None:
+    """Check the change type produced for every kind of message."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    commit = repo.index.commit(message)
+
+    detector = detectors.ConventionalCommitDetector(
+        'name', 'MAJOR', types={'feat': 'MINOR', 'fix': 'PATCH'})
+    assert detector.validate_detector_params() is None
+    if expected is None:
+        assert detector.detect(commit) is None
+        assert not detector.evaluate(commit)
+    else:
+        assert detector.detect(commit) == constants.CHANGE_TYPES_REVERSE[
+            expected]
+        assert detector.evaluate(commit)
+
+
+def test_ConventionalCommitDetector_invalid_types() -> None:
+    """Check to see if the detectors validate the types mapping."""
+    detector = detectors.ConventionalCommitDetector(
+        'name', 'MAJOR', types={'feat': 'BIG'})
+    with pytest.raises(exception.DetectorValidationException):
+        assert detector.validate_detector_params()
+
+
+SCOPED_MESSAGE = 'fix: head\nline 2\nline 3\n\nbody\n\nRefs: #1\nAcked-by: Jane\n'
+
+TEST_DATA_SCOPES = [
+    (constants.SCOPE_MESSAGE, None, SCOPED_MESSAGE),
+    (constants.SCOPE_HEAD, None, 'fix: head'),
+    (constants.SCOPE_LINES, 2, 'fix: head\nline 2'),
+    (constants.SCOPE_LINES, 100, SCOPED_MESSAGE),
+    (constants.SCOPE_CHARS, 6, 'fix: h'),
+    (constants.SCOPE_TRAILERS, None, 'Refs: #1\nAcked-by: Jane'),
+]
+
+
+@pytest.mark.parametrize('scope, scope_limit, expected', TEST_DATA_SCOPES)
+def test_scope_message(scope: str, scope_limit: int, expected: str) -> None:
+    """Check the part of the message read for every scope."""
+    assert detectors.scope_message(
+        SCOPED_MESSAGE, scope, scope_limit) == expected
+
+
+def test_scope_message_without_trailers() -> None:
+    """The trailers scope is empty if the last paragraph isn't trailers."""
+    assert detectors.scope_message(
+        'fix: head\n\nmore text\nbody: text', constants.SCOPE_TRAILERS) == ''
+    assert detectors.scope_message(
+        'Refs: #1', constants.SCOPE_TRAILERS) == ''
+
+
+@pytest.mark.parametrize('detector_class', [
+    detectors.CommitMessageContainsDetector,
+    detectors.CommitMessageMatchesRegexDetector,
+])
+def test_scoped_detectors(detector_class: type, simple_repo: str) -> None:
+    """Detectors only read the part of the message in their scope."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    commit = repo.index.commit('fix: typo\n\n' + 'x' * 10000 + '\nfeature')
+
+    def detector(pattern: str, **kwargs: Any) -> detectors.BaseDetector:
+        return detector_class('name', 'MINOR', pattern=pattern, **kwargs)
+
+    assert detector('feature').evaluate(commit)
+    assert not detector('feature', scope=constants.SCOPE_HEAD).evaluate(commit)
+    assert detector('typo', scope=constants.SCOPE_HEAD).evaluate(commit)
+    assert not detector('feature', scope=constants.SCOPE_CHARS,
+                        scope_limit=100).evaluate(commit)
+    assert detector('feature', scope=constants.SCOPE_LINES,
+                    scope_limit=4).evaluate(commit)
+
+
+@pytest.mark.parametrize('scope, scope_limit', [
+    ('body', None),
+    (constants.SCOPE_LINES, None),
+    (constants.SCOPE_CHARS, 0),
+    (constants.SCOPE_CHARS, True),
+])
+def test_scope_validation(scope: str, scope_limit: int) -> None:
+    """Check to see if the detectors validate the scope."""
+    detector = detectors.CommitMessageContainsDetector(
+        'name', 'MINOR', pattern='x', scope=scope, scope_limit=scope_limit)
+    with pytest.raises(exception.DetectorValidationException):
+        assert detector.validate_detector_params()
@@ -2,10 +2,18 @@
 """
 Test simple flows of the AutoTag application
 """
+import json
 import os
+import subprocess
+import sys
 
+import pytest
+from py._path.local import LocalPath
+
+from auto_tag import constants
 from auto_tag import detectors_config
 from auto_tag import detectors
+from auto_tag import exception
 # pylint:disable=invalid-name
 
 
@@ -15,7 +23,8 @@ def test_detector_config() -> None:
         os.path.dirname(os.path.realpath(__file__)),
         'data', 'detectors_example.yaml')
 
-    config = detectors_config.DetectorsConfig.from_file(path_to_file)
+    config = detectors_config.DetectorsConfig.from_file(
+        path_to_file, use_cache=False)
     assert config.detectors
     assert len(config.detectors) == 6
 
@@ -61,3 +70,171 @@ def test_detector_config() -> None:
             assert detector.pattern == 'pattern-6'
             assert not detector.case_sensitive
             assert not detector.strip
+
+
+def _write_config(tmpdir: LocalPath, content: str) -> str:
+    """Write a configuration file and return its path."""
+    path = os.path.join(tmpdir, 'detectors.yaml')
+    with open(path, 'w', encoding='utf-8') as stream:
+        stream.write(content)
+    return path
+
+
+def test_detector_config_cache_is_used(
+        tmpdir: LocalPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The second load must not parse the YAML again."""
+    path = _write_config(tmpdir, constants.DEFAULT_CONFIG_DETECTORS)
+
+    config = detectors_config.DetectorsConfig.from_file(path)
+    names = [detector.name for detector in config.detectors]
+    assert os.path.isfile(detectors_config.get_cache_path(path))
+
+    def fail(_: str) -> None:
+        raise AssertionError('YAML parsed while a cache is present')
+
+    monkeypatch.setattr(detectors_config, '_load_yaml', fail)
+    cached = detectors_config.DetectorsConfig.from_file(path)
+    assert [detector.name for detector in cached.detectors] == names
+    assert isinstance(cached.detectors[0],
+                      detectors.CommitMessageHeadStartsWithDetector)
+
+
+def test_detector_config_cache_invalidated(tmpdir: LocalPath) -> None:
+    """A change in the configuration must not use the old plan."""
+    path = _write_config(tmpdir, constants.DEFAULT_CONFIG_DETECTORS)
+    assert len(detectors_config.DetectorsConfig.from_file(
+        path).detectors) == 2
+
+    _write_config(tmpdir, """
+detectors:
+  only_one:
+    type: CommitMessageContainsDetector
+    produce_type_change: PATCH
+    params:
+      pattern: 'fix'
+""")
+    config = detectors_config.DetectorsConfig.from_file(path)
+    assert [detector.name for detector in config.detectors] == ['only_one']
+
+
+def test_detector_config_corrupted_cache(tmpdir: LocalPath) -> None:
+    """A broken cache is ignored and replaced."""
+    path = _write_config(tmpdir, constants.DEFAULT_CONFIG_DETECTORS)
+    with open(detectors_config.get_cache_path(path), 'w',
+              encoding='utf-8') as stream:
+        stream.write('{not json')
+
+    config = detectors_config.DetectorsConfig.from_file(path)
+    assert len(config.detectors) == 2
+    with open(detectors_config.get_cache_path(path), 'r',
+              encoding='utf-8') as stream:
+        assert json.load(stream)['plan'][0]['name'] == (
+            'check_for_feature_heading')
+
+
+def test_detector_config_without_cache(tmpdir: LocalPath) -> None:
+    """Caching can be disabled."""
+    path = _write_config(tmpdir, constants.DEFAULT_CONFIG_DETECTORS)
+    config = detectors_config.DetectorsConfig.from_file(path, use_cache=False)
+    assert len(config.detectors) == 2
+    assert not os.path.exists(detectors_config.get_cache_path(path))
+
+
+def test_detector_config_unknown_type() -> None:
+    """Unknown detector types are reported while compiling."""
+    config = detectors_config.DetectorsConfig("""
+detectors:
+  broken:
+    type: NotADetector
+    produce_type_change: PATCH
+""")
+    with pytest.raises(exception.DetectorNotFound):
+        assert config.detectors
+
+
+def test_default_detectors_match_documented_yaml() -> None:
+    """The built-in detectors must be the ones from the documented YAML."""
+    documented = detectors_config.build_detectors(
+        detectors_config.compile_plan(constants.DEFAULT_CONFIG_DETECTORS))
+    default = detectors_config.DetectorsConfig.from_default().detectors
+
+    assert len(documented) == len(default)
+    for expected, actual in zip(documented, default):
+        assert type(expected) is type(actual)
+        assert vars(expected).keys() == vars(actual).keys()
+        for attribute, value in vars(expected).items():
+            if attribute != '_logger':
+                assert getattr(actual, attribute) == value
+
+
+def test_default_detectors_without_yaml() -> None:
+    """Using the default detectors must not import PyYAML."""
+    code = ('import sys\n'
+            'from auto_tag import detectors_config\n'
+            'assert detectors_config.DetectorsConfig.from_default().detectors\n'
+            'assert "yaml" not in sys.modules\n')
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_detector_config_default_change_type() -> None:
+    """produce_type_change is only optional for detectors with a default."""
+    config = detectors_config.DetectorsConfig("""
+detectors:
+  conventional:
+    type: ConventionalCommitDetector
+    params:
+      types:
+        feat: MINOR
+        perf: PATCH
+""")
+    assert config.detectors is not None
+    detector, = config.detectors
+    assert isinstance(detector, detectors.ConventionalCommitDetector)
+    assert detector.change_type_name == 'MAJOR'
+    assert detector.types == {'feat': 'MINOR', 'perf': 'PATCH'}
+
+    config = detectors_config.DetectorsConfig("""
+detectors:
+  broken:
+    type: CommitMessageContainsDetector
+    params:
+      pattern: fix
+""")
+    with pytest.raises(exception.ConfigurationError):
+        assert config.detectors
+
+
+@pytest.mark.parametrize('detector_yaml', [
+    """
+    type: CommitMessageContainsDetector
+    produce_type_change: MINOR
+    params:
+      pattern: feature
+      scope: line
+""",
+    """
+    type: CommitMessageContainsDetector
+    produce_type_change: MINOR
+    params:
+      pattern: feature
+      scope: lines
+""",
+    """
+    type: ConventionalCommitDetector
+    params:
+      types:
+        feat: MINOR
+        fix: BUGFIX
+""",
+    """
+    type: ConventionalCommitDetector
+    params:
+      types: [feat, fix]
+""",
+])
+def test_detector_config_invalid_params(detector_yaml: str) -> None:
+    """Invalid parameters fail when the configuration is loaded."""
+    config = detectors_config.DetectorsConfig(
+        'detectors:\n  invalid:' + detector_yaml)
+    with pytest.raises(exception.DetectorValidationException):
+        assert config.detectors
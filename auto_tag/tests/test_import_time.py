@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Import time regression tests
+
+The CLI runs in short lived containers, so what gets imported before any
+work is done is part of the cost of every run.
+"""
+import subprocess
+import sys
+from typing import Dict
+from typing import List
+
+import pytest
+# pylint:disable=invalid-name
+
+# NOTE: microseconds, generous on purpose to avoid flaky CI runs, the
+# entrypoint is around 10-30ms on a developer machine
+IMPORT_BUDGET_US = 100000
+
+HEAVY_MODULES = ['git', 'yaml', 'semantic_version']
+
+
+def _import_times(args: List[str]) -> Dict[str, int]:
+    """Run python with `-X importtime` and return the cumulative times."""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + args,
+        capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_entrypoint_import_budget() -> None:
+    """Importing the entrypoint must stay under the budget."""
+    times = _import_times(['-c', 'import auto_tag.entrypoint'])
+    assert times['auto_tag.entrypoint'] < IMPORT_BUDGET_US
+
+
+@pytest.mark.parametrize('args', [
+    ['-c', 'import auto_tag.entrypoint'],
+    ['-m', 'auto_tag', '--help'],
+])
+def test_no_heavy_imports(args: List[str]) -> None:
+    """The CLI must not import heavy dependencies before it needs them."""
+    times = _import_times(args)
+    for module in HEAVY_MODULES:
+        assert module not in times
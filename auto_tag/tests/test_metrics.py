@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test the OpenMetrics export
+"""
+import os
+
+import git
+from py._path.local import LocalPath
+
+from auto_tag import entrypoint
+from auto_tag import metrics
+# pylint:disable=invalid-name
+
+
+def test_render_counter() -> None:
+    """Counters are rendered with the `_total` suffix and labels."""
+    run_metrics = metrics.RunMetrics({'repo': 'a "quoted" repo'})
+    run_metrics.inc(metrics.DETECTOR_HITS, 2, detector='d1')
+    run_metrics.inc(metrics.DETECTOR_HITS, detector='d1')
+
+    text = run_metrics.render()
+    assert '# TYPE auto_tag_detector_hits counter' in text
+    assert ('auto_tag_detector_hits_total{repo="a \\"quoted\\" repo",'
+            'detector="d1"} 3') in text
+    assert text.endswith('# EOF\n')
+
+
+def test_render_histogram() -> None:
+    """Histogram buckets are cumulative and end with +Inf."""
+    run_metrics = metrics.RunMetrics(buckets=(0.1, 1.0))
+    run_metrics.observe(metrics.PHASE_DURATION, 0.05, phase='push')
+    run_metrics.observe(metrics.PHASE_DURATION, 0.5, phase='push')
+
+    lines = run_metrics.render().splitlines()
+    assert 'auto_tag_phase_duration_seconds_bucket{phase="push",le="0.1"} 1' in lines
+    assert 'auto_tag_phase_duration_seconds_bucket{phase="push",le="1.0"} 2' in lines
+    assert 'auto_tag_phase_duration_seconds_bucket{phase="push",le="+Inf"} 2' in lines
+    assert 'auto_tag_phase_duration_seconds_sum{phase="push"} 0.55' in lines
+    assert 'auto_tag_phase_duration_seconds_count{phase="push"} 2' in lines
+
+
+def test_metrics_file_cli(
+        simple_repo: str, tmpdir: LocalPath) -> None:
+    """A full run writes all the run cost metrics."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref=list(repo.iter_commits())[-1])
+    cloned_repo_path = os.path.join(tmpdir, 'cloned-repo')
+    repo.clone(cloned_repo_path)
+    metrics_file = os.path.join(tmpdir, 'auto_tag.prom')
+
+    entrypoint.main(
+        ['-r', cloned_repo_path,
+         '-b', 'master',
+         '-u', 'origin',
+         '--name', 'test_user',
+         '--email', 'test@email.com',
+         '--tag-search-strategy', 'latest-tag-in-repo',
+         '--metrics-file', metrics_file])
+
+    with open(metrics_file, 'r', encoding='utf-8') as stream:
+        text = stream.read()
+
+    labels = 'branch="master",repo="{}"'.format(cloned_repo_path)
+    assert 'auto_tag_commits_scanned_total{%s} 2' % labels in text
+    assert 'auto_tag_tags_enumerated_total{%s} 1' % labels in text
+    assert 'auto_tag_tags_peeled_total{%s} 1' % labels in text
+    # NOTE: the detectors are pushed down to git and no commit mentions
+    # the patterns, so nothing is evaluated in Python
+    assert ('auto_tag_detector_evaluations_total{%s,'
+            'detector="check_for_feature_heading"} 0' % labels) in text
+    assert ('auto_tag_detector_hits_total{%s,'
+            'detector="check_for_feature_heading"} 0' % labels) in text
+    assert ('auto_tag_push_duration_seconds_count{%s,remote="origin"} 1'
+            % labels) in text
+    for phase in ('tag_search', 'commit_walk', 'detectors', 'tag_create',
+                  'push'):
+        assert ('auto_tag_phase_duration_seconds_count{%s,phase="%s"} 1'
+                % (labels, phase)) in text
+    assert not [name for name in os.listdir(tmpdir) if name.endswith('.tmp')]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test the pipeline between the git reads and the classification
+"""
+from typing import Any, Dict, Iterable, Tuple
+
+import git
+import pytest
+
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import pipeline
+from auto_tag import tag_writer
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME
+# pylint:disable=invalid-name
+
+
+def test_reader_streams_batches(simple_repo: str) -> None:
+    """The commits are read in batches, in the order of git log."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.index.commit('feature: api\n\nwith a body')
+    repo.index.commit('', parent_commits=[repo.head.commit, repo.commit(
+        'master~2')])
+
+    with pipeline.CommitReader(repo, 'master', batch_size=2) as reader:
+        batches = list(reader)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    expected = list(repo.iter_commits('master'))
+    commits = [commit for batch in batches for commit in batch]
+    assert commits == expected
+    assert [commit.message for commit in commits] == [
+        commit.message for commit in expected]
+    assert [commit.parents for commit in commits] == [
+        commit.parents for commit in expected]
+    assert commits[1].author.name == expected[1].author.name
+
+
+def test_reader_stops_early(simple_repo: str) -> None:
+    """Leaving the context stops the reader, even with a full queue."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+
+    with pipeline.CommitReader(repo, 'master', batch_size=1,
+                               depth=1) as reader:
+        first = next(iter(reader))
+
+    assert len(first) == 1
+    assert not reader._thread.is_alive()  # pylint: disable=protected-access
+
+
+def test_reader_raises_git_errors(simple_repo: str) -> None:
+    """A failing git command is raised in the consumer."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+
+    with pytest.raises(git.GitCommandError):
+        with pipeline.CommitReader(repo, 'missing..master') as reader:
+            list(reader)
+
+
+@pytest.mark.parametrize('detector_pushdown', [True, False])
+def test_pipeline_matches_sequential(
+        simple_repo: str, detector_pushdown: bool,
+        default_detectors: Iterable[detectors.BaseDetector]) -> None:
+    """The pipeline finds the same tag, hits and message."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    for message in ('fix: typo', 'feature: api\n\nbody', 'cleanup'):
+        repo.index.commit(message)
+
+    def _run(pipelined: bool) -> Tuple[Dict[str, Any], str]:
+        result = core.AutoTag(
+            repo=repo, branch='master', upstream_remotes=None,
+            detectors=default_detectors, git_name=TEST_NAME,
+            git_email=TEST_EMAIL, detector_pushdown=detector_pushdown,
+            pipeline=pipelined).work()
+        tag_object = repo.tags[str(result.next_tag)].tag
+        assert tag_object is not None
+        message = tag_object.message
+        tag_writer.delete_tag(repo, str(result.next_tag))
+        return result.to_dict(), message
+
+    assert _run(True) == _run(False)
+    assert _run(True)[0]['next_tag'] == '1.1.0'
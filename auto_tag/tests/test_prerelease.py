@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the pre-release channels
+"""
+import git
+import pytest
+import semantic_version
+
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import exception
+from auto_tag import prerelease
+from auto_tag import tag_search_strategy
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME
+# pylint:disable=invalid-name
+
+
+def _next_tag(repo: git.Repo, channel: str = 'rc') -> str:
+    """Run auto-tag on master and return the created tag."""
+    return str(core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=[
+            detectors.CommitMessageContainsDetector(
+                'minor', 'MINOR', pattern='feature'),
+            detectors.CommitMessageContainsDetector(
+                'major', 'MAJOR', pattern='BREAKING')],
+        git_name=TEST_NAME, git_email=TEST_EMAIL,
+        prerelease=channel).work().next_tag)
+
+
+def test_last_counter(simple_repo: str) -> None:
+    """Only the tags of the version and channel are counted."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    for tag in ('1.2.0', '1.2.0-rc.2', '1.2.0-rc.10', '1.2.0-rc.x',
+                '1.2.0-beta.30', '1.2.1-rc.40', 'v1.2.0-rc.50'):
+        repo.create_tag(tag)
+    version = semantic_version.Version('1.2.0')
+
+    assert prerelease.last_counter(repo, version, 'rc') == 10
+    assert prerelease.last_counter(repo, version, 'beta') == 30
+    assert prerelease.last_counter(repo, version, 'rc', append_v=True) == 50
+    assert prerelease.last_counter(repo, version, 'alpha') is None
+    assert str(prerelease.next_prerelease(
+        repo, version, 'alpha')) == '1.2.0-alpha.1'
+
+
+@pytest.mark.parametrize('channel', ['', 'r.c', '12', 'rc/1'])
+def test_invalid_channel(simple_repo: str, channel: str) -> None:
+    """Channels that are not semantic version identifiers are refused."""
+    with pytest.raises(exception.InvalidPrereleaseChannel):
+        core.AutoTag(repo=simple_repo, branch='master',
+                     upstream_remotes=None, detectors=[],
+                     prerelease=channel)
+
+
+def test_prerelease_counter(simple_repo: str) -> None:
+    """Every run creates the next pre-release of the next version."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.1.0')
+    repo.index.commit('feature: api')
+
+    assert _next_tag(repo) == '1.2.0-rc.1'
+    repo.index.commit('fix: typo')
+    assert _next_tag(repo) == '1.2.0-rc.2'
+    assert _next_tag(repo, 'beta') == '1.2.0-beta.1'
+
+    # NOTE: a breaking change moves to the next major, counting from 1
+    repo.index.commit('BREAKING: drop the old api')
+    assert _next_tag(repo) == '2.0.0-rc.1'
+
+
+def test_stable_only(simple_repo: str) -> None:
+    """The search strategies can ignore the pre-releases."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.1.0', ref='master~1')
+    repo.create_tag('1.2.0-rc.1')
+
+    assert str(tag_search_strategy.get_biggest_tag_in_repo(
+        repo=repo, branch='master')) == '1.2.0-rc.1'
+    for strategy in tag_search_strategy.SEARCH_METHODS_MAPPING.values():
+        assert str(strategy(repo=repo, branch='master',
+                            stable_only=True)) == '1.1.0'
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the profiling mode
+"""
+import os
+import pstats
+import time
+
+from py._path.local import LocalPath
+
+from auto_tag import core
+from auto_tag import detectors_config
+from auto_tag import entrypoint
+from auto_tag import profiling
+# pylint:disable=invalid-name
+
+PHASES = ['commit_graph', 'config_writes', 'tag_search', 'commit_walk',
+          'detectors', 'tag_create', 'push']
+
+
+def test_phase_profiler_counts_calls() -> None:
+    """Every entry in a phase must be counted and timed."""
+    profiler = profiling.PhaseProfiler()
+    for _ in range(3):
+        with profiler.phase('sleep'):
+            time.sleep(0.01)
+
+    assert list(profiler.phases) == ['sleep']
+    assert profiler.phases['sleep']['calls'] == 3
+    assert profiler.phases['sleep']['wall'] >= 0.03
+    assert profiler.phases['sleep']['cpu'] < profiler.phases['sleep']['wall']
+    assert len(profiler.report()) == 2
+
+
+def test_stack_sampler() -> None:
+    """The sampler must see the function that is busy."""
+    sampler = profiling.StackSampler(interval=0.001)
+    sampler.start()
+
+    def busy_function() -> None:
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    busy_function()
+    sampler.stop()
+
+    assert sampler.samples
+    assert any(stack.endswith(':busy_function')
+               for stack in sampler.samples)
+
+
+def test_profile_cli(simple_repo: str, tmpdir: LocalPath) -> None:
+    """Check that the CLI writes all the profiling artifacts."""
+    pstats_path = os.path.join(tmpdir, 'run.pstats')
+    collapsed_path = os.path.join(tmpdir, 'run.collapsed')
+
+    entrypoint.main(
+        ['-r', simple_repo,
+         '-b', 'master',
+         '--name', 'test_user',
+         '--email', 'test@email.com',
+         '--profile',
+         '--profile-pstats', pstats_path,
+         '--profile-collapsed', collapsed_path])
+
+    stats = pstats.Stats(pstats_path)
+    assert any(name == 'work' for _, _, name in stats.stats)  # type: ignore
+
+    with open(collapsed_path, 'r', encoding='utf-8') as stream:
+        for line in stream:
+            stack, count = line.rsplit(' ', 1)
+            assert ';' in stack
+            assert int(count) > 0
+
+
+def test_work_records_phases(simple_repo: str) -> None:
+    """All the phases of a run are recorded."""
+    autotag = core.AutoTag(
+        repo=simple_repo, branch='master', upstream_remotes=None,
+        detectors=detectors_config.DetectorsConfig.from_default().detectors,
+        git_name='test_user', git_email='test@email.com')
+    autotag.work()
+
+    assert list(autotag.profiler.phases) == PHASES
+    assert autotag.profiler.phases['config_writes']['calls'] == 2
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test pushing the detectors down to git
+"""
+import git
+
+from auto_tag import constants
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import pushdown
+from auto_tag import tag_writer
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME, commit_file
+# pylint:disable=invalid-name
+
+
+def test_grep_filter() -> None:
+    """Only simple comparations can be pushed down."""
+    assert detectors.CommitMessageContainsDetector(
+        'name', 'MAJOR', pattern='BREAKING').grep_filter() == (
+            'BREAKING', False)
+    assert detectors.CommitMessageHeadStartsWithDetector(
+        'name', 'MINOR', pattern='feat', case_sensitive=False,
+    ).grep_filter() == ('feat', True)
+    assert detectors.CommitMessageContainsDetector(
+        'name', 'MAJOR', pattern='two\nlines').grep_filter() is None
+    assert detectors.CommitMessageContainsDetector(
+        'name', 'MAJOR', pattern='ÉCHEC', case_sensitive=False,
+    ).grep_filter() is None
+    assert detectors.CommitMessageMatchesRegexDetector(
+        'name', 'MAJOR', pattern='feat.*').grep_filter() is None
+    assert detectors.ConventionalCommitDetector('name').grep_filter() is None
+
+
+def test_plan_groups_by_change_type() -> None:
+    """The groups run from the most significant change type."""
+    minor = detectors.CommitMessageContainsDetector(
+        'minor', 'MINOR', pattern='feature')
+    major = detectors.CommitMessageContainsDetector(
+        'major', 'MAJOR', pattern='BREAKING')
+    patch = detectors.CommitMessageContainsDetector(
+        'patch', 'PATCH', pattern='fix', case_sensitive=False)
+
+    plan = pushdown.plan([minor, major, patch])
+
+    assert plan is not None
+    assert [(change_type, [detector.name for detector, _, _ in group])
+            for change_type, group in plan.groups] == [
+                (constants.MAJOR, ['major']),
+                (constants.MINOR, ['minor']),
+                (constants.PATCH, ['patch'])]
+
+
+def test_plan_falls_back_to_python() -> None:
+    """A single detector git can't evaluate disables the pushdown."""
+    assert pushdown.plan([
+        detectors.CommitMessageContainsDetector(
+            'major', 'MAJOR', pattern='BREAKING'),
+        detectors.FilesChangedStartsWithDetector(
+            'api', 'MINOR', pattern='api/'),
+    ]) is None
+
+
+def test_run_stops_at_the_first_triggered_group(simple_repo: str) -> None:
+    """Less significant detectors don't run once a change type is found."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    feature = commit_file(repo, 'feature: add the api')
+    commit_file(repo, 'Fix the api')
+    # NOTE: the pattern is in the body, the head scope doesn't see it
+    commit_file(repo, 'refactor the api\n\nfeature: not in the head')
+
+    plan = pushdown.plan([
+        detectors.CommitMessageHeadStartsWithDetector(
+            'minor', 'MINOR', pattern='feature', scope='head'),
+        detectors.CommitMessageContainsDetector(
+            'patch', 'PATCH', pattern='fix', case_sensitive=False),
+    ])
+    assert plan is not None
+    change_type, hits = plan.run(repo, '1.0.0..master')
+
+    assert change_type == constants.MINOR
+    assert hits == {'minor': [feature.hexsha], 'patch': []}
+    assert plan.evaluations == {'minor': 2, 'patch': 0}
+
+
+def test_run_without_matches(simple_repo: str) -> None:
+    """A range with no matching commit is a patch."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    plan = pushdown.plan([detectors.CommitMessageContainsDetector(
+        'major', 'MAJOR', pattern='BREAKING')])
+
+    assert plan is not None
+    assert plan.run(repo, 'master') == (constants.PATCH, {'major': []})
+    assert plan.evaluations == {'major': 0}
+
+
+def test_pushdown_matches_python(simple_repo: str) -> None:
+    """The pushdown and the Python evaluation bump to the same tag."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    commit_file(repo, 'fix a bug')
+    commit_file(repo, 'cleanup\n\nfeature: a new endpoint')
+
+    def _next_tag(detector_pushdown: bool) -> str:
+        result = core.AutoTag(
+            repo=repo, branch='master', upstream_remotes=None,
+            detectors=[
+                detectors.CommitMessageContainsDetector(
+                    'minor', 'MINOR', pattern='FEATURE',
+                    case_sensitive=False),
+                detectors.CommitMessageContainsDetector(
+                    'major', 'MAJOR', pattern='BREAKING CHANGE')],
+            git_name=TEST_NAME, git_email=TEST_EMAIL,
+            detector_pushdown=detector_pushdown).work()
+        tag_writer.delete_tag(repo, str(result.next_tag))
+        return str(result.next_tag)
+
+    assert _next_tag(True) == _next_tag(False) == '1.1.0'
+
+
+def test_get_commit_headings(simple_repo: str) -> None:
+    """The headings of the new commits are read from one stream."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    tag = repo.create_tag('1.0.0')
+    commit_file(repo, '  first heading  \n\nbody')
+    commit_file(repo, 'second heading')
+
+    autotag = core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=[], git_name=TEST_NAME, git_email=TEST_EMAIL)
+
+    assert autotag.get_commit_headings(repo, 'master', tag) == [
+        'second heading', 'first heading']
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test the release pointer of a branch
+"""
+import os
+from typing import Any, List, Optional
+
+import git
+import pytest
+from py._path.local import LocalPath
+
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import release_pointer
+from auto_tag import tag_search_strategy
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME
+# pylint:disable=invalid-name
+
+
+class CountingStrategy():  # pylint: disable=too-few-public-methods
+    """Search strategy recording how many times it was used."""
+
+    def __init__(self) -> None:
+        """Initialize the strategy."""
+        self.calls: List[str] = []
+
+    def __call__(self, repo: git.Repo, branch: str,
+                 **kwargs: Any) -> Optional[git.refs.tag.TagReference]:
+        """Search with the default strategy."""
+        self.calls.append(branch)
+        return tag_search_strategy.DEFAULT_STRATEGY(
+            repo=repo, branch=branch, **kwargs)
+
+
+def _autotag(repo: git.Repo, strategy: CountingStrategy,
+             **kwargs: Any) -> core.AutoTag:
+    """Return an AutoTag using the release pointer of master."""
+    kwargs.setdefault('upstream_remotes', None)
+    return core.AutoTag(
+        repo=repo, branch='master',
+        detectors=[detectors.CommitMessageContainsDetector(
+            'minor', 'MINOR', pattern='feature')],
+        search_strategy=strategy, git_name=TEST_NAME, git_email=TEST_EMAIL,
+        release_pointer=True, **kwargs)
+
+
+def test_pointer_skips_the_search(simple_repo: str) -> None:
+    """The tag created by a run is where the next run starts from."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref='master~1')
+    strategy = CountingStrategy()
+
+    assert str(_autotag(repo, strategy).work().next_tag) == '1.0.1'
+    pointer = release_pointer.read_pointer(repo, 'master')
+    assert pointer is not None
+    assert pointer[:2] == ('1.0.1', repo.tags['1.0.1'].object.hexsha)
+    assert len(strategy.calls) == 1
+
+    repo.index.commit('feature: api')
+    assert str(_autotag(repo, strategy).work().next_tag) == '1.1.0'
+    assert len(strategy.calls) == 1
+    pointer = release_pointer.read_pointer(repo, 'master')
+    assert pointer is not None
+    assert pointer[0] == '1.1.0'
+
+
+def test_pointer_to_a_lightweight_tag(simple_repo: str) -> None:
+    """The pointer records lightweight tags found by the strategy."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    strategy = CountingStrategy()
+
+    assert str(_autotag(repo, strategy).get_latest_tag(repo)[0]) == '1.0.0'
+    assert str(_autotag(repo, strategy).get_latest_tag(repo)[0]) == '1.0.0'
+    assert len(strategy.calls) == 1
+
+
+def test_stale_pointer_is_repaired(simple_repo: str) -> None:
+    """A deleted, moved or unreachable tag falls back to the search."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref='master~2')
+    repo.create_tag('1.1.0', ref='master~1')
+    strategy = CountingStrategy()
+    autotag = _autotag(repo, strategy)
+    autotag.get_latest_tag(repo)
+
+    # NOTE: moved to another commit, still on the branch
+    repo.delete_tag(repo.tags['1.1.0'])
+    repo.create_tag('1.1.0', ref='master~2')
+    assert str(autotag.get_latest_tag(repo)[0]) == '1.1.0'
+    assert len(strategy.calls) == 2
+    assert release_pointer.resolve(repo, 'master') is not None
+
+    repo.delete_tag(repo.tags['1.1.0'])
+    assert str(autotag.get_latest_tag(repo)[0]) == '1.0.0'
+    assert len(strategy.calls) == 3
+
+    # NOTE: force-push, the tag is not on the branch anymore
+    repo.create_tag('2.0.0', ref=repo.index.commit('feature: api'))
+    release_pointer.write_pointer(repo, 'master', repo.tags['2.0.0'])
+    repo.head.reference.set_commit('master~1')
+    assert release_pointer.resolve(repo, 'master') is None
+    assert str(autotag.get_latest_tag(repo)[0]) == '1.0.0'
+    pointer = release_pointer.read_pointer(repo, 'master')
+    assert pointer is not None
+    assert pointer[0] == '1.0.0'
+
+
+def test_pointer_doesnt_list_tags(simple_repo: str,
+                                  monkeypatch: pytest.MonkeyPatch) -> None:
+    """With a valid pointer a run never lists the tags."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref='master~1')
+    strategy = CountingStrategy()
+    _autotag(repo, strategy).work()
+    repo.index.commit('feature: api')
+
+    def _list_tags(_: git.Repo) -> None:
+        raise AssertionError('the tags were listed')
+
+    monkeypatch.setattr(git.Repo, 'tags', property(_list_tags))
+    assert str(_autotag(repo, strategy).work().next_tag) == '1.1.0'
+    assert len(strategy.calls) == 1
+
+
+def test_malformed_pointer_is_repaired(simple_repo: str) -> None:
+    """A pointer that doesn't hold a tag falls back to the search."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    repo.git.update_ref(release_pointer.pointer_ref('master'), 'master')
+    strategy = CountingStrategy()
+
+    assert release_pointer.read_pointer(repo, 'master') is None
+    assert str(_autotag(repo, strategy).get_latest_tag(repo)[0]) == '1.0.0'
+    assert len(strategy.calls) == 1
+    pointer = release_pointer.read_pointer(repo, 'master')
+    assert pointer is not None
+    assert pointer[:2] == ('1.0.0', repo.tags['1.0.0'].object.hexsha)
+
+
+def test_newer_tag_invalidates_the_pointer(simple_repo: str) -> None:
+    """A tag created by hand after the last run is found."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref='master~1')
+    strategy = CountingStrategy()
+    assert str(_autotag(repo, strategy).work().next_tag) == '1.0.1'
+
+    repo.create_tag('2.0.0')
+    repo.index.commit('fix: x')
+    assert str(_autotag(repo, strategy).work().next_tag) == '2.0.1'
+    assert len(strategy.calls) == 2
+
+
+def test_pointer_with_concurrent_runs(simple_repo: str,
+                                      tmpdir: LocalPath) -> None:
+    """A run that lost a tag to another one searches again."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref='master~1')
+    clones = [repo.clone(os.path.join(tmpdir, name))
+              for name in ('first', 'second')]
+    strategy = CountingStrategy()
+
+    results = [_autotag(clone, strategy, upstream_remotes=['origin'],
+                        retry_backoff=0).work() for clone in clones]
+
+    assert [str(result.next_tag) for result in results] == ['1.0.1', '1.0.2']
+    assert results[1].attempts == 2
+    assert sorted(str(tag) for tag in repo.tags) == [
+        '1.0.0', '1.0.1', '1.0.2']
+    pointer = release_pointer.read_pointer(clones[1], 'master')
+    assert pointer is not None
+    assert pointer[0] == '1.0.2'
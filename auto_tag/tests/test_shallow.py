@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the shallow clone support
+"""
+import os
+from typing import Iterable
+
+import git
+import pytest
+from py._path.local import LocalPath
+
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import shallow
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME
+# pylint:disable=invalid-name, redefined-outer-name
+
+
+def _make_remote(tmpdir: LocalPath, commits: int, tag_at: int = -1) -> str:
+    """Create a bare remote with `commits` commits and a tag on one of them."""
+    source_path = os.path.join(tmpdir, 'source')
+    source = git.Repo.init(source_path)
+    for commit_id in range(commits):
+        file_path = os.path.join(source_path, 'f_{}'.format(commit_id))
+        open(file_path, 'w+').close()
+        source.index.add([file_path])
+        commit = source.index.commit('commit #{}'.format(commit_id))
+        if commit_id == tag_at:
+            source.create_tag('1.0.1', ref=commit)
+
+    remote_path = os.path.join(tmpdir, 'remote.git')
+    source.clone(remote_path, bare=True)
+    return remote_path
+
+
+@pytest.fixture
+def shallow_clone_with_old_tag(tmpdir: LocalPath) -> str:
+    """Return a `--depth 2` clone whose only tag is 20 commits deep."""
+    remote_path = _make_remote(tmpdir, commits=40, tag_at=19)
+    clone_path = os.path.join(tmpdir, 'clone')
+    git.Repo.clone_from('file://' + remote_path, clone_path, depth=2)
+    return clone_path
+
+
+def test_is_shallow(shallow_clone_with_old_tag: str, simple_repo: str) -> None:
+    """Check shallow detection."""
+    assert shallow.is_shallow(git.Repo(shallow_clone_with_old_tag))
+    assert not shallow.is_shallow(git.Repo(simple_repo))
+
+
+def test_deepen_until_found(shallow_clone_with_old_tag: str) -> None:
+    """Deepening must stop as soon as the tag becomes reachable."""
+    repo = git.Repo(shallow_clone_with_old_tag, odbt=git.GitDB)
+    assert '1.0.1' not in repo.tags
+
+    found = shallow.deepen_until_found(
+        repo, 'origin', lambda: repo.tags['1.0.1'] if '1.0.1' in repo.tags
+        else None, initial_step=2)
+
+    assert found is not None
+    assert found.name == '1.0.1'
+    # 2 + 2 + 4 + 8 + 16 commits reach the tag but not the root commit
+    assert shallow.is_shallow(repo)
+
+
+def test_deepen_until_found_no_tag(tmpdir: LocalPath) -> None:
+    """Without any tag the clone is deepened until it is complete."""
+    remote_path = _make_remote(tmpdir, commits=10)
+    clone_path = os.path.join(tmpdir, 'clone')
+    repo = git.Repo.clone_from('file://' + remote_path, clone_path, depth=1)
+
+    found = shallow.deepen_until_found(
+        repo, 'origin', lambda: None, initial_step=1)
+
+    assert found is None
+    assert not shallow.is_shallow(repo)
+    assert len(list(repo.iter_commits())) == 10
+
+
+def test_work_deepens_shallow_clone(
+    shallow_clone_with_old_tag: str,
+    default_detectors: Iterable[detectors.BaseDetector]
+) -> None:
+    """The next tag must be computed from the old tag, not from scratch."""
+    repo = git.Repo(shallow_clone_with_old_tag, odbt=git.GitDB)
+    autotag = core.AutoTag(
+        repo=shallow_clone_with_old_tag,
+        branch='master',
+        upstream_remotes=None,
+        detectors=default_detectors,
+        git_name=TEST_NAME,
+        git_email=TEST_EMAIL,
+        deepen_remote='origin',
+        deepen_step=2)
+    autotag.work()
+
+    assert '1.0.2' in repo.tags
+    assert '0.0.1' not in repo.tags
+    tag_object = repo.tags['1.0.2'].tag
+    assert tag_object is not None
+    assert tag_object.message.count('commit #') == 20
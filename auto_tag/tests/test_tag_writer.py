@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test atomic tag creation and concurrent tagging
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import Iterable
+
+import git
+import pytest
+from py._path.local import LocalPath
+
+from auto_tag import core
+from auto_tag import detectors
+from auto_tag import exception
+from auto_tag import tag_writer
+from auto_tag.tests.conftest import TEST_EMAIL, TEST_NAME, set_user
+# pylint:disable=invalid-name
+
+
+CONCURRENT_RUNS = 8
+# NOTE: seconds, generous on purpose, the runs take a few seconds on a
+# developer machine
+CONCURRENT_BUDGET = 60
+
+
+def test_create_tag_only_once(simple_repo: str) -> None:
+    """A tag can't be created twice."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    set_user(repo)
+    first, second = list(repo.iter_commits())[:2]
+
+    assert tag_writer.create_tag(repo, '1.0.0', first, 'Release 1.0.0 \n\n')
+    assert not tag_writer.create_tag(repo, '1.0.0', second, 'Other')
+
+    tag = repo.tags['1.0.0']
+    assert tag.commit == first
+    assert tag.tag is not None
+    assert tag.tag.message == 'Release 1.0.0'
+    assert tag.tag.tagger.name == TEST_NAME
+
+    tag_writer.delete_tag(repo, '1.0.0')
+    assert not tag_writer.tag_exists(repo, '1.0.0')
+
+
+def test_bulk_tag_writer(simple_repo: str) -> None:
+    """All the tags are created by one transaction, or none of them."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    set_user(repo)
+    commits = [commit.hexsha for commit in repo.iter_commits()]
+
+    writer = tag_writer.BulkTagWriter(repo, pack_refs=True)
+    for index, sha in enumerate(commits):
+        writer.add('1.0.{}'.format(index), sha, 'Release 1.0.{}'.format(index))
+    assert len(writer) == 3
+    assert not repo.tags
+    writer.commit()
+
+    assert [tag.commit.hexsha for tag in repo.tags] == commits
+    tag_object = repo.tags['1.0.1'].tag
+    assert tag_object is not None
+    assert tag_object.message == 'Release 1.0.1'
+    assert os.path.isfile(os.path.join(repo.git_dir, 'packed-refs'))
+
+    writer.add('2.0.0', commits[0], 'Release 2.0.0')
+    writer.add('1.0.2', commits[0], 'Release 1.0.2')
+    with pytest.raises(exception.TagAllocationFailed):
+        writer.commit()
+    assert '2.0.0' not in repo.tags
+    assert repo.tags['1.0.2'].commit.hexsha == commits[2]
+
+    tag_writer.delete_tags(repo, ['1.0.0', '1.0.1'])
+    assert [str(tag) for tag in repo.tags] == ['1.0.2']
+
+
+def test_retry_when_remote_has_the_tag(
+        simple_repo: str, tmpdir: LocalPath,
+        default_detectors: Iterable[detectors.BaseDetector]) -> None:
+    """The tag is recomputed when another run pushed it first."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    set_user(repo)
+    cloned_repo = repo.clone(os.path.join(tmpdir, 'cloned-repo'))
+    # NOTE: another run tagged the same commit in the meantime
+    repo.create_tag('0.0.1', message='other run')
+
+    result = core.AutoTag(
+        repo=cloned_repo, branch='master', upstream_remotes=['origin'],
+        detectors=default_detectors, git_name=TEST_NAME,
+        git_email=TEST_EMAIL, retry_backoff=0).work()
+
+    assert result.attempts == 2
+    assert result.next_tag == '0.0.2'
+    assert result.created
+    assert result.pushed_remotes == {'origin': True}
+    for tag_object in (repo.tags['0.0.1'].tag, cloned_repo.tags['0.0.1'].tag):
+        assert tag_object is not None
+        assert tag_object.message == 'other run'
+    assert '0.0.2' in repo.tags
+
+
+def test_existing_tag_out_of_search(
+        simple_repo: str,
+        default_detectors: Iterable[detectors.BaseDetector]) -> None:
+    """A tag the search strategy can't see is not retried forever."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    new_branch = repo.create_head('new_branch')
+    repo.head.reference = new_branch
+    open(os.path.join(simple_repo, 'extra_file'), 'w+').close()
+    repo.create_tag('0.0.1', ref=repo.index.commit('extra commit'))
+
+    autotag = core.AutoTag(
+        repo=repo, branch='master', upstream_remotes=None,
+        detectors=default_detectors, git_name=TEST_NAME,
+        git_email=TEST_EMAIL, retry_backoff=0)
+    with pytest.raises(exception.TagAllocationFailed):
+        autotag.work()
+
+
+def test_concurrent_runs(simple_repo: str, tmpdir: LocalPath) -> None:
+    """Concurrent runs against one remote get distinct, contiguous tags."""
+    remote = git.Repo(simple_repo, odbt=git.GitDB).clone(
+        os.path.join(tmpdir, 'remote.git'), bare=True)
+    clones = [remote.clone(os.path.join(tmpdir, 'clone-{}'.format(index)))
+              for index in range(CONCURRENT_RUNS)]
+
+    start = time.perf_counter()
+    processes = [subprocess.Popen(
+        [sys.executable, '-m', 'auto_tag', '--repo', clone.working_dir,
+         '-u', 'origin', '--name', TEST_NAME, '--email', TEST_EMAIL,
+         '--max-tag-retries', str(CONCURRENT_RUNS * 2), '-l', 'ERROR'],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                 for clone in clones]
+    outputs = [process.communicate()[0] for process in processes]
+    elapsed = time.perf_counter() - start
+
+    for process, output in zip(processes, outputs):
+        assert process.returncode == 0, output
+    assert sorted(str(tag) for tag in remote.tags) == sorted(
+        '0.0.{}'.format(index) for index in range(1, CONCURRENT_RUNS + 1))
+    assert elapsed < CONCURRENT_BUDGET
+
+
+def test_existing_tags(simple_repo: str) -> None:
+    """The existing tags are found by a single git process."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    repo.create_tag('1.0/rc')
+
+    assert tag_writer.existing_tags(
+        repo, ['2.0.0', '1.0.0', '1.0', '1.0/rc']) == ['1.0.0', '1.0/rc']
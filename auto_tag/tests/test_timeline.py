@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the release timeline index
+"""
+import json
+import os
+from typing import Iterable
+
+import git
+import pytest
+from py._path.local import LocalPath
+
+from auto_tag import detectors
+from auto_tag import entrypoint
+from auto_tag import exception
+from auto_tag import timeline
+from auto_tag.tests.conftest import commit_file
+# pylint:disable=invalid-name
+
+
+def test_walk_releases(simple_repo: str) -> None:
+    """Merged commits belong to the first release after the merge."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    first = repo.head.commit
+    repo.create_tag('1.0.0')
+    repo.create_tag('not-a-release')
+    side_commit = repo.index.commit(
+        'feature on the side', parent_commits=[first], head=False)
+    second = commit_file(repo, 'fix')
+    repo.create_tag('1.0.1')
+    repo.index.commit('merge side', parent_commits=[second, side_commit])
+    repo.create_tag('v1.1.0')
+    unreleased = commit_file(repo, 'not released yet')
+
+    releases, commits = timeline.walk_releases(repo, 'master')
+
+    assert releases == [('1.0.0', first.hexsha), ('1.0.1', second.hexsha),
+                        ('v1.1.0', repo.commit('v1.1.0').hexsha)]
+    assert len(commits['1.0.0']) == 3
+    assert commits['1.0.1'] == [second.hexsha]
+    assert set(commits['v1.1.0']) == {
+        repo.commit('v1.1.0').hexsha, side_commit.hexsha}
+    assert unreleased.hexsha not in sum(commits.values(), [])
+
+
+def test_update_and_query(
+        simple_repo: str, tmpdir: LocalPath,
+        default_detectors: Iterable[detectors.BaseDetector]) -> None:
+    """Releases are indexed once and answered from the database."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    feature = commit_file(repo, 'feature: new endpoint')
+    commit_file(repo, 'fix')
+    repo.create_tag('1.1.0')
+    database = os.path.join(tmpdir, 'index.sqlite')
+
+    with timeline.TimelineIndex(database) as index:
+        added = index.update(repo, 'master', default_detectors)
+        assert [release.tag for release in added] == ['1.0.0', '1.1.0']
+        assert index.update(repo, 'master', default_detectors) == []
+
+    breaking = commit_file(repo, 'BREAKING_CHANGE: drop the old endpoint')
+    repo.create_tag('2.0.0')
+    with timeline.TimelineIndex(database) as index:
+        added = index.update(repo, 'master', default_detectors)
+        assert [release.tag for release in added] == ['2.0.0']
+
+        release = index.release_containing(feature.hexsha[:7])
+        assert release is not None
+        assert release.tag == '1.1.0'
+        assert release.commit_range == '1.0.0..1.1.0'
+        assert release.change_type == 'MINOR'
+        assert release.detector_hits == {
+            'check_for_feature_heading': [feature.hexsha]}
+
+        release = index.release_containing(breaking.hexsha)
+        assert release is not None
+        assert release.previous == '1.1.0'
+        assert release.change_type == 'MAJOR'
+        assert [release.tag for release in index.releases()] == [
+            '1.0.0', '1.1.0', '2.0.0']
+        assert index.release_containing('not-a-sha') is None
+
+
+def test_rewritten_history_rebuilds(
+        simple_repo: str, tmpdir: LocalPath,
+        default_detectors: Iterable[detectors.BaseDetector]) -> None:
+    """The index is rebuilt when the last release left the branch."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0', ref='HEAD~1')
+    repo.create_tag('1.0.1')
+    database = os.path.join(tmpdir, 'index.sqlite')
+    with timeline.TimelineIndex(database) as index:
+        index.update(repo, 'master', default_detectors)
+
+    repo.delete_tag(repo.tags['1.0.1'])
+    repo.head.reset('HEAD~1', index=True, working_tree=True)
+    replaced = commit_file(repo, 'replaced commit')
+    repo.create_tag('1.0.1')
+    with timeline.TimelineIndex(database) as index:
+        added = index.update(repo, 'master', default_detectors)
+        assert [release.tag for release in added] == ['1.0.0', '1.0.1']
+        release = index.release('1.0.1')
+        assert release is not None
+        assert release.sha == replaced.hexsha
+
+
+def test_ambiguous_commit(tmpdir: LocalPath) -> None:
+    """An abbreviated sha must match a single commit."""
+    with timeline.TimelineIndex(os.path.join(tmpdir, 'index.sqlite')) as index:
+        index._insert(  # pylint: disable=protected-access
+            timeline.IndexedRelease('1.0.0', 'ab' * 20, None, 'PATCH', {}),
+            0, ['ab' * 20, 'ac' * 20])
+        with pytest.raises(exception.AmbiguousCommit):
+            index.release_containing('a')
+        release = index.release_containing('ac')
+        assert release is not None
+        assert release.tag == '1.0.0'
+
+
+def test_index_command(simple_repo: str,
+                       capsys: pytest.CaptureFixture) -> None:
+    """The index command updates the index, queries only read it."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_tag('1.0.0')
+    head = repo.head.commit.hexsha
+
+    entrypoint.main(['index', '-r', simple_repo, '-l', 'ERROR'])
+    assert os.path.isfile(os.path.join(repo.git_dir, 'auto-tag-index.sqlite'))
+    capsys.readouterr()
+
+    entrypoint.main(['index', '-r', simple_repo, '--contains', head])
+    assert capsys.readouterr().out == '1.0.0\n'
+
+    entrypoint.main(['index', '-r', simple_repo, '--list'])
+    assert [release['tag'] for release in json.loads(
+        capsys.readouterr().out)] == ['1.0.0']
+
+    with pytest.raises(SystemExit):
+        entrypoint.main(['index', '-r', simple_repo, '--show', '2.0.0'])
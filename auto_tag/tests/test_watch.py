@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test the watch mode
+"""
+from typing import Callable, List
+
+import git
+import pytest
+
+from auto_tag import core
+from auto_tag import entrypoint
+from auto_tag import exception
+from auto_tag import watch
+# pylint:disable=invalid-name
+
+
+class FakeTime():
+    """Clock and sleep that don't wait, running an action per sleep."""
+
+    def __init__(self, actions: List[Callable[[], object]]) -> None:
+        """Initialize the clock, `actions` run on the successive sleeps."""
+        self.now = 0.0
+        self._actions = actions
+
+    def clock(self) -> float:
+        """Return the current time."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the time and run the next action."""
+        self.now += seconds
+        if self._actions:
+            self._actions.pop(0)()
+
+
+def test_poll_detects_moves(simple_repo: str) -> None:
+    """Only the branches pointing to a new commit moved."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    repo.create_head('other')
+    watcher = watch.RefWatcher(repo, ['master', 'other'])
+
+    assert watcher.poll() == []
+    repo.index.commit('feature: api')
+    assert watcher.poll() == ['master']
+    assert watcher.heads['master'] == repo.head.commit.hexsha
+
+    # NOTE: packing rewrites the files, the branches didn't move
+    repo.git.pack_refs('--all')
+    assert watcher.poll() == []
+
+    # NOTE: only in packed-refs
+    repo.git.update_ref('refs/heads/other', 'master')
+    repo.git.pack_refs('--all')
+    assert watcher.poll() == ['other']
+
+
+def test_invalid_branch(simple_repo: str) -> None:
+    """Only refs can be watched."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+
+    with pytest.raises(exception.CantFindBranch):
+        watch.RefWatcher(repo, [repo.head.commit.hexsha])
+
+
+def test_watch_debounces(simple_repo: str) -> None:
+    """A branch runs once it stopped moving."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    runs = []
+
+    def run(branch: str) -> None:
+        runs.append((branch, repo.commit(branch).message))
+        if len(runs) == 1:
+            raise exception.TagAllocationFailed('failed run')
+
+    fake_time = FakeTime([
+        lambda: repo.index.commit('first'),
+        lambda: repo.index.commit('second'),
+        lambda: None,
+        lambda: None,
+        lambda: repo.index.commit('third'),
+    ])
+    branch_watch = watch.Watch(
+        watch.RefWatcher(repo, ['master']), run, interval=1, debounce=2,
+        sleep=fake_time.sleep, clock=fake_time.clock)
+
+    assert branch_watch.run(max_runs=2) == 2
+    assert runs == [('master', 'second'), ('master', 'third')]
+    assert fake_time.now == 7
+
+
+def test_watch_command(simple_repo: str) -> None:
+    """The watch command tags the branches."""
+    entrypoint.main(['watch', 'master', '-r', simple_repo, '--run-on-start',
+                     '--max-runs', '1', '--name', 'test_user',
+                     '--email', 'test@email.com', '-l', 'ERROR'])
+
+    assert [str(tag) for tag in git.Repo(simple_repo).tags] == ['0.0.1']
+
+
+def test_watch_after_repack(simple_repo: str) -> None:
+    """A branch moving to a commit in a new pack file is run."""
+    repo = git.Repo(simple_repo, odbt=git.GitDB)
+    runs = []
+
+    def run(branch: str) -> None:
+        result = core.AutoTag(
+            repo=simple_repo, branch=branch, upstream_remotes=None,
+            detectors=[], git_name='test_user',
+            git_email='test@email.com').work()
+        runs.append(str(result.next_tag))
+
+    branch_watch = watch.Watch(
+        watch.RefWatcher(repo, ['master']), run, interval=1, debounce=0)
+    assert branch_watch.step() == []
+
+    # NOTE: the commit is only in a pack created after the repo was opened
+    repo.index.commit('fix: typo')
+    repo.git.repack('-a', '-d')
+    assert branch_watch.step() == ['master']
+    assert runs == ['0.0.1']
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Release timeline index.
+
+Answers "which release first contained this commit" and "what bump did
+this release get" from a SQLite database instead of walking the history
+again for every question.
+
+The index is built from a single `git log --topo-order` pass over the
+branch. Children are listed before their parents, so by the time a commit
+is read the first release containing it is known: the smallest version
+among its own tags and the releases containing its children.
+
+An update only reads the commits that are not reachable from the last
+indexed release, everything reachable from it already has its final
+release. If that release was deleted, moved or is no longer on the branch
+(a rewritten history) the index is rebuilt.
+"""
+import logging
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import git
+import semantic_version
+
+from auto_tag import ancestry
+from auto_tag import changed_files as auto_tag_changed_files
+from auto_tag import constants
+from auto_tag import core
+from auto_tag import detectors as auto_tag_detectors
+from auto_tag import exception
+from auto_tag import tag_search_strategy
+from auto_tag import tag_writer
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS releases (
+    tag TEXT PRIMARY KEY,
+    sha TEXT NOT NULL,
+    previous TEXT,
+    position INTEGER NOT NULL UNIQUE,
+    change_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commits (
+    sha TEXT PRIMARY KEY,
+    tag TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detector_hits (
+    tag TEXT NOT NULL,
+    detector TEXT NOT NULL,
+    sha TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS detector_hits_tag ON detector_hits (tag);
+"""
+
+_TAG_DECORATION = 'tag: ' + tag_writer.TAGS_PREFIX
+_ABBREVIATED_SHA = re.compile('[0-9a-f]+')
+
+# NOTE: releases are ordered by version, the name breaks ties between
+# ex. `1.0.0` and `v1.0.0`
+ReleaseKey = Tuple[semantic_version.Version, str]
+
+
+class IndexedRelease():  # pylint: disable=too-few-public-methods
+    """A release stored in the index."""
+
+    def __init__(self, tag: str, sha: str, previous: Optional[str],
+                 change_type: str,
+                 detector_hits: Dict[str, List[str]]) -> None:
+        """Initialize the release.
+
+        :param tag: Name of the tag
+        :param sha: Commit the tag points to
+        :param previous: Tag of the previous release, None for the first
+        :param change_type: Change type the detectors found in the
+                            commits of the release
+        :param detector_hits: Every detector that triggered mapped to the
+                              commits it triggered on
+        """
+        self.tag = tag
+        self.sha = sha
+        self.previous = previous
+        self.change_type = change_type
+        self.detector_hits = detector_hits
+
+    @property
+    def commit_range(self) -> str:
+        """Return the commits of the release as a git range."""
+        if self.previous is None:
+            return self.tag
+        return '{}..{}'.format(self.previous, self.tag)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the release as JSON serializable data."""
+        return {
+            'tag': self.tag,
+            'sha': self.sha,
+            'previous': self.previous,
+            'commit_range': self.commit_range,
+            'change_type': self.change_type,
+            'detector_hits': self.detector_hits,
+        }
+
+
+def _parse_version(tag: str) -> Optional[semantic_version.Version]:
+    """Return the version of a tag, None if it is not a release."""
+    try:
+        return semantic_version.Version(
+            tag_search_strategy.clean_tag_name(tag))
+    except ValueError:
+        return None
+
+
+def _decorated_releases(decorations: str) -> List[ReleaseKey]:
+    """Return the releases among the tags decorating a commit."""
+    releases = []
+    for decoration in decorations.split(', '):
+        if not decoration.startswith(_TAG_DECORATION):
+            continue
+        tag = decoration[len(_TAG_DECORATION):]
+        version = _parse_version(tag)
+        if version is not None:
+            releases.append((version, tag))
+    return releases
+
+
+def walk_commits(repo: git.Repo, rev: str, exclude: Optional[str] = None,
+                 messages: bool = False) -> Iterator[Tuple[
+                     str, Optional[ReleaseKey], List[ReleaseKey], str]]:
+    """Walk a branch once, children first, with the release of every commit.
+
+    :param repo: Repository to query
+    :param rev: Revision to walk from, usually a branch
+    :param exclude: Don't walk the commits reachable from this revision
+    :param messages: Also read the message of every commit
+
+    :returns: For every commit its sha, the first release containing it
+              (None if it is not released yet), the releases tagging it
+              and its message (empty if `messages` is False)
+    :rtype: iterator
+    """
+    args = ['--topo-order', '--decorate=full',
+            '--decorate-refs={}'.format(tag_writer.TAGS_PREFIX),
+            '--format=%x00%H %P%x00%D%x00{}'.format('%B' if messages else ''),
+            rev]
+    if exclude is not None:
+        args.append('^{}'.format(exclude))
+    fields = repo.git.log(*args, '--').split('\x00')
+
+    # NOTE: the first release of the children already read, per parent
+    pending: Dict[str, ReleaseKey] = {}
+    for index in range(1, len(fields), 3):
+        sha, *parents = fields[index].split()
+        tagged = _decorated_releases(fields[index + 1])
+        candidates = tagged + ([pending.pop(sha)] if sha in pending else [])
+        first = min(candidates) if candidates else None
+        if first is not None:
+            for parent in parents:
+                if parent not in pending or first < pending[parent]:
+                    pending[parent] = first
+        yield sha, first, tagged, fields[index + 2]
+
+
+def walk_releases(repo: git.Repo, rev: str,
+                  exclude: Optional[str] = None) -> Tuple[
+                      List[Tuple[str, str]], Dict[str, List[str]]]:
+    """Find the first release containing every commit in one pass.
+
+    :param repo: Repository to query
+    :param rev: Revision to walk from, usually a branch
+    :param exclude: Don't walk the commits reachable from this revision
+
+    :returns: The tag and commit of every release, oldest first, and
+              every release tag mapped to the commits it is the first
+              release of. Commits not contained in any release are left
+              out.
+    :rtype: (list, dict)
+    """
+    releases: Dict[ReleaseKey, str] = {}
+    commits: Dict[str, List[str]] = {}
+    for sha, first, tagged, _ in walk_commits(repo, rev, exclude):
+        for release in tagged:
+            releases[release] = sha
+        if first is not None:
+            commits.setdefault(first[1], []).append(sha)
+    return [(tag, releases[(version, tag)])
+            for version, tag in sorted(releases)], commits
+
+
+class TimelineIndex():
+    """SQLite index of the releases of a branch."""
+
+    def __init__(self, path: str, logger: Optional[Any] = None) -> None:
+        """Open (and create if needed) the index.
+
+        :param path: Path to the database file
+        :param logger: If specified what logger to use
+        """
+        self._logger = logger or logging.getLogger(__name__)
+        self._connection = sqlite3.connect(path)
+        version = self._connection.execute('PRAGMA user_version').fetchone()
+        if version[0] not in (0, SCHEMA_VERSION):
+            self._connection.close()
+            raise exception.TimelineIndexError(
+                'Index {} has the unsupported version {}'.format(
+                    path, version[0]))
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+            self._connection.execute(
+                'PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def __enter__(self) -> 'TimelineIndex':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        """Return a value stored with the index."""
+        row = self._connection.execute(
+            'SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        """Store a value with the index."""
+        self._connection.execute(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            (key, value))
+
+    def _clear(self) -> None:
+        """Remove all the releases."""
+        for table in ('meta', 'releases', 'commits', 'detector_hits'):
+            self._connection.execute('DELETE FROM {}'.format(table))
+
+    def _last_release(self) -> Optional[Tuple[str, str, int]]:
+        """Return the tag, commit and position of the last release."""
+        return self._connection.execute(
+            'SELECT tag, sha, position FROM releases '
+            'ORDER BY position DESC LIMIT 1').fetchone()
+
+    @staticmethod
+    def _is_on_branch(repo: git.Repo, branch: str, tag: str,
+                      sha: str) -> bool:
+        """Check if a tag still points to `sha` and is on the branch."""
+        try:
+            current = repo.git.rev_parse(
+                '--verify', '{}^{{commit}}'.format(tag_writer.tag_ref(tag)))
+        except git.GitCommandError:
+            return False
+        return current == sha and ancestry.is_ancestor(
+            repo, sha, branch)
+
+    def update(self, repo: git.Repo, branch: str,
+               detectors: Iterable[auto_tag_detectors.BaseDetector],
+               rebuild: bool = False) -> List[IndexedRelease]:
+        """Index the releases created since the last update.
+
+        :param repo: Repository to read
+        :param branch: Branch to index, an index holds a single branch
+        :param detectors: Detectors used to classify the commits of every
+                          release
+        :param rebuild: Drop the index and read the whole history again
+
+        :returns: The releases added to the index, oldest first
+        :rtype: list
+        """
+        last = None if rebuild else self._last_release()
+        if last is not None and (
+                self._get_meta('branch') != branch or
+                not self._is_on_branch(repo, branch, last[0], last[1])):
+            self._logger.info('Release %s is no longer on %s, rebuilding '
+                              'the index', last[0], branch)
+            last = None
+
+        exclude = last[1] if last is not None else None
+        releases, commits = walk_releases(repo, branch, exclude)
+        added = self._classify(
+            repo, branch, list(detectors), releases, commits,
+            exclude, last[0] if last is not None else None)
+
+        position = last[2] + 1 if last is not None else 0
+        with self._connection:
+            if last is None:
+                self._clear()
+            for offset, release in enumerate(added):
+                self._insert(release, position + offset,
+                             commits.get(release.tag, []))
+            self._set_meta('branch', branch)
+            self._set_meta('head', repo.git.rev_parse(branch))
+        self._logger.info('Indexed %d new releases of %s', len(added), branch)
+        return added
+
+    def _classify(  # pylint: disable=too-many-arguments
+            self, repo: git.Repo, branch: str,
+            detectors: List[auto_tag_detectors.BaseDetector],
+            releases: List[Tuple[str, str]], commits: Dict[str, List[str]],
+            exclude: Optional[str],
+            previous: Optional[str]) -> List[IndexedRelease]:
+        """Run the detectors on the commits of every new release."""
+        changed = None
+        if any(detector.needs_changed_files for detector in detectors):
+            changed = auto_tag_changed_files.read_changed_files(
+                repo, branch if exclude is None else '{}..{}'.format(
+                    exclude, branch))
+        classifier = core.AutoTag(
+            repo=repo, branch=branch, upstream_remotes=None,
+            detectors=detectors, logger=self._logger)
+
+        classified = []
+        for tag, tag_sha in releases:
+            change_type, hits = classifier.classify(
+                [repo.commit(sha) for sha in commits.get(tag, [])],
+                changed_files=changed)
+            classified.append(IndexedRelease(
+                tag, tag_sha, previous, constants.CHANGE_TYPES[change_type],
+                {name: shas for name, shas in hits.items() if shas}))
+            previous = tag
+        return classified
+
+    def _insert(self, release: IndexedRelease, position: int,
+                shas: List[str]) -> None:
+        """Store a release and its commits."""
+        self._connection.execute(
+            'INSERT INTO releases (tag, sha, previous, position, '
+            'change_type) VALUES (?, ?, ?, ?, ?)',
+            (release.tag, release.sha, release.previous, position,
+             release.change_type))
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO commits (sha, tag) VALUES (?, ?)',
+            ((sha, release.tag) for sha in shas))
+        self._connection.executemany(
+            'INSERT INTO detector_hits (tag, detector, sha) '
+            'VALUES (?, ?, ?)',
+            ((release.tag, name, sha)
+             for name, hit_shas in release.detector_hits.items()
+             for sha in hit_shas))
+
+    def release(self, tag: str) -> Optional[IndexedRelease]:
+        """Return a release by its tag, None if it is not indexed."""
+        row = self._connection.execute(
+            'SELECT tag, sha, previous, change_type FROM releases '
+            'WHERE tag = ?', (tag,)).fetchone()
+        if row is None:
+            return None
+        hits: Dict[str, List[str]] = {}
+        for name, sha in self._connection.execute(
+                'SELECT detector, sha FROM detector_hits WHERE tag = ? '
+                'ORDER BY rowid', (tag,)):
+            hits.setdefault(name, []).append(sha)
+        tag, sha, previous, change_type = row
+        return IndexedRelease(tag, sha, previous, change_type, hits)
+
+    def releases(self) -> List[IndexedRelease]:
+        """Return all the indexed releases, oldest first."""
+        tags = [row[0] for row in self._connection.execute(
+            'SELECT tag FROM releases ORDER BY position')]
+        return [release for release in map(self.release, tags)
+                if release is not None]
+
+    def release_containing(self, sha: str) -> Optional[IndexedRelease]:
+        """Return the first release containing a commit.
+
+        :param sha: Full or abbreviated sha of the commit
+
+        :returns: The release, None if the commit is not in any indexed
+                  release
+        :rtype: IndexedRelease
+        """
+        if not _ABBREVIATED_SHA.fullmatch(sha.lower()):
+            return None
+        rows = self._connection.execute(
+            'SELECT sha, tag FROM commits WHERE sha GLOB ? LIMIT 2',
+            (sha.lower() + '*',)).fetchall()
+        if len(rows) > 1:
+            raise exception.AmbiguousCommit(
+                'Commit {} is ambiguous, ex. {} and {}'.format(
+                    sha, rows[0][0], rows[1][0]))
+        if not rows:
+            return None
+        return self.release(rows[0][1])
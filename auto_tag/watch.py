@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Run auto-tag when a branch moves.
+
+Polling auto-tag from cron pays the startup and the tag search on every
+run, even when nothing changed. `Watch` keeps the detectors and the
+`core.AutoTag` instances in memory and only runs when a watched branch
+points to a new commit. Every run opens the repository again: a handle
+kept open doesn't see the pack files added after it was opened, ex. by a
+large push or fetch, or by `git repack`.
+
+A branch is either a loose ref file or a line of `packed-refs`, so the
+watcher only compares the `stat` of these files between two polls. When
+one of them changed, the branches are resolved again and only the ones
+that moved are run. The branches are resolved by git, without loading
+their commits. Rapid successive updates (ex. a push of many commits, or
+`pack-refs` rewriting `packed-refs`) are debounced: a branch runs once
+it didn't move for `debounce` seconds.
+"""
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import git
+
+from auto_tag import exception
+
+Signature = Tuple[Optional[Tuple[int, int, int]], ...]
+
+
+def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+    """Return what changes when a file is rewritten, None if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class RefWatcher():
+    """Detect the branches that moved since the last poll."""
+
+    def __init__(self, repo: git.Repo, branches: List[str]) -> None:
+        """Initialize the watcher with the current heads of the branches.
+
+        :param repo: Repository to watch
+        :param branches: Branches to watch, ex. `master` or `origin/main`
+
+        :raises exception.CantFindBranch: If a branch is not a ref
+        """
+        self._repo = repo
+        self._refs: Dict[str, str] = {}
+        for branch in branches:
+            ref = repo.git.rev_parse('--symbolic-full-name', branch)
+            if not ref.startswith('refs/'):
+                raise exception.CantFindBranch(
+                    'Can\'t watch {}, it is not a branch'.format(branch))
+            self._refs[branch] = ref
+        self._paths = [os.path.join(repo.common_dir, ref)
+                       for ref in self._refs.values()]
+        self._paths.append(os.path.join(repo.common_dir, 'packed-refs'))
+        self._signature = self._read_signature()
+        self._heads = self._read_heads()
+
+    @property
+    def heads(self) -> Dict[str, Optional[str]]:
+        """Return the commit every branch pointed to at the last poll."""
+        return dict(self._heads)
+
+    def _read_signature(self) -> Signature:
+        """Return the state of the files the branches are stored in."""
+        return tuple(_stat(path) for path in self._paths)
+
+    def _read_heads(self) -> Dict[str, Optional[str]]:
+        """Return the commit every branch points to, None if deleted."""
+        output = self._repo.git.for_each_ref(
+            '--format=%(refname) %(objectname)', *self._refs.values())
+        shas = dict(line.split() for line in output.splitlines())
+        return {branch: shas.get(ref) for branch, ref in self._refs.items()}
+
+    def poll(self) -> List[str]:
+        """Return the branches that moved since the last poll.
+
+        The refs are only read again if one of their files changed.
+        """
+        signature = self._read_signature()
+        if signature == self._signature:
+            return []
+        self._signature = signature
+        heads = self._read_heads()
+        moved = [branch for branch, sha in heads.items()
+                 if sha != self._heads[branch]]
+        self._heads = heads
+        return moved
+
+
+class Watch():
+    """Run a callback for every branch that moved, debounced."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, watcher: RefWatcher, run: Callable[[str], Any],
+            interval: float, debounce: float,
+            logger: Optional[Any] = None,
+            sleep: Callable[[float], None] = time.sleep,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the watch.
+
+        :param watcher: Watcher of the branches
+        :param run: Called with a branch once it moved and settled
+        :param interval: Seconds between two polls
+        :param debounce: Seconds a branch must not move before it runs
+        :param logger: If specified what logger to use
+        :param sleep: Function used to wait between two polls
+        :param clock: Monotonic clock the debounce is measured with
+        """
+        self._watcher = watcher
+        self._run = run
+        self._interval = interval
+        self._debounce = debounce
+        self._logger = logger or logging.getLogger(__name__)
+        self._sleep = sleep
+        self._clock = clock
+        #: Moved branches mapped to when they last moved
+        self._pending: Dict[str, float] = {}
+
+    def _run_branch(self, branch: str) -> None:
+        """Run a branch, a failed run doesn't stop the watch."""
+        self._logger.info('%s moved to %s', branch,
+                          self._watcher.heads[branch])
+        try:
+            self._run(branch)
+        except (exception.BaseAutoTagException, git.GitCommandError) as exc:
+            self._logger.error('Run on %s failed: %s', branch, exc)
+
+    def step(self) -> List[str]:
+        """Poll once and run the branches that settled.
+
+        :returns: The branches that were run
+        :rtype: list
+        """
+        now = self._clock()
+        for branch in self._watcher.poll():
+            self._logger.debug('%s moved', branch)
+            self._pending[branch] = now
+        settled = sorted(branch for branch, moved in self._pending.items()
+                         if now - moved >= self._debounce)
+        ran = []
+        for branch in settled:
+            del self._pending[branch]
+            if self._watcher.heads[branch] is None:
+                self._logger.warning('%s was deleted', branch)
+                continue
+            self._run_branch(branch)
+            ran.append(branch)
+        return ran
+
+    def run(self, max_runs: Optional[int] = None) -> int:
+        """Watch the branches until interrupted.
+
+        :param max_runs: Stop after this many branches were run
+
+        :returns: How many branches were run
+        :rtype: int
+        """
+        runs = 0
+        while max_runs is None or runs < max_runs:
+            runs += len(self.step())
+            if max_runs is None or runs < max_runs:
+                self._sleep(self._interval)
+        return runs
@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for auto-tag.
+
+Run them with `python -m benchmarks --help`.
+"""
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""
+Benchmarks entry point.
+"""
+import sys
+
+from benchmarks import run
+
+
+if __name__ == '__main__':
+    run.main(sys.argv[1:])
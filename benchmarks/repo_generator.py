@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Fast synthetic repository generator.
+
+Repositories are written with a single `git fast-import` process, which
+is orders of magnitude faster than creating commits one by one and makes
+it possible to build histories with millions of commits.
+"""
+import os
+import random
+import subprocess
+from typing import Any
+from typing import IO
+from typing import Dict
+from typing import Optional
+
+AUTHOR = b'Auto Tag Benchmark <benchmark@auto-tag.invalid>'
+START_DATE = 1500000000
+BRANCH = 'master'
+SIDE_BRANCH = 'benchmark-side'
+
+LOREM = (b'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do '
+         b'eiusmod tempor incididunt ut labore et dolore magna aliqua.\n')
+
+
+class RepoShape():
+    """Describe the shape of a generated repository."""
+
+    # pylint: disable=too-many-arguments, too-many-instance-attributes
+    # pylint: disable=too-few-public-methods
+    def __init__(self, commits: int = 1000, tags: int = 10,
+                 merge_every: int = 0, side_length: int = 3,
+                 prefixes: int = 1, files_per_prefix: int = 10,
+                 message_size: int = 0, feature_ratio: float = 0.1,
+                 breaking_ratio: float = 0.01, seed: int = 0) -> None:
+        """Initialize the shape.
+
+        :param commits: Total number of commits to create
+        :param tags: Number of tags, spread evenly on the main branch
+        :param merge_every: Every `merge_every`-th main commit is a merge of
+                            a side branch, 0 means a linear history
+        :param side_length: Number of commits on every merged side branch
+        :param prefixes: Number of top level directories (monorepo projects)
+        :param files_per_prefix: Number of files in every directory
+        :param message_size: Size in bytes of the body of every message
+        :param feature_ratio: Fraction of commits that look like features
+        :param breaking_ratio: Fraction of commits with a breaking change
+        :param seed: Seed for the random generator
+        """
+        self.commits = commits
+        self.tags = tags
+        self.merge_every = merge_every
+        self.side_length = side_length
+        self.prefixes = prefixes
+        self.files_per_prefix = files_per_prefix
+        self.message_size = message_size
+        self.feature_ratio = feature_ratio
+        self.breaking_ratio = breaking_ratio
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the shape as a dictionary."""
+        return dict(vars(self))
+
+
+PRESETS = {
+    'small': RepoShape(commits=1000, tags=20),
+    'large': RepoShape(commits=1000000, tags=20000),
+    'many-tags': RepoShape(commits=100000, tags=50000),
+    'merge-heavy': RepoShape(commits=100000, tags=1000, merge_every=2,
+                             side_length=5),
+    'monorepo': RepoShape(commits=100000, tags=1000, prefixes=200,
+                          files_per_prefix=50),
+    'huge-messages': RepoShape(commits=2000, tags=20,
+                               message_size=2 * 1024 * 1024),
+}
+
+
+def tag_name(index: int) -> str:
+    """Return the (increasing) semantic version used for the n-th tag."""
+    return '{}.{}.{}'.format(index // 1000000, (index // 1000) % 1000,
+                             index % 1000)
+
+
+class _StreamWriter():
+    """Write a fast-import stream."""
+
+    def __init__(self, stream: IO[bytes], shape: RepoShape) -> None:
+        self._stream = stream
+        self._shape = shape
+        self._random = random.Random(shape.seed)
+        self._body = b''
+        if shape.message_size:
+            repeat = shape.message_size // len(LOREM) + 1
+            self._body = (LOREM * repeat)[:shape.message_size]
+        self._mark = 0
+        self.created = 0
+
+    def _data(self, payload: bytes) -> None:
+        self._stream.write(b'data %d\n' % len(payload))
+        self._stream.write(payload)
+        self._stream.write(b'\n')
+
+    def _message(self) -> bytes:
+        roll = self._random.random()
+        if roll < self._shape.feature_ratio:
+            head = b'feature(bench): commit #%d' % self.created
+        else:
+            head = b'fix(bench): commit #%d' % self.created
+        message = head + b'\n'
+        if self._body:
+            message += b'\n' + self._body
+        if self._random.random() < self._shape.breaking_ratio:
+            message += b'\nBREAKING_CHANGE: benchmark\n'
+        return message
+
+    def commit(self, ref: str, parent: Optional[int],
+               merge: Optional[int] = None) -> int:
+        """Write a commit and return its mark."""
+        self._mark += 1
+        self.created += 1
+        date = b'%d +0000' % (START_DATE + self.created)
+        prefix = self.created % self._shape.prefixes
+        file_id = self.created % self._shape.files_per_prefix
+
+        write = self._stream.write
+        write(b'commit refs/heads/%s\n' % ref.encode())
+        write(b'mark :%d\n' % self._mark)
+        write(b'author %s %s\n' % (AUTHOR, date))
+        write(b'committer %s %s\n' % (AUTHOR, date))
+        self._data(self._message())
+        if parent is not None:
+            write(b'from :%d\n' % parent)
+        if merge is not None:
+            write(b'merge :%d\n' % merge)
+        write(b'M 644 inline project_%d/file_%d\n' % (prefix, file_id))
+        self._data(b'%d\n' % self.created)
+        write(b'\n')
+        return self._mark
+
+    def tag(self, name: str, mark: int) -> None:
+        """Write a lightweight tag pointing to `mark`."""
+        self._stream.write(b'reset refs/tags/%s\nfrom :%d\n\n' % (
+            name.encode(), mark))
+
+
+def write_stream(stream: IO[bytes], shape: RepoShape) -> int:
+    """Write the fast-import stream for `shape` and return the tag count."""
+    writer = _StreamWriter(stream, shape)
+    interval = max(1, shape.commits // max(shape.tags, 1))
+    main_commits = 0
+    tags_created = 0
+    tip = None
+
+    while writer.created < shape.commits:
+        main_commits += 1
+        side_tip = None
+        if (shape.merge_every and tip is not None and
+                main_commits % shape.merge_every == 0):
+            side_tip = tip
+            for _ in range(shape.side_length):
+                if writer.created >= shape.commits - 1:
+                    break
+                side_tip = writer.commit(SIDE_BRANCH, side_tip)
+
+        tip = writer.commit(BRANCH, tip, merge=side_tip)
+
+        if (tags_created < shape.tags and
+                writer.created // interval > tags_created):
+            writer.tag(tag_name(tags_created), tip)
+            tags_created += 1
+
+    return tags_created
+
+
+def generate_repo(path: str, shape: RepoShape) -> str:
+    """Create a repository with the given shape at `path`.
+
+    :param path: Where to create the repository, must not exist
+    :param shape: The shape of the repository
+
+    :returns: The path of the repository
+    :rtype: str
+    """
+    subprocess.run(['git', 'init', '--quiet', '--initial-branch', BRANCH,
+                    path], check=True)
+    with subprocess.Popen(
+            ['git', 'fast-import', '--quiet', '--done'],
+            cwd=path, stdin=subprocess.PIPE) as process:
+        assert process.stdin is not None
+        write_stream(process.stdin, shape)
+        process.stdin.write(b'done\n')
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError('git fast-import failed for {}'.format(path))
+
+    subprocess.run(['git', 'update-ref', '-d',
+                    'refs/heads/{}'.format(SIDE_BRANCH)],
+                   cwd=path, check=False)
+    return os.path.abspath(path)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Run the auto-tag benchmarks and record the results as JSON.
+"""
+import argparse
+import datetime
+import functools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import git
+
+from auto_tag import core
+from auto_tag import detectors_config
+from auto_tag import pipeline
+from auto_tag import tag_search_strategy
+from auto_tag import tag_writer
+from benchmarks import repo_generator
+
+BENCHMARK_TAG = '999999.0.0'
+BENCHMARK_TAG_PREFIX = 'benchmark-'
+BENCHMARK_MESSAGE = 'Release {}'
+
+
+def measure(func: Callable[[], Any], repeat: int,
+            setup: Optional[Callable[[], None]] = None,
+            teardown: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Run `func` `repeat` times and return timing statistics in seconds.
+
+    `setup` and `teardown` are called around every run but are not timed.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        if teardown is not None:
+            teardown()
+    return {
+        'runs': repeat,
+        'min': min(timings),
+        'max': max(timings),
+        'mean': statistics.mean(timings),
+        'median': statistics.median(timings),
+    }
+
+
+def _auto_tag_version() -> str:
+    """Return the installed auto-tag version."""
+    try:
+        from importlib import metadata  # pylint: disable=import-outside-toplevel
+        return metadata.version('auto-tag')
+    except Exception:  # pylint: disable=broad-except
+        return 'unknown'
+
+
+def run_benchmarks(repo_path: str, repeat: int = 3,
+                   scan_commits: int = 10000,
+                   branch: str = repo_generator.BRANCH) -> Dict[str, Any]:
+    """Run all the benchmarks against an existing repository.
+
+    :param repo_path: Repository to benchmark against
+    :param repeat: How many times each benchmark is run
+    :param scan_commits: How many commits are classified by the
+                         `get_change_type` and `_create_tag_message`
+                         benchmarks
+    :param branch: Branch to work on
+
+    :returns: The results for every benchmark
+    :rtype: dict
+    """
+    logger = logging.getLogger('benchmarks')
+    logger.setLevel(logging.WARNING)
+    repo = git.Repo(repo_path)
+    detectors = detectors_config.DetectorsConfig.from_default().detectors
+    autotag = core.AutoTag(
+        repo=repo_path, branch=branch, upstream_remotes=None,
+        detectors=detectors, git_name='benchmark',
+        git_email='benchmark@auto-tag.invalid', logger=logger)
+    results: Dict[str, Any] = {}
+
+    for name, strategy in tag_search_strategy.SEARCH_METHODS_MAPPING.items():
+        results['search_strategy[{}]'.format(name)] = measure(
+            functools.partial(strategy, repo=repo, branch=branch), repeat)
+
+    commits: List[git.objects.commit.Commit] = []
+
+    def load_commits() -> None:
+        # NOTE: fresh Commit objects so every run reads the messages again
+        commits[:] = list(repo.iter_commits(rev=branch,
+                                            max_count=scan_commits))
+
+    results['get_change_type'] = measure(
+        lambda: autotag.get_change_type(commits), repeat, setup=load_commits)
+    # NOTE: the headings decoded from the commit objects, to compare with
+    # reading them from one git log stream
+    results['_create_tag_message'] = measure(
+        lambda: core.AutoTag._create_tag_message(  # pylint: disable=protected-access
+            [pipeline.heading(commit) for commit in commits], BENCHMARK_TAG),
+        repeat, setup=load_commits)
+    results['get_commit_headings'] = measure(
+        functools.partial(
+            autotag.get_commit_headings, repo, branch,
+            tag_search_strategy.DEFAULT_STRATEGY(repo=repo, branch=branch)),
+        repeat)
+
+    existing_tags = set(repo.git.tag('--points-at', branch).split())
+
+    def delete_created_tags() -> None:
+        for name in repo.git.tag('--points-at', branch).split():
+            if name not in existing_tags:
+                repo.git.tag('-d', name)
+
+    results['AutoTag.work'] = measure(
+        autotag.work, repeat, teardown=delete_created_tags)
+    results['AutoTag.work[pipeline]'] = measure(
+        core.AutoTag(
+            repo=repo_path, branch=branch, upstream_remotes=None,
+            detectors=detectors, git_name='benchmark',
+            git_email='benchmark@auto-tag.invalid', logger=logger,
+            pipeline=True).work,
+        repeat, teardown=delete_created_tags)
+    return results
+
+
+def run_tag_benchmarks(repo_path: str, count: int, repeat: int = 3,
+                       branch: str = repo_generator.BRANCH) -> Dict[str, Any]:
+    """Compare creating many tags one at a time and in bulk.
+
+    :param repo_path: Repository to benchmark against
+    :param count: How many tags every benchmark creates
+    :param repeat: How many times each benchmark is run
+    :param branch: Branch whose commits are tagged
+
+    :returns: The results for every benchmark
+    :rtype: dict
+    """
+    repo = git.Repo(repo_path, odbt=git.GitDB)
+    repo.git.update_environment(
+        GIT_COMMITTER_NAME='benchmark',
+        GIT_COMMITTER_EMAIL='benchmark@auto-tag.invalid')
+    shas = repo.git.rev_list(branch, max_count=count).split()
+    targets = [('{}{}'.format(BENCHMARK_TAG_PREFIX, index),
+                shas[index % len(shas)]) for index in range(count)]
+
+    def delete_created_tags() -> None:
+        tag_writer.delete_tags(repo, [name for name, _ in targets])
+
+    def create_tag() -> None:
+        for name, sha in targets:
+            repo.create_tag(name, ref=sha,
+                            message=BENCHMARK_MESSAGE.format(name))
+
+    def create_atomic() -> None:
+        for name, sha in targets:
+            tag_writer.create_tag(repo, name, repo.commit(sha),
+                                  BENCHMARK_MESSAGE.format(name))
+
+    def create_bulk(pack_refs: bool) -> None:
+        writer = tag_writer.BulkTagWriter(repo, pack_refs=pack_refs)
+        for name, sha in targets:
+            writer.add(name, sha, BENCHMARK_MESSAGE.format(name))
+        writer.commit()
+
+    return {
+        'create_tags[repo.create_tag]': measure(
+            create_tag, repeat, teardown=delete_created_tags),
+        'create_tags[tag_writer.create_tag]': measure(
+            create_atomic, repeat, teardown=delete_created_tags),
+        'create_tags[BulkTagWriter]': measure(
+            functools.partial(create_bulk, False), repeat,
+            teardown=delete_created_tags),
+        'create_tags[BulkTagWriter+pack_refs]': measure(
+            functools.partial(create_bulk, True), repeat,
+            teardown=delete_created_tags),
+    }
+
+
+def _git_version() -> str:
+    """Return the version of the git binary."""
+    return subprocess.run(['git', '--version'], check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def record(results: Dict[str, Any], shape: Optional[Dict[str, Any]],
+           output: Optional[str]) -> Dict[str, Any]:
+    """Wrap the results with environment information and store them."""
+    report = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'auto_tag_version': _auto_tag_version(),
+        'python': platform.python_version(),
+        'git': _git_version(),
+        'shape': shape,
+        'benchmarks': results,
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, indent=2, sort_keys=True)
+    return report
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Return a line for every benchmark present in both reports."""
+    lines = []
+    for name, result in sorted(new['benchmarks'].items()):
+        if name not in old['benchmarks']:
+            continue
+        before = old['benchmarks'][name]['median']
+        after = result['median']
+        ratio = after / before if before else float('inf')
+        lines.append('{:<45} {:>10.4f}s -> {:>10.4f}s  x{:.2f}'.format(
+            name, before, after, ratio))
+    return lines
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Return the argument parser setup."""
+    parser = argparse.ArgumentParser(description='Benchmark auto-tag')
+    parser.add_argument('--shape', choices=sorted(repo_generator.PRESETS),
+                        default='small',
+                        help='Shape of the generated repository.')
+    parser.add_argument('--repo', type=str, default=None,
+                        help=('Benchmark an existing repository instead of '
+                              'generating one.'))
+    parser.add_argument('--keep-repo', type=str, default=None,
+                        help='Generate the repository at this path and keep it.')
+    parser.add_argument('--branch', type=str, default=repo_generator.BRANCH,
+                        help='Branch to work on.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='How many times every benchmark is run.')
+    parser.add_argument('--scan-commits', type=int, default=10000,
+                        help='Commits used for the classification benchmarks.')
+    parser.add_argument('--tags', type=int, default=0,
+                        help=('Also compare creating this many tags one at a '
+                              'time and in bulk, ex. 10000.'))
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='Write the results as JSON to this file.')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Compare against a previously recorded JSON.')
+    return parser
+
+
+def main(cli_args: List[str]) -> None:
+    """Entry point for `python -m benchmarks`."""
+    args = get_parser().parse_args(cli_args)
+    shape = None
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo_path = args.repo
+        if repo_path is None:
+            shape = repo_generator.PRESETS[args.shape]
+            repo_path = args.keep_repo or os.path.join(tmpdir, 'repo')
+            start = time.perf_counter()
+            repo_generator.generate_repo(repo_path, shape)
+            print('Generated {} in {:.2f}s'.format(
+                repo_path, time.perf_counter() - start))
+
+        results = run_benchmarks(repo_path, repeat=args.repeat,
+                                 scan_commits=args.scan_commits,
+                                 branch=args.branch)
+        if args.tags:
+            results.update(run_tag_benchmarks(
+                repo_path, args.tags, repeat=args.repeat,
+                branch=args.branch))
+
+    report = record(results, shape.to_dict() if shape else None, args.output)
+    print(json.dumps(report['benchmarks'], indent=2, sort_keys=True))
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as stream:
+            old = json.load(stream)
+        print('\n'.join(compare(old, report)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -44,7 +44,7 @@ setup(
         'Topic :: System :: Software Distribution',
     ],
     python_requires='>=3.10',
-    packages=find_packages(exclude=('tests',)),
+    packages=find_packages(exclude=('tests', 'benchmarks', 'benchmarks.*')),
     include_package_data=True,
     entry_points={
         'console_scripts': [